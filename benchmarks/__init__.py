@@ -0,0 +1,3 @@
+"""
+ZDTrans 性能基准测试
+"""
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+翻译记忆基准测试
+用确定性的中英文语料建立内存索引，测量每条的建索引耗时和近似/未命中查询的延迟，
+超过预算（默认每次查询 LOOKUP_BUDGET_MS 毫秒）时退出码为 1
+
+用法：
+    python -m benchmarks.memory                     # 10 万条
+    python -m benchmarks.memory --entries 200000 --queries 1000
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+
+from benchmarks.run import make_corpus, percentiles
+from src.translation_memory import TranslationMemory
+
+
+# 默认条目数和查询数
+DEFAULT_ENTRIES = 100000
+DEFAULT_QUERIES = 500
+
+# 预算（毫秒）：单次查询的 p95，单条建索引的平均耗时
+LOOKUP_BUDGET_MS = 5.0
+BUILD_BUDGET_MS = 1.0
+
+_SCOPE = 'translate:zh-CN:stub/stub-model:'
+
+
+def near_duplicate(text, rng):
+    """只改动编号的近似原文（典型的命中场景：数字、名称不同）"""
+    return text.replace('case ', f'case {rng.randint(0, 9)}', 1).replace('第', f'第{rng.randint(0, 9)}', 1)
+
+
+def run_benchmark(entries=DEFAULT_ENTRIES, queries=DEFAULT_QUERIES, seed=0):
+    """
+    建立索引并查询
+
+    Returns:
+        dict: 建索引耗时、近似/未命中查询的延迟分布（毫秒）和命中率
+    """
+    rng = random.Random(seed)
+    corpus = make_corpus(entries + queries, seed)
+    stored, unseen = corpus[:entries], corpus[entries:]
+    memory = TranslationMemory(None, max_entries=entries)
+
+    start = time.perf_counter()
+    for text in stored:
+        memory.add(text, f"[译] {text}", _SCOPE)
+    build = time.perf_counter() - start
+
+    near_queries = [near_duplicate(text, rng) for text in rng.sample(stored, queries)]
+    near, found = [], 0
+    for text in near_queries:
+        start = time.perf_counter()
+        found += memory.lookup(text, _SCOPE) is not None
+        near.append(time.perf_counter() - start)
+    miss = []
+    for text in unseen:
+        start = time.perf_counter()
+        memory.lookup(text, _SCOPE)
+        miss.append(time.perf_counter() - start)
+
+    return {
+        'entries': entries,
+        'build_ms_per_entry': round(build / entries * 1000, 4),
+        'build_s': round(build, 2),
+        'near_lookup_ms': percentiles(near),
+        'miss_lookup_ms': percentiles(miss),
+        'near_hit_rate': found / queries,
+    }
+
+
+def within_budget(result, lookup_budget_ms=LOOKUP_BUDGET_MS, build_budget_ms=BUILD_BUDGET_MS):
+    """查询 p95 和单条建索引耗时是否都在预算以内"""
+    return (result['near_lookup_ms']['p95'] <= lookup_budget_ms
+            and result['miss_lookup_ms']['p95'] <= lookup_budget_ms
+            and result['build_ms_per_entry'] <= build_budget_ms)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.memory', description='翻译记忆建索引和查询基准测试')
+    parser.add_argument('--entries', type=int, default=DEFAULT_ENTRIES)
+    parser.add_argument('--queries', type=int, default=DEFAULT_QUERIES)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--budget-ms', type=float, default=LOOKUP_BUDGET_MS, help='单次查询 p95 的预算（毫秒）')
+    args = parser.parse_args(argv)
+
+    result = run_benchmark(args.entries, args.queries, args.seed)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    if not within_budget(result, args.budget_ms):
+        print(f"超出预算：查询 p95 应不超过 {args.budget_ms} ms，单条建索引不超过 {BUILD_BUDGET_MS} ms",
+              file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
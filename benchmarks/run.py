@@ -0,0 +1,451 @@
+#!/usr/bin/env python3
+"""
+端到端延迟基准测试
+启动模拟的 chat/completions 服务，驱动 TranslatorManager（可选驱动离屏的弹出窗口）跑一组固定场景，
+输出各场景的 p50/p95/p99 延迟、吞吐量、缓存命中率和 API 调用数，结果写入 JSON 文件便于在版本间比较
+
+用法：
+    python -m benchmarks.run                              # 默认场景，线程池引擎
+    python -m benchmarks.run --engine both --ui           # 两种引擎，并测量弹出窗口的刷新延迟
+    python -m benchmarks.run --compare benchmarks/results/old.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from benchmarks.stub_provider import StubConfig, StubProvider
+
+
+# 默认结果目录
+RESULTS_DIR = Path(__file__).resolve().parent / 'results'
+
+# 场景执行顺序；hotkey 只在 --ui 时运行
+SCENARIOS = ['cold', 'warm', 'mixed', 'stream', 'batch', 'hotkey']
+
+# 单个场景的超时（秒）
+SCENARIO_TIMEOUT = 300
+
+# 比较结果时关注的指标（越小越好的指标在前）
+COMPARE_METRICS = ['latency_ms.p50', 'latency_ms.p95', 'latency_ms.p99', 'first_update_ms.p50',
+                   'throughput_rps', 'cache_hit_rate']
+
+_EN_WORDS = ('the model training data network layer attention token batch cache latency request '
+             'response server client pipeline window result update system memory thread queue').split()
+_ZH_WORDS = ('模型 训练 数据 网络 注意力 缓存 延迟 请求 响应 服务 客户端 流水线 窗口 结果 更新 '
+             '系统 内存 线程 队列 翻译').split()
+
+
+def make_corpus(count, seed=0):
+    """生成确定性的测试文本（中英文句子各半，长度不一）"""
+    rng = random.Random(seed)
+    texts = []
+    for i in range(count):
+        words = rng.choices(_EN_WORDS if i % 2 else _ZH_WORDS, k=rng.randint(6, 40))
+        if i % 2:
+            text = ' '.join(words).capitalize() + f' (case {i}).'
+        else:
+            text = ''.join(words) + f'（第{i}例）。'
+        texts.append(text)
+    return texts
+
+
+def percentiles(samples):
+    """p50/p95/p99/平均/最大（毫秒），与 LatencyTracker 相同的取整方式"""
+    if not samples:
+        return {'p50': None, 'p95': None, 'p99': None, 'mean': None, 'max': None}
+    ordered = sorted(samples)
+
+    def pick(p):
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))] * 1000, 3)
+
+    return {'p50': pick(50), 'p95': pick(95), 'p99': pick(99),
+            'mean': round(sum(ordered) / len(ordered) * 1000, 3), 'max': round(ordered[-1] * 1000, 3)}
+
+
+class Driver:
+    """
+    在 Qt 事件循环中按并发窗口提交请求并记录每个请求的延迟
+
+    TranslatorManager 在缓存命中时会在提交过程中同步发出结果，因此提交期间收到的
+    未知请求 ID 归属于正在提交的请求。
+    """
+
+    def __init__(self, app, manager, concurrency):
+        self.app = app
+        self.manager = manager
+        self.concurrency = max(1, concurrency)
+        manager.request_ready.connect(self._on_ready)
+        manager.request_failed.connect(self._on_failed)
+        manager.batch_ready.connect(self._on_batch_ready)
+        self._reset([])
+
+    def _reset(self, tasks):
+        self.tasks = tasks  # [(submit 函数, 单位数)]
+        self.latencies = []
+        self.errors = 0
+        self.units = 0
+        self._next = 0
+        self._started = {}  # 请求 ID -> (开始时间, 单位数)
+        self._submitting = None  # 正在提交的请求的 (开始时间, 单位数)，同步完成后置为 None
+        self._in_submit = False
+        self._done = 0
+
+    def run(self, tasks):
+        """
+        执行任务列表
+
+        Args:
+            tasks: [(submit, units)]，submit() 提交请求并返回请求 ID 或批量 ID
+
+        Returns:
+            float: 总耗时（秒）
+        """
+        from PySide6.QtCore import QTimer
+
+        self._reset(tasks)
+        start = time.perf_counter()
+        QTimer.singleShot(0, self._fill)
+        # 每个场景单独计时，场景结束即停止，避免前一场景的超时在后续场景中途触发 quit()
+        timeout = QTimer()
+        timeout.setSingleShot(True)
+        timeout.timeout.connect(self.app.quit)
+        timeout.start(SCENARIO_TIMEOUT * 1000)
+        try:
+            self.app.exec()
+        finally:
+            timeout.stop()
+        if self._done < len(tasks):
+            raise RuntimeError(f"场景超时：完成 {self._done}/{len(tasks)}")
+        return time.perf_counter() - start
+
+    def _fill(self):
+        while self._next < len(self.tasks) and len(self._started) < self.concurrency:
+            submit, units = self.tasks[self._next]
+            self._next += 1
+            self._submitting = (time.perf_counter(), units)
+            self._in_submit = True
+            request_id = submit()
+            self._in_submit = False
+            if self._submitting is not None:
+                self._started[request_id] = self._submitting
+            self._submitting = None
+        if self._done == len(self.tasks):
+            self.app.quit()
+
+    def _take(self, request_id):
+        started = self._started.pop(request_id, None)
+        if started is None:
+            started, self._submitting = self._submitting, None
+        return started
+
+    def _complete(self, request_id, ok):
+        started = self._take(request_id)
+        if started is None:
+            return
+        self.latencies.append(time.perf_counter() - started[0])
+        self.units += started[1]
+        self.errors += not ok
+        self._done += 1
+        if not self._in_submit:
+            self._fill()
+
+    def _on_ready(self, request_id, result, action_type):
+        self._complete(request_id, True)
+
+    def _on_failed(self, request_id, error_msg):
+        self._complete(request_id, False)
+
+    def _on_batch_ready(self, batch_id, results):
+        self._complete(batch_id, all(result is not None for result in results))
+
+
+class Benchmark:
+    """按引擎运行各场景并汇总结果"""
+
+    def __init__(self, app, args, stub):
+        self.app = app
+        self.args = args
+        self.stub = stub
+
+    def make_manager(self, engine, stream=False):
+        """创建使用模拟服务的 TranslatorManager（不读写磁盘缓存和翻译记忆，不对冲）"""
+        from src.translator import TranslatorManager
+
+        api_config = {
+            'provider': 'openai' if self.args.provider == 'openai' else 'volcengine',
+            'api_key': 'benchmark',
+            'base_url': self.stub.base_url,
+            'model': 'stub-model',
+            'engine': engine,
+            'stream': stream,
+            'max_workers': self.args.concurrency,
+            'max_concurrency': self.args.concurrency,
+            'hedge_enabled': False,
+            'max_retries': 0,
+            'rate_limits': {},
+        }
+        general_config = {'cache_enabled': True, 'disk_cache_enabled': False, 'memory_enabled': False}
+        return TranslatorManager(api_config, general_config)
+
+    def close_manager(self, manager):
+        """关闭线程池/事件循环，并在下一轮事件循环中销毁 Qt 对象（避免退出时才回收）"""
+        manager.shutdown()
+        manager.deleteLater()
+
+    def measure(self, manager, driver, tasks):
+        """运行任务并返回延迟、吞吐量、缓存命中率和 API 调用统计"""
+        cache_before = manager.cache_stats()
+        stats_before = dict(manager.stats)
+        stub_before = self.stub.config.snapshot()
+        elapsed = driver.run(tasks)
+        cache_after = manager.cache_stats()
+        stub_after = self.stub.config.snapshot()
+
+        hits = cache_after['hits'] - cache_before['hits']
+        lookups = hits + cache_after['misses'] - cache_before['misses']
+        return {
+            'requests': len(tasks),
+            'segments': driver.units,
+            'errors': driver.errors,
+            'elapsed_s': round(elapsed, 3),
+            'latency_ms': percentiles(driver.latencies),
+            'throughput_rps': round(len(tasks) / elapsed, 3) if elapsed else None,
+            'segments_per_sec': round(driver.units / elapsed, 3) if elapsed else None,
+            'cache_hits': hits,
+            'cache_hit_rate': round(hits / lookups, 4) if lookups else 0.0,
+            'coalesced': manager.stats['coalesced'] - stats_before['coalesced'],
+            'api_calls': stub_after['requests'] - stub_before['requests'],
+            'completion_tokens': stub_after['completion_tokens'] - stub_before['completion_tokens'],
+        }
+
+    def run_engine(self, engine):
+        """在一种引擎上运行全部场景"""
+        args = self.args
+        corpus = make_corpus(args.requests, args.seed)
+        results = {}
+
+        # cold / warm：同一组文本先全部未命中，再全部命中内存缓存
+        manager = self.make_manager(engine)
+        driver = Driver(self.app, manager, args.concurrency)
+        tasks = [(lambda text=text: manager.translate(text, interactive=False), 1) for text in corpus]
+        if 'cold' in args.scenarios:
+            results['cold'] = self.measure(manager, driver, tasks)
+        if 'warm' in args.scenarios:
+            results['warm'] = self.measure(manager, driver, tasks)
+        self.close_manager(manager)
+
+        # mixed：按 Zipf 分布重复的请求（热门文本多次出现，部分与处理中的请求合并）
+        if 'mixed' in args.scenarios:
+            rng = random.Random(args.seed + 1)
+            pool = make_corpus(max(1, args.requests // 4), args.seed + 1)
+            weights = [1 / (rank + 1) for rank in range(len(pool))]
+            picks = rng.choices(pool, weights=weights, k=args.requests)
+            manager = self.make_manager(engine)
+            driver = Driver(self.app, manager, args.concurrency)
+            results['mixed'] = self.measure(
+                manager, driver, [(lambda text=text: manager.translate(text, interactive=False), 1) for text in picks])
+            self.close_manager(manager)
+
+        # stream：逐个发出的交互式流式请求，另外记录首个增量的延迟
+        if 'stream' in args.scenarios:
+            results['stream'] = self.run_stream(engine, make_corpus(args.stream_requests, args.seed + 2))
+
+        # batch：多段合并请求
+        if 'batch' in args.scenarios:
+            segments = make_corpus(args.batch_size * args.batches, args.seed + 3)
+            manager = self.make_manager(engine)
+            driver = Driver(self.app, manager, args.concurrency)
+            tasks = [(lambda chunk=segments[i:i + args.batch_size]: manager.translate_batch(chunk), args.batch_size)
+                     for i in range(0, len(segments), args.batch_size)]
+            results['batch'] = self.measure(manager, driver, tasks)
+            self.close_manager(manager)
+
+        # hotkey：快捷键触发后弹出窗口首次显示内容和显示最终结果的延迟（离屏渲染）
+        if 'hotkey' in args.scenarios and args.ui:
+            results['hotkey'] = self.run_hotkey(engine, make_corpus(args.stream_requests, args.seed + 4))
+        return results
+
+    def run_stream(self, engine, texts):
+        """流式场景：并发为 1，记录首个增量和完整结果的延迟"""
+        manager = self.make_manager(engine, stream=True)
+        driver = Driver(self.app, manager, 1)
+        first = []
+        state = {'start': None}
+
+        def on_partial(delta, action_type):
+            if state['start'] is not None:
+                first.append(time.perf_counter() - state['start'])
+                state['start'] = None
+
+        def submit(text):
+            state['start'] = time.perf_counter()
+            return manager.translate(text)
+
+        manager.translation_partial.connect(on_partial)
+        result = self.measure(manager, driver, [(lambda text=text: submit(text), 1) for text in texts])
+        result['first_update_ms'] = percentiles(first)
+        self.close_manager(manager)
+        return result
+
+    def run_hotkey(self, engine, texts):
+        """快捷键场景：与 ZDTransApp 相同的弹出窗口调用顺序，按文本框内容变化计时"""
+        from src.popup import PopupWindow
+
+        manager = self.make_manager(engine, stream=True)
+        driver = Driver(self.app, manager, 1)
+        popup = PopupWindow()
+        manager.translation_partial.connect(popup.show_partial_result)
+        manager.translation_ready.connect(popup.show_result)
+        first = []
+        state = {'start': None}
+
+        def on_text_changed():
+            if state['start'] is not None:
+                first.append(time.perf_counter() - state['start'])
+                state['start'] = None
+
+        def submit(text):
+            popup.show_loading('translate')
+            state['start'] = time.perf_counter()
+            return manager.translate(text)
+
+        popup.result_text.textChanged.connect(on_text_changed)
+        result = self.measure(manager, driver, [(lambda text=text: submit(text), 1) for text in texts])
+        result['first_update_ms'] = percentiles(first)
+        popup.hide()
+        self.close_manager(manager)
+        return result
+
+
+def git_revision():
+    """当前提交（不在 git 仓库中时为 None）"""
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL,
+                                       cwd=Path(__file__).resolve().parent, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def lookup(data, path):
+    """按 'a.b' 路径取值"""
+    for key in path.split('.'):
+        if not isinstance(data, dict) or key not in data:
+            return None
+        data = data[key]
+    return data
+
+
+def compare(base, current):
+    """打印两次结果中各场景关键指标的变化"""
+    print(f"\n与 {base['meta'].get('git_revision')}（{base['meta'].get('timestamp')}）比较：")
+    for engine, scenarios in current['engines'].items():
+        for name, result in scenarios.items():
+            base_result = lookup(base, f'engines.{engine}.{name}') or {}
+            for metric in COMPARE_METRICS:
+                old, new = lookup(base_result, metric), lookup(result, metric)
+                if old is None or new is None:
+                    continue
+                change = f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+                print(f"  {engine:8} {name:7} {metric:22} {old:>10} -> {new:>10}  {change}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.run', description='ZDTrans 端到端延迟基准测试')
+    parser.add_argument('--engine', choices=['thread', 'asyncio', 'both'], default='thread')
+    parser.add_argument('--provider', choices=['openai', 'volcengine'], default='volcengine',
+                        help='按哪个提供商的格式构建请求')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help=f"逗号分隔的场景（{', '.join(SCENARIOS)}）")
+    parser.add_argument('--requests', type=int, default=200, help='cold/warm/mixed 场景的请求数')
+    parser.add_argument('--stream-requests', type=int, default=20, help='stream/hotkey 场景的请求数')
+    parser.add_argument('--batch-size', type=int, default=20, help='每个合并请求的段落数')
+    parser.add_argument('--batches', type=int, default=10, help='合并请求的个数')
+    parser.add_argument('--concurrency', type=int, default=8, help='同时处理的请求数')
+    parser.add_argument('--latency', type=float, default=0.05, help='模拟服务的首字延迟（秒）')
+    parser.add_argument('--jitter', type=float, default=0.2, help='首字延迟的波动比例')
+    parser.add_argument('--token-rate', type=float, default=200.0, help='模拟服务的输出速率（token/秒）')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='模拟服务返回错误的概率')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--ui', action='store_true', help='创建离屏 QApplication 并运行 hotkey 场景')
+    parser.add_argument('-o', '--output', help='结果文件（默认 benchmarks/results/<时间>.json）')
+    parser.add_argument('--compare', help='与之前的结果文件比较')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        print(f"未知场景: {', '.join(sorted(unknown))}", file=sys.stderr)
+        return 2
+
+    if args.ui:
+        os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+        from PySide6.QtWidgets import QApplication
+        app = QApplication([sys.argv[0]])
+    else:
+        from PySide6.QtCore import QCoreApplication
+        app = QCoreApplication([sys.argv[0]])
+
+    stub_config = StubConfig(args.latency, args.jitter, args.token_rate, args.failure_rate, seed=args.seed)
+    stub = StubProvider(config=stub_config).start()
+    benchmark = Benchmark(app, args, stub)
+    engines = ['thread', 'asyncio'] if args.engine == 'both' else [args.engine]
+
+    # 翻译模块的请求日志用 print 输出，运行期间丢弃
+    stdout = sys.stdout
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'args': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+        },
+        'engines': {},
+    }
+    try:
+        for engine in engines:
+            print(f"运行 {engine} 引擎...", file=sys.stderr)
+            sys.stdout = open(os.devnull, 'w', encoding='utf-8')
+            try:
+                report['engines'][engine] = benchmark.run_engine(engine)
+            finally:
+                sys.stdout.close()
+                sys.stdout = stdout
+    finally:
+        stub.stop()
+    report['stub'] = stub_config.snapshot()
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{time.strftime('%Y%m%d-%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+
+    for engine, scenarios in report['engines'].items():
+        for name, result in scenarios.items():
+            latency = result['latency_ms']
+            extra = ''
+            if 'first_update_ms' in result:
+                extra = f"  首次更新 p50 {result['first_update_ms']['p50']} ms"
+            print(f"{engine:8} {name:7} p50 {latency['p50']:>9} ms  p95 {latency['p95']:>9} ms  "
+                  f"p99 {latency['p99']:>9} ms  {result['throughput_rps']:>8} req/s  "
+                  f"命中率 {result['cache_hit_rate']:.0%}  API {result['api_calls']}{extra}")
+    print(f"结果已写入 {output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare(json.load(f), report)
+    return 1 if any(result['errors'] for scenarios in report['engines'].values()
+                    for result in scenarios.values()) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
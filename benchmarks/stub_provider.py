@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+模拟 OpenAI 兼容的 chat/completions 服务（以及 DeepL 的 /v2/translate）
+按与真实提供商相同的协议（JSON 响应、SSE 流式、usage 字段、合并请求的 JSON 数组）返回确定性的结果，
+首字延迟、输出速率和失败率可配置，用于在没有付费 API 的情况下做端到端性能测试
+
+用法：
+    python -m benchmarks.stub_provider --port 8900 --latency 0.3 --token-rate 80
+    然后在 config.json 中设置 "base_url": "http://127.0.0.1:8900/v1"
+    （DeepL 设置 "provider": "deepl", "base_url": "http://127.0.0.1:8900"）
+"""
+
+import argparse
+import json
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+
+# 合并请求中的段落数组（build_batch_request 生成的 [{"id": 0, "text": ...}, ...]）
+_BATCH_ITEMS = re.compile(r'(\[\{"id": 0, .*\}\])\s*$', re.S)
+
+# 单段请求中原文之前的提示词结尾
+_PROMPT_END = '：\n\n'
+
+# DeepL 接受的目标语言代码
+DEEPL_TARGETS = {'AR', 'BG', 'CS', 'DA', 'DE', 'EL', 'EN-GB', 'EN-US', 'ES', 'ET', 'FI', 'FR', 'HU', 'ID', 'IT',
+                 'JA', 'KO', 'LT', 'LV', 'NB', 'NL', 'PL', 'PT-BR', 'PT-PT', 'RO', 'RU', 'SK', 'SL', 'SV', 'TR',
+                 'UK', 'ZH', 'ZH-HANS', 'ZH-HANT'}
+
+
+def stub_result(text, action_type='translate', target_lang=None):
+    """模拟的译文/润色结果（确定性，便于比较）；给出目标语言时写在标记中，如 '[译:ZH-HANS]'"""
+    mark = '译' if action_type == 'translate' else '润'
+    if target_lang:
+        mark = f"{mark}:{target_lang}"
+    return f"[{mark}] {text}"
+
+
+def count_tokens(text):
+    """粗略的 token 数（按 4 个字符一个 token，至少 1 个）"""
+    return max(1, len(text) // 4)
+
+
+class StubConfig:
+    """
+    模拟服务的行为参数
+
+    Attributes:
+        latency: 首字延迟（秒）
+        jitter: 首字延迟的随机波动比例（0.2 表示 ±20%）
+        token_rate: 输出速率（token/秒），0 表示立即返回全部内容
+        failure_rate: 返回错误的概率
+        failure_status: 错误状态码
+    """
+
+    def __init__(self, latency=0.2, jitter=0.2, token_rate=0.0, failure_rate=0.0, failure_status=503, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.token_rate = token_rate
+        self.failure_rate = failure_rate
+        self.failure_status = failure_status
+        self.random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {'requests': 0, 'stream_requests': 0, 'batch_requests': 0, 'failures': 0,
+                      'prompt_tokens': 0, 'completion_tokens': 0, 'deepl_requests': 0, 'deepl_texts': 0}
+
+    def first_token_delay(self):
+        with self._lock:
+            return max(0.0, self.latency * (1 + self.random.uniform(-self.jitter, self.jitter)))
+
+    def should_fail(self):
+        with self._lock:
+            return self.failure_rate > 0 and self.random.random() < self.failure_rate
+
+    def record(self, **counts):
+        with self._lock:
+            for key, value in counts.items():
+                self.stats[key] += value
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats)
+
+
+def build_reply(prompt):
+    """
+    根据提示词生成回复
+
+    Returns:
+        tuple: (回复文本, 是否为合并请求)
+    """
+    action_type = 'polish' if prompt.startswith('请润色') or '润色每一段' in prompt else 'translate'
+    match = _BATCH_ITEMS.search(prompt)
+    if match:
+        try:
+            items = json.loads(match.group(1))
+            return json.dumps([{'id': item['id'], 'text': stub_result(item['text'], action_type)}
+                               for item in items], ensure_ascii=False), True
+        except (ValueError, KeyError, TypeError):
+            pass
+    text = prompt.split(_PROMPT_END, 1)[1] if _PROMPT_END in prompt else prompt
+    return stub_result(text, action_type), False
+
+
+def parse_deepl_body(body, content_type):
+    """
+    解析 DeepL 请求体，JSON（text 为数组）和表单（多个 text 参数）两种格式都接受
+
+    Returns:
+        tuple: (文本列表, 目标语言)
+    """
+    if content_type.startswith('application/json'):
+        data = json.loads(body)
+        texts, target = data['text'], data['target_lang']
+    else:
+        form = parse_qs(body.decode('utf-8'))
+        texts, target = form['text'], form['target_lang'][0]
+    if isinstance(texts, str):
+        texts = [texts]
+    if not isinstance(texts, list) or not texts or not all(isinstance(text, str) for text in texts):
+        raise ValueError('text must be a non-empty list of strings')
+    return texts, target
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """chat/completions 和 DeepL /v2/translate 请求处理"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_HEAD(self):
+        # 连接预热和熔断探测
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_POST(self):
+        config = self.server.stub_config
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self.path.rstrip('/') == '/v2/translate':
+            self._translate_deepl(body)
+            return
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self._send_json(404, {'error': {'message': f'unknown path {self.path}'}})
+            return
+        try:
+            data = json.loads(body)
+            prompt = data['messages'][-1]['content']
+        except (ValueError, KeyError, IndexError, TypeError):
+            self._send_json(400, {'error': {'message': 'invalid request body'}})
+            return
+
+        delay = config.first_token_delay()
+        if config.should_fail():
+            time.sleep(delay)
+            config.record(requests=1, failures=1)
+            self._send_json(config.failure_status, {'error': {'message': 'stub failure'}})
+            return
+
+        reply, is_batch = build_reply(prompt)
+        usage = {'prompt_tokens': count_tokens(prompt), 'completion_tokens': count_tokens(reply)}
+        usage['total_tokens'] = usage['prompt_tokens'] + usage['completion_tokens']
+        stream = bool(data.get('stream'))
+        config.record(requests=1, stream_requests=int(stream), batch_requests=int(is_batch),
+                      prompt_tokens=usage['prompt_tokens'], completion_tokens=usage['completion_tokens'])
+
+        time.sleep(delay)
+        if stream:
+            include_usage = (data.get('stream_options') or {}).get('include_usage')
+            self._send_stream(reply, usage if include_usage else None, config.token_rate)
+        else:
+            if config.token_rate > 0:
+                time.sleep(usage['completion_tokens'] / config.token_rate)
+            self._send_json(200, {
+                'id': 'stub', 'object': 'chat.completion', 'model': data.get('model', 'stub'),
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': reply},
+                             'finish_reason': 'stop'}],
+                'usage': usage,
+            })
+
+    def _translate_deepl(self, body):
+        """DeepL /v2/translate：一次请求中的多段文本按顺序返回"""
+        config = self.server.stub_config
+        if not self.headers.get('Authorization', '').startswith('DeepL-Auth-Key '):
+            self._send_json(403, {'message': 'Authorization failed'})
+            return
+        try:
+            texts, target = parse_deepl_body(body, self.headers.get('Content-Type', ''))
+        except (ValueError, KeyError, IndexError, TypeError, UnicodeDecodeError):
+            self._send_json(400, {'message': 'invalid request body'})
+            return
+        if target.upper() not in DEEPL_TARGETS:
+            self._send_json(400, {'message': f"Value for 'target_lang' not supported: {target}"})
+            return
+
+        delay = config.first_token_delay()
+        if config.should_fail():
+            time.sleep(delay)
+            config.record(requests=1, failures=1)
+            self._send_json(config.failure_status, {'message': 'stub failure'})
+            return
+
+        config.record(requests=1, batch_requests=int(len(texts) > 1), deepl_requests=1, deepl_texts=len(texts))
+        time.sleep(delay)
+        self._send_json(200, {'translations': [
+            {'detected_source_language': 'EN', 'text': stub_result(text, target_lang=target.upper())}
+            for text in texts
+        ]})
+
+    def _send_json(self, status, payload):
+        raw = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def _send_stream(self, reply, usage, token_rate):
+        """按输出速率逐块发送 SSE（每块约 1 个 token）"""
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        interval = 1 / token_rate if token_rate > 0 else 0
+        for i in range(0, len(reply), 4):
+            self._send_event({'choices': [{'index': 0, 'delta': {'content': reply[i:i + 4]}}]})
+            if interval:
+                time.sleep(interval)
+        if usage is not None:
+            self._send_event({'choices': [], 'usage': usage})
+        self._send_chunk(b'data: [DONE]\n\n')
+        self.wfile.write(b'0\r\n\r\n')
+
+    def _send_event(self, payload):
+        self._send_chunk(f"data: {json.dumps(payload, ensure_ascii=False)}\n\n".encode('utf-8'))
+
+    def _send_chunk(self, raw):
+        self.wfile.write(b'%x\r\n%s\r\n' % (len(raw), raw))
+        self.wfile.flush()
+
+
+class StubServer(ThreadingHTTPServer):
+    """客户端取消请求（断开连接）是正常情况，不打印异常"""
+
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class StubProvider:
+    """在后台线程中运行的模拟服务"""
+
+    def __init__(self, port=0, config=None):
+        self.config = config or StubConfig()
+        self.server = StubServer(('127.0.0.1', port), StubHandler)
+        self.server.stub_config = self.config
+        self._thread = None
+
+    @property
+    def base_url(self):
+        """作为 api.base_url 使用的地址"""
+        return f"http://127.0.0.1:{self.server.server_port}/v1"
+
+    @property
+    def deepl_url(self):
+        """provider 为 deepl 时作为 api.base_url 使用的地址（不带 /v1）"""
+        return f"http://127.0.0.1:{self.server.server_port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name="stub-provider", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.stub_provider',
+                                     description='模拟 OpenAI 兼容的 chat/completions 服务和 DeepL 接口')
+    parser.add_argument('--port', type=int, default=8900)
+    parser.add_argument('--latency', type=float, default=0.2, help='首字延迟（秒）')
+    parser.add_argument('--jitter', type=float, default=0.2, help='首字延迟的波动比例')
+    parser.add_argument('--token-rate', type=float, default=0.0, help='输出速率（token/秒），0 表示不限')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='返回错误的概率')
+    parser.add_argument('--failure-status', type=int, default=503)
+    args = parser.parse_args(argv)
+
+    config = StubConfig(args.latency, args.jitter, args.token_rate, args.failure_rate, args.failure_status)
+    provider = StubProvider(args.port, config)
+    print(f"模拟服务已启动: {provider.base_url}")
+    try:
+        provider.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(json.dumps(config.snapshot(), ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -3,20 +3,23 @@ ZDTrans 主程序入口
 一个轻量级桌面翻译和文本润色工具
 """
 
+import os
 import sys
 from PySide6.QtWidgets import QApplication
-from PySide6.QtCore import Qt
+from PySide6.QtCore import Qt, QTimer
 
 from src.tray import TrayManager
 from src.hotkey import HotkeyManager
 from src.translator import TranslatorManager
 from src.popup import PopupWindow
 from src.settings import SettingsDialog
-from src.clipboard import ClipboardManager
+from src.clipboard import ClipboardManager, ClipboardWatcher, SelectionCapture
+from src.server import TranslationServer, DEFAULT_PORT, DEFAULT_QUEUE_SIZE
 from src.utils import load_config, save_config, setup_logging, check_first_run
 from src.permissions import request_accessibility_permission
 from src.main_window import MainWindow
 from src.theme import theme_manager
+from src.tracing import tracer, DEFAULT_MAX_FILES
 
 
 class ZDTransApp:
@@ -56,6 +59,12 @@ class ZDTransApp:
         self.clipboard_manager = None
         self.settings_dialog = None
         
+        # 链路追踪：每次快捷键触发到显示结果为一条记录
+        self._trace_id = 0
+        self._trace_open = False
+        self.configure_tracing(self.config.get('general', {}))
+        self.app.aboutToQuit.connect(lambda: tracer.flush('shutdown'))
+        
         self.init_components()
         
     def init_components(self):
@@ -111,21 +120,41 @@ class ZDTransApp:
         
         # 创建翻译管理器
         print("🌐 创建翻译管理器...")
-        self.translator_manager = TranslatorManager(self.config['api'])
+        self.translator_manager = TranslatorManager(self.config['api'], self.config.get('general', {}))
         self.translator_manager.translation_ready.connect(self.on_translation_ready)
+        self.translator_manager.translation_partial.connect(self.on_translation_partial)
+        self.translator_manager.translation_suggested.connect(self.on_translation_suggested)
         self.translator_manager.translation_error.connect(self.on_translation_error)
+        self.app.aboutToQuit.connect(self.translator_manager.shutdown)
         
         # 加载关键词配置
         trans_config = self.config.get('translation', {})
         keywords = trans_config.get('keywords', '')
         if keywords:
             self.translator_manager.set_keywords(keywords)
+        glossary_file = trans_config.get('glossary_file', '')
+        if glossary_file:
+            self.translator_manager.set_glossary_file(glossary_file)
         
         # 创建弹出窗口
         self.popup_window = PopupWindow()
         
         # 创建剪贴板管理器
         self.clipboard_manager = ClipboardManager()
+        self.clipboard_manager.configure(self.config.get('general', {}))
+        
+        # 在后台线程中获取选中文本，完成后继续翻译/润色
+        self.selection_capture = SelectionCapture(self.clipboard_manager)
+        self.selection_capture.captured.connect(self.on_selection_captured)
+        
+        # 创建剪贴板监听器（复制新文本时提前翻译，默认关闭）
+        self.clipboard_watcher = ClipboardWatcher(self.clipboard_manager, self.translator_manager.prefetch)
+        self.clipboard_watcher.configure(self.config.get('general', {}))
+        
+        # 本地 HTTP 翻译服务（默认关闭），与快捷键翻译共享缓存和请求队列
+        self.translation_server = TranslationServer(self.translator_manager)
+        self.app.aboutToQuit.connect(self.translation_server.stop)
+        self.configure_server(self.config.get('general', {}))
         
         print("\n" + "="*50)
         print("✅ ZDTrans 已启动，等待快捷键触发...")
@@ -167,7 +196,22 @@ class ZDTransApp:
         save_config(new_config)
         
         # 更新翻译管理器的配置
-        self.translator_manager.update_config(new_config['api'])
+        self.translator_manager.update_config(new_config['api'], new_config.get('general', {}))
+        
+        # 关键词和术语表可能已修改，重新编译术语匹配器
+        trans_config = new_config.get('translation', {})
+        self.translator_manager.set_keywords(trans_config.get('keywords', ''))
+        self.translator_manager.set_glossary_file(trans_config.get('glossary_file', ''))
+        
+        # 更新获取选中文本和剪贴板预取配置
+        self.clipboard_manager.configure(new_config.get('general', {}))
+        self.clipboard_watcher.configure(new_config.get('general', {}))
+        
+        # 启动/停止本地翻译服务
+        self.configure_server(new_config.get('general', {}))
+        
+        # 开启/关闭链路追踪
+        self.configure_tracing(new_config.get('general', {}))
         
         # 更新快捷键配置
         hotkey_config = new_config.get('hotkey', {})
@@ -178,45 +222,87 @@ class ZDTransApp:
         
         self.tray_manager.show_message("ZDTrans", "设置已保存")
         
+    def configure_server(self, general_config):
+        """按配置启动、重启或停止本地 HTTP 翻译服务"""
+        self.translation_server.configure(general_config.get('server_port', DEFAULT_PORT),
+                                          general_config.get('server_queue_size', DEFAULT_QUEUE_SIZE),
+                                          general_config.get('server_token', ''))
+        if not general_config.get('server_enabled', False):
+            self.translation_server.stop()
+        elif not self.translation_server.start():
+            self.tray_manager.show_message("ZDTrans", "本地翻译服务启动失败，端口可能被占用")
+            
+    def configure_tracing(self, general_config):
+        """按配置（或环境变量 ZDTRANS_TRACE=1）开启或关闭链路追踪，trace 文件写入 ~/.zdtrans/traces"""
+        enabled = general_config.get('trace_enabled', False) or os.environ.get('ZDTRANS_TRACE') == '1'
+        tracer.configure(enabled, max_files=general_config.get('trace_max_files', DEFAULT_MAX_FILES))
+        
+    def _begin_trace(self, action_type):
+        """开始记录一次快捷键触发，上一次尚未结束时记为被取代"""
+        if not tracer.enabled:
+            return
+        self._end_trace('superseded')
+        self._trace_id += 1
+        self._trace_open = True
+        tracer.begin('hotkey', self._trace_id, 'pipeline', action=action_type)
+        
+    def _end_trace(self, outcome):
+        """结束当前记录，并在本轮事件处理完成后写入文件"""
+        if not self._trace_open:
+            return
+        self._trace_open = False
+        tracer.end('hotkey', self._trace_id, 'pipeline', outcome=outcome)
+        if outcome != 'superseded':
+            QTimer.singleShot(0, lambda: tracer.flush('hotkey'))
+            
     def on_translate(self):
         """翻译快捷键触发"""
         print("翻译快捷键触发")
-        
-        # 获取选中的文本
-        selected_text = self.clipboard_manager.get_selected_text()
-        
-        if not selected_text or not selected_text.strip():
-            # 如果没有选中文本，显示主窗口
-            print("未选中文本，显示主窗口")
-            self.show_main_window()
-            return
-            
-        print(f"选中的文本: {selected_text}")
-        
-        # 显示加载状态
-        self.popup_window.show_loading('translate')
-        
-        # 开始翻译
-        self.translator_manager.translate(selected_text)
+        self._capture_selection('translate')
         
     def on_polish(self):
         """润色快捷键触发"""
         print("润色快捷键触发")
+        self._capture_selection('polish')
+        
+    def _capture_selection(self, action_type):
+        """
+        立即显示加载状态，在后台线程获取选中文本，完成后在 on_selection_captured 中继续
+        
+        正在获取时再次按下快捷键会合并到当前获取，不会叠加新的模拟复制。
+        """
+        if not self.selection_capture.busy:
+            self._begin_trace(action_type)
+            
+        # 显示加载状态（不激活弹出窗口，模拟的复制快捷键仍发到选中文本所在的程序）
+        self.popup_window.show_loading(action_type, activate=False)
+        self.main_window.reset_stream()
         
         # 获取选中的文本
-        selected_text = self.clipboard_manager.get_selected_text()
+        self.selection_capture.request(action_type)
         
+    def on_selection_captured(self, selected_text, action_type):
+        """选中文本获取完成"""
         if not selected_text or not selected_text.strip():
-            self.tray_manager.show_message("ZDTrans", "未选中文本", duration=2000)
+            self.popup_window.hide()
+            self._end_trace('no_selection')
+            if action_type == 'translate':
+                # 如果没有选中文本，显示主窗口
+                print("未选中文本，显示主窗口")
+                self.show_main_window()
+            else:
+                self.tray_manager.show_message("ZDTrans", "未选中文本", duration=2000)
             return
             
         print(f"选中的文本: {selected_text}")
+        self.popup_window.activateWindow()
         
-        # 显示加载状态
-        self.popup_window.show_loading('polish')
-        
-        # 开始润色
-        self.translator_manager.polish(selected_text)
+        # 开始翻译/润色
+        with tracer.span('translator.submit', 'app'):
+            if action_type == 'translate':
+                self.translator_manager.translate(selected_text)
+            else:
+                self.translator_manager.polish(selected_text)
         
     def on_translation_ready(self, result, action_type):
         """翻译/润色结果准备就绪"""
@@ -224,12 +310,24 @@ class ZDTransApp:
         self.popup_window.show_result(result, action_type)
         self.main_window.show_translation_result(result, action_type)
         self.main_window.show_translation_result(result, action_type)
+        self.main_window.update_cache_stats(self.translator_manager.cache_stats())
+        self._end_trace('ok')
+        
+    def on_translation_partial(self, delta, action_type):
+        """流式翻译/润色的增量文本"""
+        self.popup_window.show_partial_result(delta, action_type)
+        self.main_window.show_partial_translation(delta, action_type)
+        
+    def on_translation_suggested(self, translation, similarity, action_type):
+        """翻译记忆近似命中：在弹出窗口中先显示参考译文和相似度"""
+        self.popup_window.show_suggestion(translation, similarity, action_type)
         
     def on_translation_error(self, error_msg):
         """翻译/润色错误"""
         print(f"翻译错误: {error_msg}")
         self.popup_window.show_error(error_msg)
         self.main_window.show_translation_error(error_msg)
+        self._end_trace('error')
         
     def run(self):
         """运行应用程序"""
@@ -0,0 +1,366 @@
+"""
+asyncio 翻译引擎模块
+在专用线程中运行一个事件循环，用 aiohttp 在同一个循环上并发执行大量请求，
+适合批量任务；交互式翻译仍可选择线程池引擎
+"""
+
+import asyncio
+import json
+import threading
+import time
+
+try:
+    import aiohttp
+except ImportError:  # 可选依赖，未安装时只能使用线程池引擎
+    aiohttp = None
+
+from .http_pool import DEFAULT_IDLE_TIMEOUT
+from .providers import (build_chat_request, build_deepl_request, parse_chat_response, parse_deepl_response,
+                        parse_sse_line, STREAM_DONE, StreamAccumulator)
+from .rate_limit import estimate_prompt_tokens, estimate_request_tokens
+from .tracing import tracer
+from .resilience import ProviderError, backoff_delay, parse_retry_after
+
+
+# 默认最大并发请求数
+DEFAULT_MAX_CONCURRENCY = 16
+
+# 未提供健康状态时单个请求总超时（秒）
+REQUEST_TIMEOUT = 30
+
+
+def is_available():
+    """是否安装了 asyncio 引擎所需的 aiohttp"""
+    return aiohttp is not None
+
+
+class AsyncTranslatorJob:
+    """
+    提交到 asyncio 引擎的翻译任务
+
+    构造参数和回调与 TranslatorWorker 一致，取消时会取消事件循环中的协程，
+    正在进行的 HTTP 请求随之中止。
+    """
+
+    def __init__(self, text, action_type, api_config, keywords=None, session_pool=None, request_id=0,
+                 on_result=None, on_partial=None, on_error=None, request_builder=None, stream=None,
+                 health=None, target_lang=None):
+        self.request_id = request_id
+        # 请求构建函数，默认按提供商构建单段请求；批量请求时 text 为段落列表
+        self.request_builder = request_builder or build_chat_request
+        self.stream = api_config.get('stream', True) if stream is None else stream
+        self.on_result = on_result
+        self.on_partial = on_partial
+        self.on_error = on_error
+        self.text = text
+        self.action_type = action_type
+        self.api_config = api_config
+        self.keywords = keywords or []
+        self.target_lang = target_lang
+        self.health = health  # 共享的提供商健康状态（超时、重试、熔断）
+        self.emitted = False  # 已发出增量后不再重试
+        self.estimate = None  # 最近一次请求的 (预约 token, 估算输入 token, max_tokens)
+        self.future = None  # run_coroutine_threadsafe 返回的 Future
+        self._cancelled = False
+
+    def cancel(self):
+        """取消任务（可从其他线程调用）"""
+        self._cancelled = True
+        if self.future is not None:
+            self.future.cancel()
+
+    def is_cancelled(self):
+        """任务是否已取消"""
+        return self._cancelled
+
+
+class AsyncTranslationEngine:
+    """
+    asyncio 翻译引擎
+
+    所有请求共享一个事件循环和按 base_url 划分的 aiohttp 会话，
+    并发数由信号量控制。回调在事件循环线程中执行，调用方负责切回界面线程
+    （TranslatorManager 通过 Qt 信号完成）。
+    """
+
+    def __init__(self, max_concurrency=DEFAULT_MAX_CONCURRENCY, idle_timeout=DEFAULT_IDLE_TIMEOUT):
+        if aiohttp is None:
+            raise RuntimeError("asyncio 引擎需要安装 aiohttp")
+
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.idle_timeout = idle_timeout
+        self._sessions = {}  # base_url -> aiohttp.ClientSession，只在事件循环线程中访问
+
+        # 统计（只在事件循环线程中修改）
+        self._active = 0
+        self._waiting = 0
+        self._completed = 0
+        self._cancelled = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._last_wait = 0.0
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="zdtrans-asyncio", daemon=True)
+        self._thread.start()
+        self._semaphore = self._call_in_loop(self._create_semaphore).result()
+
+    def submit(self, job):
+        """提交任务，立即返回"""
+        job.future = asyncio.run_coroutine_threadsafe(self._run_job(job), self._loop)
+        return job
+
+    def set_concurrency(self, max_concurrency):
+        """调整并发上限（对之后开始等待的请求生效）"""
+        max_concurrency = max(1, int(max_concurrency))
+        if max_concurrency != self.max_concurrency:
+            self.max_concurrency = max_concurrency
+            self._semaphore = self._call_in_loop(self._create_semaphore).result()
+
+    def reset(self):
+        """关闭所有会话（API 地址变化时调用）"""
+        asyncio.run_coroutine_threadsafe(self._close_sessions(), self._loop)
+
+    def stats(self):
+        """获取引擎统计，键名与 WorkerPool.stats() 保持一致"""
+        started = self._completed + self._active
+        return {
+            'engine': 'asyncio',
+            'max_concurrency': self.max_concurrency,
+            'active': self._active,
+            'queue_depth': self._waiting,
+            'completed': self._completed,
+            'cancelled': self._cancelled,
+            'avg_wait_ms': self._wait_total / started * 1000 if started else 0.0,
+            'max_wait_ms': self._wait_max * 1000,
+            'last_wait_ms': self._last_wait * 1000
+        }
+
+    def shutdown(self, timeout=2.0):
+        """关闭会话并停止事件循环"""
+        try:
+            asyncio.run_coroutine_threadsafe(self._close_sessions(), self._loop).result(timeout)
+        except Exception:
+            pass
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout)
+
+    # ---- 以下方法在事件循环线程中执行 ----
+
+    def _call_in_loop(self, func):
+        """在事件循环线程中执行同步函数，返回 Future"""
+        async def _wrapper():
+            return func()
+        return asyncio.run_coroutine_threadsafe(_wrapper(), self._loop)
+
+    def _create_semaphore(self):
+        return asyncio.Semaphore(self.max_concurrency)
+
+    def _session(self, base_url):
+        """获取 base_url 对应的会话"""
+        session = self._sessions.get(base_url)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency, keepalive_timeout=self.idle_timeout)
+            session = aiohttp.ClientSession(connector=connector)
+            self._sessions[base_url] = session
+        return session
+
+    async def _close_sessions(self):
+        sessions = list(self._sessions.values())
+        self._sessions.clear()
+        for session in sessions:
+            await session.close()
+
+    async def _run_job(self, job):
+        """等待并发名额后执行任务，结果通过任务回调返回"""
+        enqueued_at = time.monotonic()
+        semaphore = self._semaphore
+        self._waiting += 1
+        acquired = False
+        # 协程在同一线程中交错执行，各阶段用按 request_id 关联的异步事件记录
+        tracer.begin('queue_wait', job.request_id, 'async')
+        try:
+            async with semaphore:
+                acquired = True
+                tracer.end('queue_wait', job.request_id, 'async')
+                self._waiting -= 1
+                wait = time.monotonic() - enqueued_at
+                self._wait_total += wait
+                self._wait_max = max(self._wait_max, wait)
+                self._last_wait = wait
+
+                self._active += 1
+                try:
+                    with tracer.async_span('worker.run', job.request_id, 'async'):
+                        result = await self._call_with_retries(job)
+                finally:
+                    self._active -= 1
+                    self._completed += 1
+
+            if not job.is_cancelled() and job.on_result:
+                job.on_result(job.request_id, result, job.action_type)
+        except asyncio.CancelledError:
+            self._cancelled += 1
+            raise
+        except Exception as e:
+            if not job.is_cancelled() and job.on_error:
+                job.on_error(job.request_id, str(e))
+        finally:
+            if not acquired:
+                self._waiting -= 1
+                tracer.end('queue_wait', job.request_id, 'async', cancelled=True)
+
+    async def _call_with_retries(self, job):
+        """调用API，可重试的错误按带抖动的指数退避重试，提供商熔断时直接失败"""
+        health = job.health
+        if health is None:
+            return await self._call_api(job)
+
+        transient = (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError)
+        attempt = 0
+        while True:
+            health.check(job.api_config)
+            try:
+                result = await self._call_api(job)
+            except asyncio.CancelledError:
+                health.release(job.api_config)
+                raise
+            except Exception as e:
+                retryable = health.record_failure(job.api_config, e, transient)
+                if not retryable or job.emitted or not health.should_retry(attempt):
+                    raise
+                delay = backoff_delay(attempt, getattr(e, 'retry_after', None))
+                print(f"请求 #{job.request_id} 失败，{delay:.1f} 秒后重试: {e}")
+                tracer.instant('retry', 'async', request_id=job.request_id, attempt=attempt, delay=delay)
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            health.record_success(job.api_config)
+            return result
+
+    def _client_timeout(self, job):
+        """按健康状态中的自适应超时构造 aiohttp 超时"""
+        if job.health is None:
+            return aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+        connect, read = job.health.timeouts(job.api_config)
+        return aiohttp.ClientTimeout(sock_connect=connect, sock_read=read)
+
+    def _emit_partial(self, job, delta):
+        """发出流式增量"""
+        job.emitted = True
+        if job.on_partial:
+            job.on_partial(job.request_id, delta, job.action_type)
+
+    async def _acquire_budget(self, job, data):
+        """估算请求的 token 数，按提供商的 RPM/TPM 限额排队等待"""
+        prompt_tokens = estimate_prompt_tokens(data)
+        reserved = estimate_request_tokens(data, prompt_tokens)
+        job.estimate = (reserved, prompt_tokens, data.get('max_tokens'))
+        if job.health is not None:
+            with tracer.async_span('rate_limit.wait', job.request_id, 'async', tokens=reserved):
+                try:
+                    wait = await job.health.limiter.acquire_async(job.api_config, reserved)
+                except asyncio.CancelledError:
+                    job.health.limiter.release(job.api_config, reserved)
+                    raise
+            if wait:
+                print(f"请求 #{job.request_id} 限流排队 {wait * 1000:.0f} ms")
+
+    def _record_usage(self, job, usage):
+        """对比估算与响应中的实际 token 用量"""
+        if usage and job.health is not None and job.estimate is not None:
+            job.health.record_usage(job.api_config, job.request_id, job.estimate, usage)
+
+    async def _check_response(self, job, response, error_prefix):
+        """根据响应调整限流，非 200 时抛出 ProviderError"""
+        if job.health is not None:
+            job.health.limiter.observe(job.api_config, response.status, response.headers)
+        if response.status != 200:
+            raise ProviderError(f"{error_prefix}: {response.status} - {await response.text()}",
+                                response.status, parse_retry_after(response.headers.get('Retry-After')))
+
+    async def _call_deepl(self, job):
+        """调用 DeepL /v2/translate，批量请求的结果以 JSON 字符串数组返回"""
+        texts = job.text if isinstance(job.text, list) else [job.text]
+        base_url, headers, data, error_prefix = build_deepl_request(
+            job.api_config, texts, job.action_type, job.keywords, job.target_lang
+        )
+        await self._acquire_budget(job, data)
+
+        start = time.monotonic()
+        # 连接 + 发送 + 服务端处理，直到收到响应头
+        with tracer.async_span('http.request', job.request_id, 'async', path='/v2/translate') as span:
+            response = await self._session(base_url).post(
+                f'{base_url}/v2/translate',
+                headers=headers,
+                json=data,
+                timeout=self._client_timeout(job)
+            )
+            span.set(status=response.status)
+        async with response:
+            await self._check_response(job, response, error_prefix)
+            with tracer.async_span('http.read', job.request_id, 'async'):
+                results = parse_deepl_response(await response.json(content_type=None))
+        if job.health is not None:
+            job.health.record_latency(job.api_config, time.monotonic() - start)
+
+        if isinstance(job.text, list):
+            return json.dumps(results, ensure_ascii=False)
+        return results[0]
+
+    async def _call_api(self, job):
+        """发送 chat/completions 请求，流式模式下边接收边回调增量"""
+        if job.api_config.get('provider') == 'deepl':
+            return await self._call_deepl(job)
+
+        with tracer.span('build_request', 'async', request_id=job.request_id):
+            base_url, headers, data, error_prefix = job.request_builder(
+                job.api_config, job.text, job.action_type, job.keywords, job.target_lang
+            )
+        stream = job.stream
+        if stream:
+            # 要求在流末尾返回 usage，用于核对 token 估算
+            data = dict(data, stream=True, stream_options={'include_usage': True})
+        await self._acquire_budget(job, data)
+
+        start = time.monotonic()
+        session = self._session(base_url)
+        with tracer.async_span('http.request', job.request_id, 'async', path='/chat/completions') as span:
+            response = await session.post(
+                f'{base_url}/chat/completions',
+                headers=headers,
+                json=data,
+                timeout=self._client_timeout(job)
+            )
+            span.set(status=response.status)
+        async with response:
+            await self._check_response(job, response, error_prefix)
+
+            # 服务端可能忽略 stream 参数，直接返回完整 JSON
+            if not stream or 'text/event-stream' not in response.headers.get('Content-Type', ''):
+                with tracer.async_span('http.read', job.request_id, 'async'):
+                    result = await response.json(content_type=None)
+                if job.health is not None:
+                    job.health.record_latency(job.api_config, time.monotonic() - start)
+                self._record_usage(job, result.get('usage'))
+                return parse_chat_response(result)
+
+            accumulator = StreamAccumulator(start)
+            usage = {}
+            with tracer.async_span('http.stream', job.request_id, 'async'):
+                async for raw_line in response.content:
+                    delta = parse_sse_line(raw_line.decode('utf-8').strip(), usage)
+                    if delta is STREAM_DONE:
+                        break
+                    if delta:
+                        pending = accumulator.add(delta)
+                        if pending:
+                            self._emit_partial(job, pending)
+
+            pending = accumulator.flush()
+            if pending:
+                self._emit_partial(job, pending)
+            if job.health is not None and accumulator.first_token is not None:
+                job.health.record_latency(job.api_config, accumulator.first_token)
+            self._record_usage(job, usage)
+            return accumulator.text()
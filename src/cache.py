@@ -0,0 +1,182 @@
+"""
+翻译缓存模块
+带容量上限（按字节计）、按操作类型过期时间和命中统计的 LRU 缓存
+"""
+
+import hashlib
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+
+# 默认缓存参数
+DEFAULT_MAX_BYTES = 4 * 1024 * 1024
+DEFAULT_TTL = {
+    'translate': 7 * 24 * 3600,  # 翻译结果较稳定，保留一周
+    'polish': 24 * 3600  # 润色结果保留一天
+}
+
+# 每个条目除键值文本外的估算开销（字节）
+ENTRY_OVERHEAD = 100
+
+
+def normalize_text(text):
+    """
+    规范化待处理文本，使仅有空白差异的选区命中同一缓存
+
+    统一 Unicode 形式和换行符，去掉首尾及行尾空白，保留段落结构。
+    """
+    text = unicodedata.normalize('NFC', text).replace('\r\n', '\n').replace('\r', '\n')
+    return '\n'.join(line.rstrip() for line in text.strip().split('\n'))
+
+
+def make_cache_key(provider, model, action_type, keywords, text, target_lang=None):
+    """
+    生成紧凑的缓存键
+
+    Args:
+        provider: API 提供商
+        model: 模型名称
+        action_type: 'translate' 或 'polish'
+        keywords: 关键词列表
+        text: 原文
+        target_lang: 目标语言（翻译时）
+
+    Returns:
+        str: 32 位十六进制摘要
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for part in (provider or '', model or '', action_type, target_lang or '', ','.join(keywords or [])):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\x00')
+    digest.update(normalize_text(text).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class TranslationCache:
+    """
+    线程安全的 LRU + TTL 翻译缓存
+
+    总占用超过 max_bytes 时从最久未使用的条目开始淘汰；
+    条目按操作类型设置过期时间，过期后在读取时删除。
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, ttl=None, enabled=True):
+        self.max_bytes = max_bytes
+        self.ttl = dict(DEFAULT_TTL, **(ttl or {}))
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (value, expires_at, size)
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def get(self, key):
+        """
+        读取缓存
+
+        Returns:
+            str: 缓存的结果，未命中、已过期或缓存关闭时返回 None
+        """
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+
+            value, expires_at, size = entry
+            if expires_at is not None and time.monotonic() >= expires_at:
+                self._remove(key)
+                self._expirations += 1
+                self._misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def put(self, key, value, action_type='translate'):
+        """写入缓存，必要时淘汰最久未使用的条目"""
+        if not self.enabled:
+            return
+
+        size = len(key) + len(value.encode('utf-8')) + ENTRY_OVERHEAD
+        if size > self.max_bytes:
+            # 单条超过整个预算的结果不缓存
+            return
+
+        ttl = self.ttl.get(action_type)
+        expires_at = time.monotonic() + ttl if ttl else None
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, expires_at, size)
+            self._bytes += size
+            self._evict()
+
+    def configure(self, enabled=None, max_bytes=None, ttl=None):
+        """更新缓存参数，关闭缓存时同时清空已有内容"""
+        with self._lock:
+            if max_bytes is not None:
+                self.max_bytes = max_bytes
+            if ttl is not None:
+                self.ttl = dict(DEFAULT_TTL, **ttl)
+            if enabled is not None:
+                self.enabled = enabled
+            if not self.enabled:
+                self._entries.clear()
+                self._bytes = 0
+            self._evict()
+
+    def clear(self):
+        """清空缓存（统计数据保留）"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """
+        获取缓存统计
+
+        Returns:
+            dict: 命中、未命中、淘汰、过期次数，以及条目数和占用字节
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'enabled': self.enabled,
+                'hits': self._hits,
+                'misses': self._misses,
+                'evictions': self._evictions,
+                'expirations': self._expirations,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hit_rate': self._hits / lookups if lookups else 0.0
+            }
+
+    def format_stats(self):
+        """格式化统计信息，用于日志输出"""
+        s = self.stats()
+        return (f"命中 {s['hits']} / 未命中 {s['misses']} "
+                f"(命中率 {s['hit_rate']:.0%})，淘汰 {s['evictions']}，过期 {s['expirations']}，"
+                f"{s['entries']} 条 / {s['bytes'] / 1024:.1f} KB")
+
+    def _remove(self, key):
+        """删除条目（调用方需持有锁）"""
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def _evict(self):
+        """淘汰最久未使用的条目直到满足容量上限（调用方需持有锁）"""
+        while self._bytes > self.max_bytes and self._entries:
+            _, (_, _, size) = self._entries.popitem(last=False)
+            self._bytes -= size
+            self._evictions += 1
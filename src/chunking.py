@@ -0,0 +1,174 @@
+"""
+长文本分块模块
+按段落、句子边界（兼顾中日韩文和拉丁文标点）把长文本切成适合模型上下文窗口的块，
+并在翻译后按原顺序拼接
+"""
+
+import re
+
+
+# 常见模型的上下文窗口（token），模型名中带 32k/128k 等后缀时按后缀计算
+MODEL_CONTEXT_TOKENS = {
+    'gpt-3.5-turbo': 16385,
+    'gpt-4': 8192,
+    'gpt-4o': 128000,
+    'gpt-4o-mini': 128000,
+}
+DEFAULT_CONTEXT_TOKENS = 8192
+
+# 单次请求输出 token 上限，多数模型默认为 4k
+MAX_OUTPUT_TOKENS = 4096
+
+# 为提示词和关键词预留的 token
+PROMPT_RESERVE_TOKENS = 512
+
+# 默认每块最大字符数：块越小并行度越高，单块也不容易超时
+DEFAULT_CHUNK_MAX_CHARS = 2000
+
+# 段落分隔（换行及其两侧空白）
+_PARAGRAPH_BREAK = re.compile(r'(\s*\n\s*)')
+
+# 句子分隔：中日韩句末标点后可直接断开，拉丁文句末标点后须有空白
+_SENTENCE_BREAK = re.compile(r'((?<=[。！？；…])\s*|(?<=[.!?;])\s+)')
+
+# 单句过长时优先在空白处硬切
+_WHITESPACE = re.compile(r'\s+')
+
+
+def context_window(model):
+    """根据模型名估算上下文窗口大小（token）"""
+    model = (model or '').lower()
+    if model in MODEL_CONTEXT_TOKENS:
+        return MODEL_CONTEXT_TOKENS[model]
+    match = re.search(r'(\d+)k\b', model)
+    if match:
+        return int(match.group(1)) * 1024
+    return DEFAULT_CONTEXT_TOKENS
+
+
+def chunk_char_limit(model, max_chars=DEFAULT_CHUNK_MAX_CHARS):
+    """
+    计算每块的最大字符数
+
+    原文和译文都要放进上下文窗口，译文还受单次输出上限约束；
+    中文约 1 字 1 token，按字符数等于 token 数保守估计。
+    """
+    tokens = min((context_window(model) - PROMPT_RESERVE_TOKENS) // 2, MAX_OUTPUT_TOKENS)
+    return max(1, min(tokens, max_chars))
+
+
+def is_cjk(char):
+    """是否为中日韩文字或全角标点"""
+    code = ord(char)
+    return (0x2E80 <= code <= 0x9FFF or 0xAC00 <= code <= 0xD7AF
+            or 0xF900 <= code <= 0xFAFF or 0xFF00 <= code <= 0xFFEF)
+
+
+def _split_units(text, max_chars):
+    """
+    切成不超过 max_chars 的最小单元
+
+    Returns:
+        list: [(单元文本, 与前一单元之间的原始分隔符)]
+    """
+    units = []
+    parts = _PARAGRAPH_BREAK.split(text)
+    separator = ''
+    for i, paragraph in enumerate(parts):
+        if i % 2:
+            separator = paragraph
+            continue
+        if not paragraph:
+            continue
+        if len(paragraph) <= max_chars:
+            units.append((paragraph, separator))
+            separator = ''
+            continue
+
+        # 段落过长时按句子切分，单句仍过长时按长度硬切
+        sentences = _SENTENCE_BREAK.split(paragraph)
+        for j, sentence in enumerate(sentences):
+            if j % 2:
+                separator = sentence
+                continue
+            for k, (piece, gap) in enumerate(_hard_split(sentence, max_chars)):
+                units.append((piece, separator if k == 0 else gap))
+            separator = ''
+    return units
+
+
+def _hard_split(sentence, max_chars):
+    """
+    按长度切分过长的句子，尽量在单词之间的空白处切开（拉丁文在词中切开后，拼接时会多出空格）
+
+    Returns:
+        list: [(片段, 与前一片段之间的空白)]
+    """
+    pieces = []
+    gap = ''
+    while len(sentence) > max_chars:
+        last = None
+        for last in _WHITESPACE.finditer(sentence, 1, max_chars + 1):
+            pass
+        if last is None:
+            pieces.append((sentence[:max_chars], gap))
+            gap, sentence = '', sentence[max_chars:]
+        else:
+            pieces.append((sentence[:last.start()], gap))
+            gap, sentence = last.group(), sentence[last.end():]
+    if sentence:
+        pieces.append((sentence, gap))
+    return pieces
+
+
+def split_text(text, max_chars):
+    """
+    将长文本切成块，尽量在段落边界切分，其次在句子边界
+
+    Args:
+        text: 原文
+        max_chars: 每块最大字符数
+
+    Returns:
+        tuple: (块列表, 分隔符列表)，分隔符列表比块列表少一个元素，
+               第 i 个分隔符为原文中第 i 块与第 i+1 块之间的空白
+    """
+    text = text.strip()
+    if len(text) <= max_chars:
+        return [text], []
+
+    chunks, separators = [], []
+    current = ''
+    for unit, separator in _split_units(text, max_chars):
+        if current and len(current) + len(separator) + len(unit) > max_chars:
+            chunks.append(current)
+            separators.append(separator)
+            current = unit
+        else:
+            current = current + separator + unit if current else unit
+    if current:
+        chunks.append(current)
+    return chunks, separators
+
+
+def join_chunks(results, separators):
+    """
+    按原顺序拼接各块的结果
+
+    原文在换行处切分时保留换行；在句中切分时，两侧都是中日韩文字则直接相连，否则补一个空格。
+    """
+    parts = [results[0]] if results else []
+    for separator, result in zip(separators, results[1:]):
+        parts.append(joiner(separator, parts[-1], result))
+        parts.append(result)
+    return ''.join(parts)
+
+
+def joiner(separator, left, right):
+    """计算两块结果之间的连接符"""
+    newlines = separator.count('\n')
+    if newlines:
+        return '\n\n' if newlines > 1 else '\n'
+    if left and right and is_cjk(left[-1]) and is_cjk(right[0]):
+        return ''
+    return ' '
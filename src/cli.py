@@ -0,0 +1,302 @@
+"""
+命令行批量翻译模块
+不启动托盘、快捷键和窗口，使用与桌面程序相同的配置、关键词和缓存翻译/润色文件或标准输入，
+按原文顺序流式输出结果
+
+用法：
+    python -m src.cli translate input.txt -o output.txt -j 8
+    cat input.txt | python -m src.cli polish
+"""
+
+import argparse
+import logging
+import os
+import re
+import signal
+import sys
+import time
+
+from PySide6.QtCore import QCoreApplication, QObject, QTimer
+
+from .translator import TranslatorManager
+from .utils import load_config
+
+
+# 退出码：全部成功 / 有段落失败 / 参数或输入错误
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+
+# 默认同时处理的段落数
+DEFAULT_JOBS = 4
+
+# 段落分隔：空行（默认）或换行；分隔符原样保留在输出中
+_SEPARATORS = {
+    'paragraph': re.compile(r'(\n[ \t\r\f\v]*\n\s*)'),
+    'line': re.compile(r'(\n)'),
+}
+
+# 段落首尾的空白（提交时去掉，输出时原样补回）
+_EDGES = re.compile(r'^(\s*)(.*?)(\s*)$', re.S)
+
+# 输出不是终端时，每完成该比例输出一行进度
+PROGRESS_STEP = 0.1
+
+
+def split_segments(text, mode='paragraph'):
+    """
+    把输入拆成段落
+
+    Returns:
+        list: 原文片段与分隔符交替的列表（下标为偶数的是段落），拼接后与输入完全相同
+    """
+    if mode == 'none':
+        return [text]
+    return _SEPARATORS[mode].split(text)
+
+
+class BatchRunner(QObject):
+    """
+    命令行批量任务
+
+    最多同时提交 jobs 个段落（与线程池/asyncio 并发数一致），每段完成后按原文顺序
+    输出已连续完成的前缀；失败的段落输出原文并记录错误。
+    """
+
+    def __init__(self, manager, pieces, action_type, output, jobs=DEFAULT_JOBS, progress=None):
+        """
+        Args:
+            manager: TranslatorManager 实例
+            pieces: split_segments() 的结果
+            action_type: 'translate' 或 'polish'
+            output: 输出流
+            jobs: 同时处理的段落数
+            progress: 进度输出流（None 表示不显示进度）
+        """
+        super().__init__()
+        self.manager = manager
+        self.pieces = pieces
+        self.action_type = action_type
+        self.output = output
+        self.jobs = max(1, jobs)
+        self.progress = progress
+        self._progress_tty = progress is not None and progress.isatty()
+        self._progress_mark = 0  # 非终端输出时已报告到的进度比例
+
+        # 需要调用 API 的段落下标（空白段落原样输出）
+        self.pending = [i for i in range(0, len(pieces), 2) if pieces[i].strip()]
+        self.total = len(self.pending)
+        self.results = {}  # 片段下标 -> 输出文本
+        self.errors = []  # [(段落序号, 错误信息)]
+        self.completed = 0
+        self._next_pending = 0
+        self._next_output = 0
+        self._requests = {}  # 请求 ID -> 片段下标
+        self._submitting = None  # 正在提交的片段下标（缓存命中时结果在提交过程中同步返回）
+        self._start = time.perf_counter()
+
+        manager.request_ready.connect(self._on_ready)
+        manager.request_failed.connect(self._on_failed)
+
+    def start(self):
+        """提交第一批段落"""
+        for i in range(0, len(self.pieces), 2):
+            if not self.pieces[i].strip():
+                self.results[i] = self.pieces[i]
+        self._fill()
+
+    def _fill(self):
+        """补充提交段落，使处理中的段落数保持在 jobs 以内"""
+        while self._next_pending < self.total and len(self._requests) < self.jobs:
+            index = self.pending[self._next_pending]
+            self._next_pending += 1
+            self._submitting = index
+            process = self.manager.translate if self.action_type == 'translate' else self.manager.polish
+            request_id = process(self.pieces[index].strip(), interactive=False)
+            self._submitting = None
+            if index not in self.results:
+                self._requests[request_id] = index
+        self._flush()
+        if self.completed == self.total:
+            self._finish()
+
+    def _index(self, request_id):
+        """请求对应的片段下标"""
+        index = self._requests.pop(request_id, None)
+        return self._submitting if index is None else index
+
+    def _on_ready(self, request_id, result, action_type):
+        """段落完成"""
+        index = self._index(request_id)
+        if index is None:
+            return
+        self._complete(index, result)
+
+    def _on_failed(self, request_id, error_msg):
+        """段落失败：输出原文，记录错误"""
+        index = self._index(request_id)
+        if index is None:
+            return
+        self.errors.append((index // 2 + 1, error_msg))
+        print(f"第 {index // 2 + 1} 段失败: {error_msg}", file=sys.stderr)
+        self._complete(index, self.pieces[index])
+
+    def _complete(self, index, text):
+        """记录结果，输出已完成的前缀并补充提交"""
+        lead, _, trail = _EDGES.match(self.pieces[index]).groups()
+        self.results[index] = lead + text.strip() + trail
+        self.completed += 1
+        self._report()
+        if self._submitting is None:
+            self._fill()
+
+    def _flush(self):
+        """按原文顺序输出连续完成的段落（连同其后的分隔符）"""
+        while self._next_output < len(self.pieces):
+            index = self._next_output
+            if index % 2 == 0:
+                if index not in self.results:
+                    break
+                self.output.write(self.results.pop(index))
+            else:
+                self.output.write(self.pieces[index])
+            self._next_output += 1
+        self.output.flush()
+
+    def _report(self):
+        """输出进度"""
+        if self.progress is None:
+            return
+        if not self._progress_tty:
+            if self.completed < self.total and self.completed / self.total < self._progress_mark + PROGRESS_STEP:
+                return
+            self._progress_mark = self.completed / self.total
+        elapsed = time.perf_counter() - self._start
+        failed = f"，失败 {len(self.errors)}" if self.errors else ""
+        line = f"已完成 {self.completed}/{self.total} 段{failed}，用时 {elapsed:.1f} 秒"
+        self.progress.write(f"\r{line}" if self._progress_tty else f"{line}\n")
+        self.progress.flush()
+
+    def _finish(self):
+        """全部完成，退出事件循环"""
+        if self._progress_tty and self.total:
+            self.progress.write("\n")
+        QCoreApplication.instance().quit()
+
+    def summary(self):
+        """段落数、失败数、缓存命中、合并与原样返回的段落数和耗时"""
+        stats = self.manager.request_stats()
+        cache = self.manager.cache_stats()
+        return {
+            'segments': self.total,
+            'failed': len(self.errors),
+            'cache_hits': cache['hits'] + cache.get('disk', {}).get('hits', 0),
+            'coalesced': stats['coalesced'],
+            'passthrough': stats['passthrough'],
+            'elapsed': time.perf_counter() - self._start,
+        }
+
+
+def build_parser():
+    """命令行参数"""
+    parser = argparse.ArgumentParser(
+        prog='python -m src.cli',
+        description='ZDTrans 命令行批量翻译/润色（使用桌面程序的配置、关键词和缓存）'
+    )
+    parser.add_argument('action', choices=['translate', 'polish'], help='翻译或润色')
+    parser.add_argument('input', nargs='?', default='-', help='输入文件（UTF-8），省略或 - 表示标准输入')
+    parser.add_argument('-o', '--output', help='输出文件，默认输出到标准输出')
+    parser.add_argument('-j', '--jobs', type=int, default=DEFAULT_JOBS,
+                        help=f'同时处理的段落数（默认 {DEFAULT_JOBS}）')
+    parser.add_argument('--split', choices=['paragraph', 'line', 'none'], default='paragraph',
+                        help='按空行（默认）、按行拆分段落，或整个输入作为一段')
+    parser.add_argument('--to', dest='target_lang', help='目标语言（如 en、zh、ja），默认使用配置')
+    parser.add_argument('--engine', choices=['thread', 'asyncio'], help='请求执行引擎，默认使用配置')
+    parser.add_argument('--no-cache', action='store_true', help='不读写缓存和翻译记忆')
+    parser.add_argument('-q', '--quiet', action='store_true', help='不显示进度和汇总')
+    parser.add_argument('-v', '--verbose', action='store_true', help='把请求日志输出到标准错误')
+    return parser
+
+
+def main(argv=None):
+    """
+    命令行入口
+
+    Returns:
+        int: 退出码
+    """
+    args = build_parser().parse_args(argv)
+    if args.jobs < 1:
+        print("--jobs 必须大于 0", file=sys.stderr)
+        return EXIT_USAGE
+
+    try:
+        if args.input == '-':
+            text = sys.stdin.read()
+        else:
+            with open(args.input, encoding='utf-8-sig') as f:
+                text = f.read()
+    except (OSError, UnicodeDecodeError) as e:
+        print(f"读取输入失败: {e}", file=sys.stderr)
+        return EXIT_USAGE
+
+    try:
+        output = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    except OSError as e:
+        print(f"打开输出文件失败: {e}", file=sys.stderr)
+        return EXIT_USAGE
+
+    # 翻译模块的日志用 print 输出，不能混进标准输出的结果中
+    stdout = sys.stdout
+    devnull = None if args.verbose else open(os.devnull, 'w', encoding='utf-8')
+    sys.stdout = devnull or sys.stderr
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, stream=sys.stderr,
+                        format='%(levelname)s - %(message)s')
+    signal.signal(signal.SIGINT, signal.SIG_DFL)  # Ctrl+C 直接退出
+
+    config = load_config()
+    api_config = dict(config['api'])
+    general_config = dict(config.get('general', {}))
+    # 并发数同时作为线程池大小和 asyncio 并发上限
+    api_config['max_workers'] = max(args.jobs, api_config.get('max_workers', 0))
+    api_config['max_concurrency'] = max(args.jobs, api_config.get('max_concurrency', 0))
+    api_config['stream'] = False
+    if args.target_lang:
+        api_config['target_lang'] = args.target_lang
+    if args.engine:
+        api_config['engine'] = args.engine
+    if args.no_cache:
+        general_config['cache_enabled'] = False
+
+    app = QCoreApplication.instance() or QCoreApplication([sys.argv[0]])
+    manager = TranslatorManager(api_config, general_config)
+    trans_config = config.get('translation', {})
+    if trans_config.get('keywords'):
+        manager.set_keywords(trans_config['keywords'])
+    if trans_config.get('glossary_file'):
+        manager.set_glossary_file(trans_config['glossary_file'])
+
+    progress = None if args.quiet else sys.stderr
+    runner = BatchRunner(manager, split_segments(text, args.split), args.action, output, args.jobs, progress)
+    QTimer.singleShot(0, runner.start)
+    try:
+        app.exec()
+        # 关闭前统计：shutdown() 会关闭并移除磁盘缓存
+        summary = runner.summary()
+    finally:
+        manager.shutdown()
+        if output is not stdout:
+            output.close()
+        sys.stdout = stdout
+        if devnull is not None:
+            devnull.close()
+
+    if not args.quiet:
+        print(f"共 {summary['segments']} 段，失败 {summary['failed']} 段，缓存命中 {summary['cache_hits']} 段，"
+              f"合并 {summary['coalesced']} 段，无需处理 {summary['passthrough']} 段，"
+              f"用时 {summary['elapsed']:.1f} 秒", file=sys.stderr)
+    return EXIT_FAILED if runner.errors else EXIT_OK
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,75 +1,372 @@
 """
 剪贴板操作模块
-负责获取选中文本和剪贴板管理
+负责获取选中文本（在后台线程中进行）和剪贴板管理，以及监听剪贴板变化触发预取
 """
 
-import pyperclip
+import platform
+import threading
 import time
-from pynput.keyboard import Key, Controller
+
+import pyperclip
+from PySide6.QtCore import QObject, QTimer, Signal
+from PySide6.QtGui import QGuiApplication
+
+from .latency import LatencyTracker
+from .tracing import tracer
+
+try:
+    from pynput.keyboard import Key, Controller
+except ImportError:  # 没有图形环境（如无 X 连接的 Linux）时无法模拟按键，只能传入模拟键盘
+    Key = Controller = None
+
+
+# 获取选中文本时轮询剪贴板的间隔（秒）：从 POLL_INITIAL 开始每次乘以 POLL_BACKOFF，不超过 POLL_MAX
+POLL_INITIAL = 0.005
+POLL_BACKOFF = 1.5
+POLL_MAX = 0.02
+
+# 模拟复制后等待剪贴板更新的最长时间（毫秒）
+DEFAULT_CAPTURE_TIMEOUT_MS = 500
+
+# 自适应等待时间：最近复制延迟 p95 的 CAPTURE_FACTOR 倍，不低于 MIN_CAPTURE_TIMEOUT_MS；
+# 样本少于 CAPTURE_MIN_SAMPLES 时使用最长时间
+CAPTURE_FACTOR = 3
+MIN_CAPTURE_TIMEOUT_MS = 60
+CAPTURE_MIN_SAMPLES = 5
+CAPTURE_WINDOW = 50
+
+# 复制延迟统计的键
+_CAPTURE_KEY = 'selection'
+
+
+def _sequence_reader():
+    """
+    当前平台读取剪贴板变化序号的函数
+
+    Windows 使用 GetClipboardSequenceNumber，macOS 使用 NSPasteboard.changeCount；
+    其他平台（X11/Wayland 没有可轮询的序号）返回 None。
+    """
+    system = platform.system()
+    try:
+        if system == 'Windows':
+            import ctypes
+            return ctypes.windll.user32.GetClipboardSequenceNumber
+        if system == 'Darwin':
+            from AppKit import NSPasteboard
+            pasteboard = NSPasteboard.generalPasteboard()
+            return pasteboard.changeCount
+    except Exception:
+        pass
+    return None
+
+
+class PyperclipBackend:
+    """系统剪贴板（pyperclip），平台支持时提供变化序号"""
+
+    def __init__(self):
+        self._sequence = _sequence_reader()
+
+    def read(self):
+        return pyperclip.paste()
+
+    def write(self, text):
+        pyperclip.copy(text)
+
+    def sequence(self):
+        """剪贴板变化序号，内容每次变化都会改变；不支持时返回 None"""
+        return self._sequence() if self._sequence is not None else None
 
 
 class ClipboardManager:
     """剪贴板管理器"""
     
-    def __init__(self):
-        self.keyboard = Controller()
+    def __init__(self, backend=None, keyboard=None):
+        """
+        Args:
+            backend: 剪贴板后端（read/write/sequence），默认为系统剪贴板
+            keyboard: 模拟按键的控制器，默认为 pynput Controller
+        """
+        if keyboard is None and Controller is None:
+            raise RuntimeError("无法模拟按键：pynput 在当前环境不可用")
+        self.backend = backend or PyperclipBackend()
+        self.keyboard = keyboard or Controller()
+        self.capturing = False  # 正在模拟复制获取选中文本（期间的剪贴板变化由本程序引起）
+        self.last_written = None  # 本程序最近一次写入剪贴板的文本
+        self.max_timeout = DEFAULT_CAPTURE_TIMEOUT_MS / 1000
+        self.adaptive = True
+        self.latency = LatencyTracker(CAPTURE_WINDOW)  # 模拟复制到剪贴板更新的延迟
+        self.stats = {'captures': 0, 'timeouts': 0, 'errors': 0}
+        self._probe = False  # 上次在自适应等待时间内超时，下次按最长时间等待，确认是否只是程序变慢
+        
+    def configure(self, config):
+        """
+        应用配置
+        
+        Args:
+            config: general 配置（capture_timeout_ms、capture_adaptive）
+        """
+        timeout_ms = int(config.get('capture_timeout_ms', DEFAULT_CAPTURE_TIMEOUT_MS))
+        self.max_timeout = max(MIN_CAPTURE_TIMEOUT_MS, timeout_ms) / 1000
+        self.adaptive = config.get('capture_adaptive', True)
+        
+    def capture_timeout(self):
+        """
+        本次等待剪贴板更新的时间（秒）
+        
+        开启自适应时取最近复制延迟 p95 的 CAPTURE_FACTOR 倍，限制在最长时间以内，
+        目标程序响应快时，没有选中文本的情况也能很快返回。
+        """
+        if not self.adaptive or self._probe or self.latency.count(_CAPTURE_KEY) < CAPTURE_MIN_SAMPLES:
+            return self.max_timeout
+        p95 = self.latency.percentile(_CAPTURE_KEY, 95)
+        return min(max(p95 * CAPTURE_FACTOR, MIN_CAPTURE_TIMEOUT_MS / 1000), self.max_timeout)
+        
+    def capture_stats(self):
+        """获取选中文本的统计：次数、超时次数、复制延迟 p50/p95 和当前等待时间（毫秒）"""
+        p50 = self.latency.percentile(_CAPTURE_KEY, 50)
+        p95 = self.latency.percentile(_CAPTURE_KEY, 95)
+        return dict(self.stats,
+                    p50_ms=p50 * 1000 if p50 is not None else None,
+                    p95_ms=p95 * 1000 if p95 is not None else None,
+                    timeout_ms=self.capture_timeout() * 1000)
         
     def get_selected_text(self):
         """
         获取当前选中的文本
         
-        通过模拟 Ctrl+C 来获取选中的文本
-        会保存和恢复原剪贴板内容
+        通过模拟 Ctrl+C 来获取选中的文本，剪贴板一更新就返回，
+        不再固定等待；会保存和恢复原剪贴板内容
         
         Returns:
             str: 选中的文本，如果没有选中或出错则返回空字符串
         """
-        # 保存原剪贴板内容
-        original_clipboard = pyperclip.paste()
-        
-        # 清空剪贴板
-        pyperclip.copy('')
-        
-        # 短暂延迟，确保剪贴板已清空
-        time.sleep(0.05)
-        
-        # 模拟 Ctrl+C
+        self.capturing = True
         try:
-            # 按下 Ctrl
-            self.keyboard.press(Key.ctrl if not self._is_mac() else Key.cmd)
-            # 按下 C
-            self.keyboard.press('c')
-            # 释放 C
-            self.keyboard.release('c')
-            # 释放 Ctrl
-            self.keyboard.release(Key.ctrl if not self._is_mac() else Key.cmd)
-            
-            # 等待剪贴板更新
-            time.sleep(0.1)
+            with tracer.span('clipboard.capture', 'clipboard') as span:
+                text = self._capture_selected_text()
+                span.set(chars=len(text))
+                return text
+        finally:
+            self.capturing = False
             
-            # 获取新的剪贴板内容
-            selected_text = pyperclip.paste()
+    def _capture_selected_text(self):
+        """模拟 Ctrl+C，轮询剪贴板直到内容更新或超时"""
+        # 保存原剪贴板内容
+        with tracer.span('clipboard.save', 'clipboard'):
+            original_clipboard = self.backend.read()
+        
+        # 支持变化序号时以序号变化判断复制完成；否则先清空，出现非空内容即为复制结果
+        before = self.backend.sequence()
+        if before is None:
+            self.backend.write('')
             
-            # 恢复原剪贴板内容
-            pyperclip.copy(original_clipboard)
+        timeout = self.capture_timeout()
+        self._probe = False
+        self.stats['captures'] += 1
+        try:
+            start = time.monotonic()
+            self._send_copy()
+            with tracer.span('clipboard.wait', 'clipboard', timeout_ms=timeout * 1000) as span:
+                selected_text = self._wait_for_update(before, start + timeout)
+                span.set(timed_out=selected_text is None)
             
-            return selected_text
+            if selected_text is None:
+                # 没有选中文本，或目标程序响应超过了自适应等待时间
+                self.stats['timeouts'] += 1
+                self._probe = self.adaptive and timeout < self.max_timeout
+                selected_text = ""
+            else:
+                self.latency.record(_CAPTURE_KEY, time.monotonic() - start)
             
         except Exception as e:
-            # 出错时恢复剪贴板
-            pyperclip.copy(original_clipboard)
+            self.stats['errors'] += 1
             print(f"Error getting selected text: {e}")
-            return ""
+            selected_text = ""
+            
+        # 恢复原剪贴板内容（序号未变化说明剪贴板没有被改动，无需恢复）
+        if before is None or self.backend.sequence() != before:
+            with tracer.span('clipboard.restore', 'clipboard'):
+                self.backend.write(original_clipboard)
+        return selected_text
+        
+    def _send_copy(self):
+        """模拟按下复制快捷键"""
+        if Key is None:
+            modifier = 'ctrl'  # 模拟键盘
+        else:
+            modifier = Key.cmd if self._is_mac() else Key.ctrl
+        self.keyboard.press(modifier)
+        self.keyboard.press('c')
+        self.keyboard.release('c')
+        self.keyboard.release(modifier)
+        
+    def _wait_for_update(self, before, deadline):
+        """
+        以递增的间隔轮询剪贴板，直到内容更新或到达截止时间
+        
+        Args:
+            before: 模拟复制前的变化序号，不支持序号时为 None（剪贴板已清空）
+            deadline: 截止时间（time.monotonic()）
+            
+        Returns:
+            str: 复制得到的文本，超时返回 None
+        """
+        interval = POLL_INITIAL
+        while True:
+            if before is None:
+                text = self.backend.read()
+                if text:
+                    return text
+            elif self.backend.sequence() != before:
+                return self.backend.read() or ""
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            time.sleep(min(interval, remaining))
+            interval = min(interval * POLL_BACKOFF, POLL_MAX)
             
     def set_clipboard(self, text):
         """设置剪贴板内容"""
-        pyperclip.copy(text)
+        self.last_written = text
+        self.backend.write(text)
         
     def get_clipboard(self):
         """获取剪贴板内容"""
-        return pyperclip.paste()
+        return self.backend.read()
         
     def _is_mac(self):
         """检测是否为macOS系统"""
-        import platform
         return platform.system() == 'Darwin'
+
+
+class SelectionCapture(QObject):
+    """
+    在后台线程中获取选中文本
+    
+    模拟复制和等待剪贴板更新不再阻塞界面线程，完成后通过 captured 信号回到界面线程。
+    获取过程中再次按下快捷键不会叠加新的获取，而是合并到当前获取，结果按最后一次请求的操作类型发出。
+    """
+    
+    captured = Signal(str, str)  # (选中的文本, 操作类型)
+    
+    # 内部信号：后台线程完成后切回界面线程
+    _capture_done = Signal(str)
+    
+    def __init__(self, clipboard_manager, parent=None):
+        """
+        Args:
+            clipboard_manager: ClipboardManager 实例
+        """
+        super().__init__(parent)
+        self.clipboard_manager = clipboard_manager
+        self.stats = {'requests': 0, 'coalesced': 0}
+        self._action_type = None
+        self._thread = None
+        self._capture_done.connect(self._on_capture_done)
+        
+    @property
+    def busy(self):
+        """是否正在获取选中文本"""
+        return self._thread is not None
+        
+    def request(self, action_type):
+        """
+        请求获取选中文本（在界面线程中调用），立即返回
+        
+        Returns:
+            bool: 是否开始了新的获取，False 表示合并到了正在进行的获取
+        """
+        self.stats['requests'] += 1
+        self._action_type = action_type
+        if self._thread is not None:
+            self.stats['coalesced'] += 1
+            tracer.instant('capture.coalesced', 'clipboard', action=action_type)
+            return False
+        self._thread = threading.Thread(target=self._run, name="zdtrans-capture", daemon=True)
+        self._thread.start()
+        return True
+        
+    def _run(self):
+        """后台线程：模拟复制并等待剪贴板更新"""
+        try:
+            text = self.clipboard_manager.get_selected_text()
+        except Exception as e:
+            print(f"Error getting selected text: {e}")
+            text = ""
+        self._capture_done.emit(text)
+        
+    def _on_capture_done(self, text):
+        """界面线程：发出结果"""
+        self._thread = None
+        self.captured.emit(text, self._action_type)
+
+
+class ClipboardWatcher(QObject):
+    """
+    剪贴板监听器
+    
+    剪贴板内容变化（用户复制了新文本）时，经过防抖后调用回调提前翻译，
+    之后按快捷键翻译同一段文本时直接命中缓存或处理中的请求。
+    忽略本程序自身写入的内容、获取选中文本期间的变化以及超出长度范围的文本。
+    """
+    
+    def __init__(self, clipboard_manager, callback, parent=None):
+        """
+        Args:
+            clipboard_manager: ClipboardManager 实例
+            callback: 回调函数，参数为新复制的文本
+        """
+        super().__init__(parent)
+        self.clipboard_manager = clipboard_manager
+        self.callback = callback
+        self.enabled = False
+        self.min_chars = 2
+        self.max_chars = 2000
+        self._last_text = None
+        
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(400)
+        self._timer.timeout.connect(self._on_timeout)
+        
+        self._clipboard = QGuiApplication.clipboard()
+        self._clipboard.dataChanged.connect(self._on_changed)
+        
+    def configure(self, config):
+        """
+        应用配置
+        
+        Args:
+            config: general 配置（prefetch_enabled、prefetch_debounce_ms、prefetch_min_chars、prefetch_max_chars）
+        """
+        self.enabled = config.get('prefetch_enabled', False)
+        self._timer.setInterval(max(0, int(config.get('prefetch_debounce_ms', 400))))
+        self.min_chars = config.get('prefetch_min_chars', 2)
+        self.max_chars = config.get('prefetch_max_chars', 2000)
+        if not self.enabled:
+            self._timer.stop()
+            
+    def _on_changed(self):
+        """剪贴板变化：重新开始计时，连续复制时只处理最后一次"""
+        if self.enabled:
+            self._timer.start()
+            
+    def _on_timeout(self):
+        """防抖结束，读取剪贴板并发起预取"""
+        if self.clipboard_manager.capturing:
+            # 正在获取选中文本，剪贴板内容是临时的，稍后再看
+            self._timer.start()
+            return
+        try:
+            text = self.clipboard_manager.get_clipboard()
+        except Exception as e:
+            print(f"Error reading clipboard: {e}")
+            return
+        if not text or text == self._last_text:
+            return
+        self._last_text = text
+        if text == self.clipboard_manager.last_written:
+            return
+        if not self.min_chars <= len(text.strip()) <= self.max_chars:
+            return
+        self.callback(text)
@@ -0,0 +1,293 @@
+"""
+持久化翻译缓存模块
+使用 SQLite（WAL 模式）在 ~/.zdtrans 下保存翻译结果，程序重启后仍可命中
+"""
+
+import logging
+import queue
+import sqlite3
+import threading
+import time
+
+from .cache import DEFAULT_TTL
+
+
+logger = logging.getLogger(__name__)
+
+# 默认磁盘缓存上限
+DEFAULT_DISK_MAX_BYTES = 64 * 1024 * 1024
+
+# 超出上限时淘汰到上限的该比例，避免每次写入都触发淘汰
+EVICT_TARGET_RATIO = 0.9
+
+# 后台线程空闲多久后执行淘汰（秒）
+IDLE_EVICT_DELAY = 1.0
+
+# 数据库被其他进程锁定时每次操作最多等待的时间（秒）
+BUSY_TIMEOUT = 1.0
+
+_STOP = object()
+
+
+class DiskCache:
+    """
+    SQLite 持久化缓存
+
+    所有数据库操作都在一个专用后台线程中串行执行，调用方不会被磁盘 I/O 阻塞：
+    get() 的结果通过回调返回（回调在后台线程中执行），put() 只负责入队。
+    每次写入都是独立事务，配合 WAL 模式保证进程崩溃时数据库不会损坏。
+    """
+
+    def __init__(self, path, max_bytes=DEFAULT_DISK_MAX_BYTES, ttl=None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = dict(DEFAULT_TTL, **(ttl or {}))
+        self._tasks = queue.Queue()
+        self._total_bytes = 0
+        self._needs_evict = False
+        self._hits = 0
+        self._misses = 0
+        self._entries = 0
+        self._thread = threading.Thread(target=self._run, name="zdtrans-disk-cache", daemon=True)
+        self._thread.start()
+
+    def get(self, key, callback):
+        """
+        异步读取缓存
+
+        Args:
+            key: 缓存键
+            callback: 回调函数 callback(value)，未命中或已过期时 value 为 None
+        """
+        self._tasks.put((self._get, (key, callback)))
+
+    def get_many(self, keys, callback):
+        """
+        异步批量读取缓存
+
+        Args:
+            keys: 缓存键列表
+            callback: 回调函数 callback(found)，found 为命中的 {key: value}
+        """
+        self._tasks.put((self._get_many, (list(keys), callback)))
+
+    def put(self, key, value, action_type='translate'):
+        """异步写入缓存"""
+        self._tasks.put((self._put, (key, value, action_type)))
+
+    def clear(self):
+        """异步清空缓存"""
+        self._tasks.put((self._clear, ()))
+
+    def configure(self, max_bytes=None, ttl=None):
+        """更新容量上限和过期时间（对之后的写入生效）"""
+        if max_bytes is not None:
+            self.max_bytes = max_bytes
+            self._needs_evict = True
+        if ttl is not None:
+            self.ttl = dict(DEFAULT_TTL, **ttl)
+
+    def stats(self):
+        """获取磁盘缓存统计"""
+        lookups = self._hits + self._misses
+        return {
+            'hits': self._hits,
+            'misses': self._misses,
+            'entries': self._entries,
+            'bytes': self._total_bytes,
+            'max_bytes': self.max_bytes,
+            'hit_rate': self._hits / lookups if lookups else 0.0
+        }
+
+    def close(self, timeout=2.0):
+        """处理完已入队的操作后关闭数据库"""
+        self._tasks.put(_STOP)
+        self._thread.join(timeout)
+
+    # ---- 以下方法只在后台线程中执行 ----
+
+    def _run(self):
+        """后台线程主循环"""
+        try:
+            self._conn = self._open()
+        except sqlite3.Error as e:
+            logger.error(f"打开磁盘缓存失败: {e}")
+            self._drain()
+            return
+
+        while True:
+            try:
+                task = self._tasks.get(timeout=IDLE_EVICT_DELAY)
+            except queue.Empty:
+                # 空闲时再淘汰，不影响查询延迟
+                if self._needs_evict:
+                    self._evict()
+                continue
+
+            if task is _STOP:
+                break
+            func, args = task
+            try:
+                func(*args)
+            except sqlite3.Error as e:
+                logger.error(f"磁盘缓存操作失败: {e}")
+
+        self._conn.close()
+
+    def _open(self):
+        """打开数据库，文件损坏时重建（被其他进程锁定时不视为损坏，本次运行不使用磁盘缓存）"""
+        try:
+            conn = self._connect()
+        except sqlite3.OperationalError:
+            raise
+        except sqlite3.DatabaseError as e:
+            logger.warning(f"磁盘缓存已损坏，重新创建: {e}")
+            backup = self.path.with_name(self.path.name + '.corrupt')
+            self.path.replace(backup)
+            conn = self._connect()
+
+        row = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache").fetchone()
+        self._entries, self._total_bytes = row
+        self._needs_evict = self._total_bytes > self.max_bytes
+        return conn
+
+    def _connect(self):
+        """建立连接并初始化表结构"""
+        conn = sqlite3.connect(str(self.path), timeout=BUSY_TIMEOUT)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " action TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " expires_at REAL,"
+            " last_access REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_last_access ON cache(last_access)")
+        conn.commit()
+        return conn
+
+    def _drain(self):
+        """数据库不可用时让所有查询直接未命中"""
+        while True:
+            task = self._tasks.get()
+            if task is _STOP:
+                return
+            func, args = task
+            if func == self._get:
+                args[1](None)
+            elif func == self._get_many:
+                args[1]({})
+
+    def _get(self, key, callback):
+        """查询缓存"""
+        value = None
+        try:
+            value = self._lookup(key)
+        finally:
+            callback(value)
+
+    def _get_many(self, keys, callback):
+        """批量查询缓存"""
+        found = {}
+        try:
+            for key in keys:
+                value = self._lookup(key)
+                if value is not None:
+                    found[key] = value
+        finally:
+            callback(found)
+
+    def _lookup(self, key):
+        """查询一条缓存并更新访问时间，未命中或已过期时返回 None"""
+        now = time.time()
+        row = self._conn.execute(
+            "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+        ).fetchone()
+        value = None
+        if row is not None:
+            if row[1] is not None and row[1] <= now:
+                self._delete(key)
+            else:
+                value = row[0]
+                try:
+                    with self._conn:
+                        self._conn.execute("UPDATE cache SET last_access = ? WHERE key = ?", (now, key))
+                except sqlite3.OperationalError as e:
+                    # 访问时间只影响淘汰顺序，被其他进程锁定时照常返回已读到的结果
+                    logger.warning(f"磁盘缓存更新访问时间失败: {e}")
+
+        if value is None:
+            self._misses += 1
+        else:
+            self._hits += 1
+        return value
+
+    def _put(self, key, value, action_type):
+        """写入一条缓存"""
+        now = time.time()
+        size = len(key) + len(value.encode('utf-8'))
+        ttl = self.ttl.get(action_type)
+        expires_at = now + ttl if ttl else None
+
+        with self._conn:
+            old = self._conn.execute("SELECT size FROM cache WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, action, size, expires_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, value, action_type, size, expires_at, now)
+            )
+
+        if old is None:
+            self._entries += 1
+        else:
+            self._total_bytes -= old[0]
+        self._total_bytes += size
+        if self._total_bytes > self.max_bytes:
+            self._needs_evict = True
+
+    def _delete(self, key):
+        """删除一条缓存"""
+        with self._conn:
+            row = self._conn.execute("SELECT size FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+        self._entries -= 1
+        self._total_bytes -= row[0]
+
+    def _clear(self):
+        """清空缓存"""
+        with self._conn:
+            self._conn.execute("DELETE FROM cache")
+        self._entries = 0
+        self._total_bytes = 0
+        self._needs_evict = False
+
+    def _evict(self):
+        """删除过期条目，再按最久未访问的顺序淘汰到容量上限以下"""
+        self._needs_evict = False
+        with self._conn:
+            self._conn.execute("DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at <= ?",
+                               (time.time(),))
+        self._entries, self._total_bytes = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache"
+        ).fetchone()
+
+        target = self.max_bytes * EVICT_TARGET_RATIO
+        if self._total_bytes <= self.max_bytes:
+            return
+
+        removed = 0
+        with self._conn:
+            rows = self._conn.execute("SELECT key, size FROM cache ORDER BY last_access").fetchall()
+            for key, size in rows:
+                if self._total_bytes <= target:
+                    break
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                self._total_bytes -= size
+                self._entries -= 1
+                removed += 1
+        logger.info(f"磁盘缓存淘汰 {removed} 条，当前 {self._total_bytes / 1024:.0f} KB")
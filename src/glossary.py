@@ -0,0 +1,206 @@
+"""
+术语表模块
+把关键词/术语表编译成 Aho-Corasick 自动机，一次线性扫描找出原文中实际出现的术语，
+只把这些术语（及其指定译法）放进提示词
+"""
+
+import re
+import threading
+from collections import deque
+
+from .tokens import estimate_tokens
+
+
+# 关键词输入中的条目分隔符（逗号、中文逗号、顿号、分号、换行）
+_ENTRY_SEPARATOR = re.compile(r'[,，、;；\n]+')
+
+# 术语与译法之间的分隔符，如 "Transformer=变换器" 或 "BERT → BERT模型"
+_TRANSLATION_SEPARATOR = re.compile(r'\s*(?:=|→|->)\s*')
+
+
+def parse_entries(text):
+    """
+    解析关键词输入
+
+    Returns:
+        list: [(术语, 指定译法)]，没有指定译法时为空字符串
+    """
+    entries = []
+    for item in _ENTRY_SEPARATOR.split(text or ''):
+        parts = _TRANSLATION_SEPARATOR.split(item.strip(), maxsplit=1)
+        term = parts[0].strip()
+        if term:
+            entries.append((term, parts[1].strip() if len(parts) > 1 else ''))
+    return entries
+
+
+def load_glossary_file(path):
+    """
+    读取术语表文件：每行一条，术语与译法之间用制表符或逗号分隔，# 开头的行为注释
+
+    Returns:
+        list: [(术语, 指定译法)]
+    """
+    entries = []
+    with open(path, encoding='utf-8-sig') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            row = line.split('\t' if '\t' in line else ',', 1)
+            if row[0].strip():
+                entries.append((row[0].strip(), row[1].strip() if len(row) > 1 else ''))
+    return entries
+
+
+def format_term(term, translation):
+    """提示词中的术语写法"""
+    return f"{term} → {translation}" if translation else term
+
+
+def _fold(char):
+    """大小写折叠（只接受一对一的映射，保证位置不变）"""
+    lower = char.lower()
+    return lower if len(lower) == 1 else char
+
+
+def _is_word_char(char):
+    """拉丁字母或数字（这类术语需要按整词匹配）"""
+    return char.isascii() and (char.isalnum() or char == '_')
+
+
+class Glossary:
+    """
+    编译后的术语表
+
+    构建时把所有术语放进一棵 trie 并计算失配指针，match() 对原文只扫描一遍，
+    耗时与原文长度和命中数成正比，与术语数量无关。拉丁文术语按整词、忽略大小写匹配。
+    """
+
+    def __init__(self, entries=()):
+        self.entries = []  # [(术语, 指定译法)]，同一术语只保留第一条
+        self._goto = [{}]  # 状态 -> {字符: 下一状态}
+        self._fail = [0]
+        self._output = [[]]  # 状态 -> [以该状态结尾的术语序号]
+        self._lock = threading.Lock()
+        self.stats = {'scans': 0, 'matched_terms': 0, 'full_tokens': 0, 'sent_tokens': 0}
+
+        seen = set()
+        for term, translation in entries:
+            key = ''.join(_fold(c) for c in term)
+            if key in seen:
+                continue
+            seen.add(key)
+            self._add(key, len(self.entries))
+            self.entries.append((term, translation))
+        self._build()
+        self.full_context = ', '.join(format_term(term, translation) for term, translation in self.entries)
+        self.full_tokens = estimate_tokens(self.full_context)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _add(self, key, index):
+        """把术语加入 trie"""
+        state = 0
+        for char in key:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append(index)
+
+    def _build(self):
+        """按层序计算失配指针，并把失配链上的输出合并到每个状态（第一层的失配指针为根）"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def find(self, text):
+        """
+        扫描原文
+
+        Returns:
+            list: [(起始位置, 结束位置, 术语序号)]，重叠时保留最靠左、最长的匹配
+        """
+        matches = []
+        state = 0
+        for end, char in enumerate(text, 1):
+            char = _fold(char)
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for index in self._output[state]:
+                start = end - len(self.entries[index][0])
+                if self._on_boundary(text, start, end):
+                    matches.append((start, end, index))
+
+        matches.sort(key=lambda m: (m[0], m[0] - m[1]))
+        selected = []
+        last_end = 0
+        for start, end, index in matches:
+            if start >= last_end:
+                selected.append((start, end, index))
+                last_end = end
+        return selected
+
+    def terms(self, texts):
+        """
+        找出原文中出现的术语
+
+        Args:
+            texts: 原文，或多段原文的列表（合并请求）
+
+        Returns:
+            list: 提示词用的术语列表（按首次出现的顺序，已去重）
+        """
+        if not self.entries:
+            return []
+        if isinstance(texts, str):
+            texts = [texts]
+        indices = {}
+        for text in texts:
+            for _, _, index in self.find(text):
+                indices.setdefault(index)
+        return [format_term(*self.entries[index]) for index in indices]
+
+    def match(self, texts):
+        """与 terms() 相同，并把相对于发送整个术语表节省的 token 计入统计（构建请求时调用）"""
+        terms = self.terms(texts)
+        if self.entries:
+            with self._lock:
+                self.stats['scans'] += 1
+                self.stats['matched_terms'] += len(terms)
+                self.stats['full_tokens'] += self.full_tokens
+                self.stats['sent_tokens'] += estimate_tokens(', '.join(terms))
+        return terms
+
+    def _on_boundary(self, text, start, end):
+        """拉丁文术语两端不能紧接着字母或数字（避免 BERT 命中 RoBERTa）"""
+        if _is_word_char(text[start]) and start > 0 and _is_word_char(text[start - 1]):
+            return False
+        if _is_word_char(text[end - 1]) and end < len(text) and _is_word_char(text[end]):
+            return False
+        return True
+
+    def summary(self):
+        """术语数量、平均命中数和提示词 token 节省情况"""
+        with self._lock:
+            stats = dict(self.stats)
+        saved = stats['full_tokens'] - stats['sent_tokens']
+        return dict(stats,
+                    terms=len(self.entries),
+                    saved_tokens=saved,
+                    saved_ratio=saved / stats['full_tokens'] if stats['full_tokens'] else 0.0,
+                    avg_matched=stats['matched_terms'] / stats['scans'] if stats['scans'] else 0.0)
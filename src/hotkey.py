@@ -7,6 +7,8 @@ from pynput import keyboard
 from PySide6.QtCore import QObject, Signal
 import threading
 
+from .tracing import tracer
+
 
 class HotkeyManager(QObject):
     """全局快捷键管理器"""
@@ -129,12 +131,14 @@ class HotkeyManager(QObject):
         if self.current_keys == self.hotkeys['translate']:
             if self._last_triggered != 'translate':
                 self._last_triggered = 'translate'
+                tracer.instant('hotkey.translate', 'hotkey')
                 self.translate_triggered.emit()
             
         # 检查润色快捷键
         elif self.current_keys == self.hotkeys['polish']:
             if self._last_triggered != 'polish':
                 self._last_triggered = 'polish'
+                tracer.instant('hotkey.polish', 'hotkey')
                 self.polish_triggered.emit()
         else:
             # 如果当前按键不匹配任何快捷键，重置标志
@@ -0,0 +1,120 @@
+"""
+HTTP 连接池模块
+为各个 API 提供商维护可复用的 keep-alive 会话，避免每次请求重新握手
+"""
+
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+# 默认连接池参数
+DEFAULT_POOL_SIZE = 4
+DEFAULT_IDLE_TIMEOUT = 90  # 秒
+
+
+class SessionPool:
+    """
+    按 base_url 划分的线程安全会话池
+
+    每个 base_url 对应一个 requests.Session，内部由 urllib3 维护
+    keep-alive 连接。会话空闲超过 idle_timeout 后会被关闭并在下次使用时重建，
+    避免复用已被服务端断开的陈旧连接。
+    """
+
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE, idle_timeout=DEFAULT_IDLE_TIMEOUT):
+        self.pool_size = max(1, int(pool_size))
+        self.idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        self._sessions = {}  # base_url -> (session, last_used)
+
+    def get(self, base_url):
+        """
+        获取 base_url 对应的会话（不存在或已空闲过期时新建）
+
+        Args:
+            base_url: API 基础地址
+
+        Returns:
+            requests.Session: 可复用的会话
+        """
+        key = self._normalize(base_url)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._sessions.get(key)
+            if entry is not None:
+                session, last_used = entry
+                if self.idle_timeout and now - last_used > self.idle_timeout:
+                    session.close()
+                    entry = None
+            if entry is None:
+                session = self._create_session()
+            self._sessions[key] = (session, now)
+            return session
+
+    def warmup(self, base_url):
+        """
+        在后台线程中预热连接（完成 DNS 解析、TCP 连接和 TLS 握手）
+
+        预热请求的结果无关紧要，只要连接能建立并留在池中即可。
+        """
+        if not base_url:
+            return
+
+        def _warm():
+            try:
+                self.get(base_url).head(base_url, timeout=5)
+            except requests.RequestException:
+                pass
+
+        threading.Thread(target=_warm, name="zdtrans-warmup", daemon=True).start()
+
+    def reset(self, base_url=None):
+        """
+        关闭会话
+
+        Args:
+            base_url: 仅关闭指定地址的会话；为 None 时关闭全部
+        """
+        with self._lock:
+            if base_url is None:
+                entries = list(self._sessions.values())
+                self._sessions.clear()
+            else:
+                entry = self._sessions.pop(self._normalize(base_url), None)
+                entries = [entry] if entry else []
+
+        for session, _ in entries:
+            session.close()
+
+    def configure(self, pool_size=None, idle_timeout=None):
+        """
+        更新连接池参数
+
+        连接池大小变化时需要重建会话，空闲超时只影响之后的判断。
+        """
+        if idle_timeout is not None:
+            self.idle_timeout = idle_timeout
+        if pool_size is not None and max(1, int(pool_size)) != self.pool_size:
+            self.pool_size = max(1, int(pool_size))
+            self.reset()
+
+    def close(self):
+        """关闭所有会话"""
+        self.reset()
+
+    def _create_session(self):
+        """创建挂载了连接池适配器的会话"""
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    @staticmethod
+    def _normalize(base_url):
+        """统一 base_url 形式，避免末尾斜杠导致重复会话"""
+        return (base_url or '').rstrip('/')
@@ -0,0 +1,181 @@
+"""
+语言检测模块
+按文字所属的 Unicode 区段统计判断语言（微秒级，不调用模型），用于在构建请求前确定翻译方向，
+并识别只包含数字、代码或链接、无需翻译的文本
+"""
+
+import re
+
+
+# 语言代码 -> 提示词中的语言名称
+LANGUAGE_NAMES = {
+    'zh': '中文',
+    'zh-cn': '简体中文',
+    'zh-hans': '简体中文',
+    'zh-tw': '繁体中文',
+    'zh-hk': '繁体中文',
+    'zh-hant': '繁体中文',
+    'en': '英文',
+    'ja': '日文',
+    'ko': '韩文',
+    'ru': '俄文',
+    'fr': '法文',
+    'de': '德文',
+    'es': '西班牙文',
+    'it': '意大利文',
+    'pt': '葡萄牙文',
+    'ar': '阿拉伯文',
+    'th': '泰文',
+}
+
+# 检测时最多查看的字符数（长文本取开头即可判断）
+SAMPLE_CHARS = 500
+
+# 各文字的字符（或单词）模式及对应的语言；拉丁文、西里尔文按单词计数，
+# 一个单词大致相当于两个汉字的信息量
+_HAN = re.compile(r'[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]')
+_KANA = re.compile(r'[\u3040-\u30ff]')
+_HANGUL = re.compile(r'[\u1100-\u11ff\uac00-\ud7af]')
+_LATIN_WORD = re.compile(r'[A-Za-z\u00c0-\u024f]+')
+_CYRILLIC_WORD = re.compile(r'[\u0400-\u04ff]+')
+_ARABIC = re.compile(r'[\u0600-\u06ff]')
+_THAI = re.compile(r'[\u0e00-\u0e7f]')
+WORD_WEIGHT = 2
+
+# 仅凭文字体系就能确定的语言；拉丁文字只能说明是 'en'、'fr'、'de' 等之一
+SCRIPT_LANGUAGES = {'zh', 'ja', 'ko', 'ru', 'ar', 'th'}
+
+# 同为汉字、但需要转换的中文变体（简繁转换不能视为已是目标语言）
+_CHINESE_VARIANTS = {'zh-tw', 'zh-hk', 'zh-hant'}
+
+# 假名占比超过该值时视为日文（日文中汉字常常多于假名）
+KANA_RATIO = 0.1
+
+# 链接和邮箱地址
+_URL = re.compile(r'(?:https?|ftp)://\S+|www\.\S+|[\w.+-]+@[\w-]+\.[\w.-]+')
+
+# 任意文字（不含数字和下划线）
+_LETTER = re.compile(r'[^\W\d_]')
+
+# 单个标识符：带 . _ :: 分隔的名称、函数调用或路径（不含驼峰单词，如 iPhone、eBay）
+_IDENTIFIER = re.compile(
+    r'[A-Za-z_$][\w$]*(?:(?:\.|::|_)[\w$]+)+(?:\(\))?'
+    r'|[A-Za-z_$][\w$]*\(\)'
+    r'|~?/[\w.-]+(?:/[\w.-]+)*'
+)
+
+# 代码行特征：以分号或花括号结尾、以常见关键字开头、包含运算符、赋值、装饰器或 Python 代码块
+_CODE_LINE = re.compile(
+    r'[;{}]\s*$'
+    r'|^\s*(?:def|class|import|from\s+\S+\s+import|return|const|let|var|function|public|private|protected'
+    r'|static|package|using|fn|func|#include|#define)\b'
+    r'|==|!=|&&|\|\||::'
+    r'|^\s*[\w.\[\]\'"]+\s*[-+*/%|&]?=\s*\S'
+    r'|^\s*@\w+'
+    r'|^\s*(?:if|elif|else|for|while|try|except|with)\b.*:\s*$'
+)
+
+# 单行文本按代码处理时需要的明确结构：定义、导入、声明，或以分号/花括号结尾的调用
+# （只以分号结尾或包含 x = y 的一行文字可能是自然语言）
+_CODE_STATEMENT = re.compile(
+    r'^\s*(?:def|class|function|fn|func)\s+\w+\s*[(:<{]'
+    r'|^\s*(?:import\s+[\w.]+|from\s+[\w.]+\s+import\s+[\w*]+|#include\s*[<"]|package\s+[\w.]+;|using\s+[\w.]+;)'
+    r'|^\s*(?:const|let|var)\s+\w+\s*='
+    r'|\w\([^()]*\)\s*[;{]\s*$'
+)
+
+# 注释行（可能是自然语言，不计入代码行也不计入普通行）
+_COMMENT_LINE = re.compile(r'^\s*(?:#|//|/\*|\*|--)')
+
+# 多行文本中代码行的最少行数和占非注释行的最低比例；检查代码特征时最多查看的行数，
+# 超过最大长度的行视为自然语言段落
+MIN_CODE_LINES = 2
+CODE_LINE_RATIO = 0.6
+CODE_SAMPLE_LINES = 50
+CODE_MAX_LINE_CHARS = 300
+
+
+def detect_language(text):
+    """
+    按文字统计判断主要语言
+
+    只区分文字体系：拉丁文字统一视为 'en'。这足以决定 'auto' 模式的翻译方向，
+    但不能说明拉丁文字的文本具体是哪种语言（见 is_target_language）。
+
+    Returns:
+        str: 'zh'、'ja'、'ko'、'ru'、'ar'、'th' 或 'en'；没有任何文字时返回 None
+    """
+    sample = text[:SAMPLE_CHARS]
+    han = len(_HAN.findall(sample))
+    kana = len(_KANA.findall(sample))
+    if kana and kana >= (han + kana) * KANA_RATIO:
+        scores = {'ja': han + kana}
+    else:
+        scores = {'zh': han + kana}
+    scores['ko'] = len(_HANGUL.findall(sample))
+    scores['en'] = len(_LATIN_WORD.findall(sample)) * WORD_WEIGHT
+    scores['ru'] = len(_CYRILLIC_WORD.findall(sample)) * WORD_WEIGHT
+    scores['ar'] = len(_ARABIC.findall(sample))
+    scores['th'] = len(_THAI.findall(sample))
+    language, score = max(scores.items(), key=lambda item: item[1])
+    return language if score else None
+
+
+def base_language(code):
+    """去掉地区部分的语言代码，如 'zh-CN' -> 'zh'"""
+    return (code or '').lower().split('-')[0]
+
+
+def language_name(code):
+    """提示词中的语言名称，未知代码原样返回"""
+    return LANGUAGE_NAMES.get((code or '').lower(), code)
+
+
+def resolve_target(text, configured='auto'):
+    """
+    确定翻译的目标语言
+
+    配置了 api.target_lang 时直接使用；'auto' 时中文译为英文，其他语言译为中文。
+    """
+    if configured and configured != 'auto':
+        return configured
+    return 'en' if detect_language(text) == 'zh' else 'zh'
+
+
+def is_target_language(text, target_lang):
+    """
+    原文是否已经是目标语言（可以原样返回）
+
+    只有文字体系本身能确定语言时（中日韩、俄、阿拉伯、泰文）才判断；拉丁文字的原文
+    （法文、德文……）与拉丁文字的目标语言无法区分，以及简繁转换，一律返回 False。
+    """
+    if not target_lang or target_lang.lower() in _CHINESE_VARIANTS:
+        return False
+    language = detect_language(text)
+    return language in SCRIPT_LANGUAGES and language == base_language(target_lang)
+
+
+def looks_like_code(text):
+    """是否为代码片段或单个标识符（含中日韩文字的文本视为自然语言）"""
+    if _HAN.search(text) or _KANA.search(text) or _HANGUL.search(text):
+        return False
+    stripped = text.strip()
+    if '\n' not in stripped and ' ' not in stripped:
+        return bool(_IDENTIFIER.fullmatch(stripped) or _CODE_STATEMENT.search(stripped))
+
+    lines = [line for line in stripped.splitlines()[:CODE_SAMPLE_LINES]
+             if line.strip() and not _COMMENT_LINE.match(line)]
+    if not lines or any(len(line) > CODE_MAX_LINE_CHARS for line in lines):
+        return False
+    if len(lines) == 1:
+        return bool(_CODE_STATEMENT.search(lines[0]))
+    code_lines = sum(1 for line in lines if _CODE_LINE.search(line))
+    return code_lines >= max(MIN_CODE_LINES, len(lines) * CODE_LINE_RATIO)
+
+
+def is_untranslatable(text):
+    """只包含数字、符号、链接或代码，翻译/润色不会改变内容"""
+    remaining = _URL.sub(' ', text) if ('://' in text or '@' in text or 'www.' in text) else text
+    if not _LETTER.search(remaining):
+        return True
+    return looks_like_code(text)
@@ -0,0 +1,74 @@
+"""
+延迟统计模块
+按提供商/模型记录最近的响应延迟，计算分位数，供对冲请求等自适应策略使用
+"""
+
+import threading
+from collections import defaultdict, deque
+
+from .providers import resolve_model
+
+
+# 每个提供商保留的最近样本数
+DEFAULT_WINDOW = 100
+
+
+def provider_key(api_config):
+    """延迟统计的键：提供商/模型"""
+    return f"{api_config.get('provider', 'openai')}/{resolve_model(api_config)}"
+
+
+class LatencyTracker:
+    """
+    滑动窗口延迟统计
+
+    每个键只保留最近 window 个样本，分位数按窗口内样本排序计算。
+    """
+
+    def __init__(self, window=DEFAULT_WINDOW):
+        self.window = window
+        self._lock = threading.Lock()
+        self._samples = defaultdict(lambda: deque(maxlen=self.window))
+
+    def record(self, key, seconds):
+        """记录一次延迟（秒）"""
+        with self._lock:
+            self._samples[key].append(seconds)
+
+    def count(self, key):
+        """窗口内的样本数"""
+        with self._lock:
+            return len(self._samples.get(key, ()))
+
+    def percentile(self, key, p):
+        """
+        计算分位数
+
+        Args:
+            key: 提供商键
+            p: 百分位（0-100）
+
+        Returns:
+            float: 延迟（秒），没有样本时返回 None
+        """
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(len(samples) * p / 100))
+        return samples[index]
+
+    def stats(self):
+        """各键的样本数和 p50/p95（毫秒）"""
+        with self._lock:
+            keys = list(self._samples)
+        result = {}
+        for key in keys:
+            p50 = self.percentile(key, 50)
+            p95 = self.percentile(key, 95)
+            result[key] = {
+                'samples': self.count(key),
+                'p50_ms': p50 * 1000 if p50 is not None else None,
+                'p95_ms': p95 * 1000 if p95 is not None else None
+            }
+        return result
@@ -11,6 +11,10 @@ from PySide6.QtGui import QFont, QIcon
 from .theme import theme_manager
 
 
+# 流式结果刷新界面的最小间隔（毫秒）
+STREAM_REPAINT_INTERVAL = 50
+
+
 class MainWindow(QMainWindow):
     """主窗口"""
     
@@ -22,6 +26,15 @@ class MainWindow(QMainWindow):
         self.translation_count = 0
         self.init_ui()
         
+        # 流式结果状态：开始流式前的历史内容 + 已收到的增量
+        self._stream_base = None
+        self._stream_text = ""
+        self._stream_action = "translate"
+        self._stream_timer = QTimer(self)
+        self._stream_timer.setSingleShot(True)
+        self._stream_timer.setInterval(STREAM_REPAINT_INTERVAL)
+        self._stream_timer.timeout.connect(self._flush_stream)
+        
         # 连接主题变化信号
         theme_manager.theme_changed.connect(self.apply_theme)
         
@@ -85,6 +98,11 @@ class MainWindow(QMainWindow):
         self.count_label.setFont(count_font)
         status_layout.addWidget(self.count_label)
         
+        self.cache_label = QLabel("缓存: 暂无数据")
+        cache_font = QFont("PingFang SC", 11)
+        self.cache_label.setFont(cache_font)
+        status_layout.addWidget(self.cache_label)
+        
         status_group.setLayout(status_layout)
         layout.addWidget(status_group)
         
@@ -208,6 +226,7 @@ class MainWindow(QMainWindow):
         
         count_color = theme_manager.get_label_color(theme, 'count')
         self.count_label.setStyleSheet(f"color: {count_color};")
+        self.cache_label.setStyleSheet(f"color: {count_color};")
         
         tip_color = theme_manager.get_label_color(theme, 'tip')
         self.hotkey_tip_label.setStyleSheet(f"color: {tip_color};")
@@ -233,6 +252,40 @@ class MainWindow(QMainWindow):
         self.translate_hotkey_label.setText(f"翻译: {translate_hotkey}")
         self.polish_hotkey_label.setText(f"润色: {polish_hotkey}")
         
+    def show_partial_translation(self, delta, action_type):
+        """追加流式增量文本（按固定间隔批量刷新）"""
+        if self._stream_base is None:
+            self._stream_base = self.result_text.toPlainText()
+            self._stream_text = ""
+        self._stream_action = action_type
+        self._stream_text += delta
+        if not self._stream_timer.isActive():
+            self._stream_timer.start()
+            
+    def _flush_stream(self):
+        """刷新正在接收的结果"""
+        if self._stream_base is None:
+            return
+        action_name = "翻译" if self._stream_action == "translate" else "润色"
+        text = f"[{action_name}]\n{self._stream_text}"
+        if self._stream_base:
+            text = f"{text}\n\n{self._stream_base}"
+        self.result_text.setPlainText(text)
+        
+    def reset_stream(self):
+        """新的请求开始：丢弃上一个请求（可能已被取代）未完成的流式内容，恢复开始前的历史内容"""
+        base = self._end_stream()
+        if base is not None:
+            self.result_text.setPlainText(base)
+            
+    def _end_stream(self):
+        """结束流式显示，返回开始前的历史内容"""
+        self._stream_timer.stop()
+        base = self._stream_base
+        self._stream_base = None
+        self._stream_text = ""
+        return base
+        
     def show_translation_result(self, result, action_type):
         """显示翻译结果"""
         self.translation_count += 1
@@ -240,8 +293,10 @@ class MainWindow(QMainWindow):
         
         action_name = "翻译" if action_type == "translate" else "润色"
         
-        # 在结果区显示
-        current_text = self.result_text.toPlainText()
+        # 在结果区显示（流式过程中的临时内容由最终结果替换）
+        current_text = self._end_stream()
+        if current_text is None:
+            current_text = self.result_text.toPlainText()
         new_text = f"[{action_name}]\n{result}\n\n{current_text}"
         
         # 限制显示最近3条结果
@@ -254,8 +309,25 @@ class MainWindow(QMainWindow):
         # 更新状态
         self.update_status(f"{action_name}完成")
         
+    def update_cache_stats(self, stats):
+        """更新缓存统计显示"""
+        if not stats.get('enabled', True):
+            self.cache_label.setText("缓存: 已关闭")
+            return
+        text = (f"缓存: 命中 {stats['hits']} / 未命中 {stats['misses']} "
+                f"({stats['hit_rate']:.0%}) · 淘汰 {stats['evictions']} · "
+                f"{stats['bytes'] / 1024:.0f} KB")
+        disk = stats.get('disk')
+        if disk:
+            text += f" · 磁盘命中 {disk['hits']} ({disk['entries']} 条)"
+        memory = stats.get('memory')
+        if memory:
+            text += f" · 记忆命中 {memory['hits']} ({memory['entries']} 条)"
+        self.cache_label.setText(text)
+        
     def show_translation_error(self, error_msg):
         """显示翻译错误"""
+        self.reset_stream()
         self.status_label.setText(f"错误: {error_msg}")
         self.statusBar.showMessage(f"错误: {error_msg}", 5000)
         QTimer.singleShot(5000, lambda: self.status_label.setText("程序运行中"))
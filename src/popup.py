@@ -5,9 +5,14 @@
 
 from PySide6.QtWidgets import QWidget, QVBoxLayout, QLabel, QTextEdit, QPushButton, QHBoxLayout
 from PySide6.QtCore import Qt, QTimer, QPoint
-from PySide6.QtGui import QCursor, QFont
+from PySide6.QtGui import QCursor, QFont, QTextCursor
 import pyperclip
 from .theme import theme_manager
+from .tracing import tracer
+
+
+# 流式结果刷新界面的最小间隔（毫秒）
+STREAM_REPAINT_INTERVAL = 50
 
 
 class PopupWindow(QWidget):
@@ -17,6 +22,14 @@ class PopupWindow(QWidget):
         super().__init__()
         self.init_ui()
         
+        # 流式结果缓冲，由定时器批量写入文本框
+        self._stream_buffer = []
+        self._streaming = False
+        self._stream_timer = QTimer(self)
+        self._stream_timer.setSingleShot(True)
+        self._stream_timer.setInterval(STREAM_REPAINT_INTERVAL)
+        self._stream_timer.timeout.connect(self._flush_stream)
+        
         # 连接主题变化信号
         theme_manager.theme_changed.connect(self.apply_theme)
         
@@ -73,26 +86,73 @@ class PopupWindow(QWidget):
         """应用主题"""
         self.setStyleSheet(theme_manager.get_popup_style(theme))
         
-    def show_loading(self, action_type='translate'):
-        """显示加载状态"""
-        action_name = "翻译" if action_type == 'translate' else "润色"
-        self.title_label.setText(f"正在{action_name}中...")
-        self.result_text.setText("请稍候...")
-        self.show_near_cursor()
+    def show_loading(self, action_type='translate', activate=True):
+        """
+        显示加载状态
+        
+        Args:
+            action_type: 操作类型
+            activate: 是否激活窗口；获取选中文本期间为 False，以免模拟的复制快捷键发到弹出窗口
+        """
+        with tracer.span('popup.show_loading', 'popup'):
+            action_name = "翻译" if action_type == 'translate' else "润色"
+            self.title_label.setText(f"正在{action_name}中...")
+            self.result_text.setText("请稍候...")
+            self._reset_stream()
+            self.show_near_cursor(activate)
+        
+    def show_partial_result(self, delta, action_type='translate'):
+        """追加流式增量文本（按固定间隔批量刷新）"""
+        if not self._streaming:
+            # 收到首个增量时替换"请稍候..."
+            self._streaming = True
+            self.result_text.clear()
+        self._stream_buffer.append(delta)
+        if not self._stream_timer.isActive():
+            self._stream_timer.start()
+            
+    def _flush_stream(self):
+        """将缓冲的增量文本写入文本框"""
+        if not self._stream_buffer:
+            return
+        with tracer.span('popup.flush_stream', 'popup', deltas=len(self._stream_buffer)):
+            cursor = self.result_text.textCursor()
+            cursor.movePosition(QTextCursor.End)
+            cursor.insertText(''.join(self._stream_buffer))
+            self._stream_buffer.clear()
+            self.result_text.setTextCursor(cursor)
+            self.result_text.ensureCursorVisible()
+        
+    def _reset_stream(self):
+        """丢弃未刷新的流式内容"""
+        self._stream_timer.stop()
+        self._stream_buffer.clear()
+        self._streaming = False
+        
+    def show_suggestion(self, translation, similarity, action_type='translate'):
+        """显示翻译记忆中相似原文的译文（API结果返回前供参考，收到流式内容或结果时被替换）"""
+        if self._streaming:
+            return
+        self.title_label.setText(f"翻译记忆参考（相似度 {similarity:.0%}），正在确认...")
+        self.result_text.setText(translation)
         
     def show_result(self, result, action_type='translate'):
         """显示结果"""
-        action_name = "翻译" if action_type == 'translate' else "润色"
-        self.title_label.setText(f"{action_name}结果")
-        self.result_text.setText(result)
+        with tracer.span('popup.show_result', 'popup', chars=len(result)):
+            self._reset_stream()
+            action_name = "翻译" if action_type == 'translate' else "润色"
+            self.title_label.setText(f"{action_name}结果")
+            self.result_text.setText(result)
         
     def show_error(self, error_msg):
         """显示错误信息"""
-        self.title_label.setText("错误")
-        self.result_text.setText(f"发生错误：\n{error_msg}")
+        with tracer.span('popup.show_error', 'popup'):
+            self._reset_stream()
+            self.title_label.setText("错误")
+            self.result_text.setText(f"发生错误：\n{error_msg}")
         
-    def show_near_cursor(self):
-        """在鼠标附近显示窗口"""
+    def show_near_cursor(self, activate=True):
+        """在鼠标附近显示窗口（activate 为 False 时不抢走当前程序的焦点）"""
         # 获取鼠标位置
         cursor_pos = QCursor.pos()
         
@@ -108,9 +168,11 @@ class PopupWindow(QWidget):
             y = cursor_pos.y() - self.height() - 20
             
         self.move(x, y)
+        self.setAttribute(Qt.WA_ShowWithoutActivating, not activate)
         self.show()
         self.raise_()
-        self.activateWindow()
+        if activate:
+            self.activateWindow()
         
     def copy_result(self):
         """复制结果到剪贴板"""
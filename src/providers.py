@@ -0,0 +1,479 @@
+"""
+API 提供商协议模块
+构建各提供商的请求、解析响应，不依赖具体的 HTTP 客户端，
+供线程池引擎和 asyncio 引擎共用
+"""
+
+import json
+import time
+
+from .chunking import context_window
+from .langdetect import language_name, resolve_target
+from .tokens import (estimate_tokens, estimate_messages_tokens, fit_terms, keyword_budget, output_budget,
+                     DEFAULT_KEYWORD_MAX_TOKENS, MIN_OUTPUT_TOKENS)
+
+
+# 各提供商的默认 API 地址
+DEFAULT_BASE_URLS = {
+    'openai': 'https://api.openai.com/v1',
+    'volcengine': 'https://ark.cn-beijing.volces.com/api/v3',
+    'doubao': 'https://ark.cn-beijing.volces.com/api/v3',
+    'deepl': 'https://api.deepl.com',
+}
+
+# DeepL 免费版密钥以 ':fx' 结尾，使用单独的域名
+DEEPL_FREE_BASE_URL = 'https://api-free.deepl.com'
+
+# 语言代码 -> DeepL 目标语言代码（源语言只取 '-' 前的部分）
+DEEPL_LANGUAGES = {
+    'zh': 'ZH-HANS',
+    'zh-cn': 'ZH-HANS',
+    'zh-hans': 'ZH-HANS',
+    'zh-tw': 'ZH-HANT',
+    'zh-hk': 'ZH-HANT',
+    'zh-hant': 'ZH-HANT',
+    'en': 'EN-US',
+    'en-us': 'EN-US',
+    'en-gb': 'EN-GB',
+    'ja': 'JA',
+    'ko': 'KO',
+    'de': 'DE',
+    'fr': 'FR',
+    'es': 'ES',
+    'it': 'IT',
+    'ru': 'RU',
+    'pt': 'PT-PT',
+    'pt-br': 'PT-BR',
+}
+
+# DeepL 的 model_type 参数，api.model 为其中之一时传给 DeepL
+DEEPL_MODEL_TYPES = ('quality_optimized', 'prefer_quality_optimized', 'latency_optimized')
+
+# 流式模式下两次增量回调之间的最小间隔（秒）
+PARTIAL_EMIT_INTERVAL = 0.05
+
+# SSE 流结束标记
+STREAM_DONE = object()
+
+
+class StreamError(Exception):
+    """SSE 流中途返回了错误事件（如服务端过载），已收到的内容不完整"""
+
+
+def resolve_base_url(api_config):
+    """根据配置获取实际使用的 API 地址"""
+    provider = api_config.get('provider', 'openai')
+    if provider == 'deepl' and not api_config.get('base_url') and api_config.get('api_key', '').endswith(':fx'):
+        return DEEPL_FREE_BASE_URL
+    return api_config.get('base_url') or DEFAULT_BASE_URLS.get(provider, '')
+
+
+def resolve_model(api_config):
+    """根据配置获取实际使用的模型名称"""
+    provider = api_config.get('provider', 'openai')
+    if provider == 'openai':
+        return 'gpt-3.5-turbo'
+    if provider == 'deepl':
+        return api_config.get('model') or 'deepl'
+    return api_config.get('model', 'doubao-pro-32k')
+
+
+def build_openai_request(api_config, text, action_type, keywords, target_lang=None):
+    """
+    构建 OpenAI chat/completions 请求
+
+    Args:
+        target_lang: 目标语言，为 None 时按 api.target_lang 和原文语言确定
+
+    Returns:
+        tuple: (base_url, headers, data, error_prefix)
+    """
+    api_key = api_config.get('api_key', '')
+    base_url = api_config.get('base_url', DEFAULT_BASE_URLS['openai'])
+
+    if not api_key:
+        raise ValueError("API Key is not configured")
+
+    # 构建提示词
+    keyword_context = ""
+    if keywords:
+        keyword_context = f"\n\n关键词提示：{', '.join(keywords)}"
+
+    if action_type == 'translate':
+        target = target_lang or resolve_target(text, api_config.get('target_lang', 'auto'))
+        prompt = f"请将以下文本翻译成{language_name(target)}{keyword_context}：\n\n{text}"
+    else:  # polish
+        prompt = f"请润色以下文本，使其更加流畅和专业{keyword_context}：\n\n{text}"
+
+    headers = {
+        'Authorization': f'Bearer {api_key}',
+        'Content-Type': 'application/json'
+    }
+
+    data = {
+        'model': 'gpt-3.5-turbo',
+        'messages': [
+            {'role': 'user', 'content': prompt}
+        ],
+        'temperature': 0.3
+    }
+
+    return base_url, headers, data, "API Error"
+
+
+def build_volcengine_request(api_config, text, action_type, keywords, target_lang=None):
+    """
+    构建火山方舟（豆包）chat/completions 请求
+
+    Args:
+        target_lang: 目标语言，为 None 时按 api.target_lang 和原文语言确定
+
+    Returns:
+        tuple: (base_url, headers, data, error_prefix)
+    """
+    api_key = api_config.get('api_key', '')
+    base_url = api_config.get('base_url', DEFAULT_BASE_URLS['volcengine'])
+    model = api_config.get('model', 'doubao-pro-32k')
+
+    if not api_key:
+        raise ValueError("API Key 未配置")
+
+    # 构建关键词上下文
+    keyword_context = ""
+    if keywords:
+        keyword_context = f"\n\n专业领域关键词：{', '.join(keywords)}\n请在翻译时注意这些领域的专业术语。"
+
+    # 构建提示词
+    if action_type == 'translate':
+        target = target_lang or resolve_target(text, api_config.get('target_lang', 'auto'))
+        prompt = f"请将以下文本翻译成{language_name(target)}，只返回翻译结果，不要添加任何解释{keyword_context}：\n\n{text}"
+    else:  # polish
+        prompt = f"请润色以下文本，使其更加流畅和专业，只返回润色后的文本，不要添加任何解释{keyword_context}：\n\n{text}"
+
+    headers = {
+        'Authorization': f'Bearer {api_key}',
+        'Content-Type': 'application/json'
+    }
+
+    data = {
+        'model': model,
+        'messages': [
+            {'role': 'user', 'content': prompt}
+        ],
+        'temperature': 0.3
+    }
+
+    return base_url, headers, data, "API 错误"
+
+
+def _build_chat_request(api_config, text, action_type, keywords, target_lang=None):
+    """按提供商构建 chat/completions 请求（不做 token 预算）"""
+    provider = api_config.get('provider', 'openai')
+
+    if provider == 'openai':
+        return build_openai_request(api_config, text, action_type, keywords, target_lang)
+    elif provider == 'volcengine' or provider == 'doubao':
+        return build_volcengine_request(api_config, text, action_type, keywords, target_lang)
+    else:
+        raise ValueError(f"Unsupported API provider: {provider}")
+
+
+def build_chat_request(api_config, text, action_type, keywords, target_lang=None):
+    """
+    按提供商构建 chat/completions 请求
+
+    发送前估算提示词大小：关键词上下文超出预算时压缩，按原文长度设置 max_tokens。
+
+    Args:
+        target_lang: 目标语言（翻译时），为 None 时按 api.target_lang 和原文语言确定
+
+    Returns:
+        tuple: (base_url, headers, data, error_prefix)
+    """
+    text_tokens = estimate_tokens(text)
+    keywords = fit_keywords(api_config, keywords, text_tokens)
+    base_url, headers, data, error_prefix = _build_chat_request(api_config, text, action_type, keywords, target_lang)
+    apply_token_budget(api_config, data, text_tokens, action_type)
+    return base_url, headers, data, error_prefix
+
+
+def build_batch_request(api_config, segments, action_type, keywords, target_lang=None):
+    """
+    构建多段文本合并的 chat/completions 请求
+
+    段落以 JSON 数组（带编号）发送，并要求模型按相同编号返回 JSON 数组，
+    避免段落内容中的换行或分隔符造成拆分错误。
+
+    Args:
+        segments: 待处理的文本列表
+        target_lang: 目标语言（各段相同），为 None 时按 api.target_lang 和原文语言确定
+
+    Returns:
+        tuple: (base_url, headers, data, error_prefix)
+    """
+    items = json.dumps([{'id': i, 'text': segment} for i, segment in enumerate(segments)], ensure_ascii=False)
+    text_tokens = estimate_tokens(items)
+    keywords = fit_keywords(api_config, keywords, text_tokens)
+    base_url, headers, data, error_prefix = _build_chat_request(api_config, '', action_type, keywords, target_lang)
+
+    keyword_context = ""
+    if keywords:
+        keyword_context = f"\n专业领域关键词：{', '.join(keywords)}，请注意这些领域的专业术语。"
+
+    if action_type == 'translate':
+        target = target_lang or resolve_target(''.join(segments), api_config.get('target_lang', 'auto'))
+        task = f"将每一段文本翻译成{language_name(target)}"
+    else:  # polish
+        task = "润色每一段文本，使其更加流畅和专业"
+
+    prompt = (
+        f"下面是一个 JSON 数组，每个元素包含编号 id 和文本 text。请{task}。\n"
+        f"只返回一个 JSON 数组，每个元素为 {{\"id\": 编号, \"text\": 结果}}，"
+        f"编号与输入一一对应，不要添加任何解释{keyword_context}\n\n"
+        f"{items}"
+    )
+    data = dict(data, messages=[{'role': 'user', 'content': prompt}])
+    apply_token_budget(api_config, data, text_tokens, action_type)
+    return base_url, headers, data, error_prefix
+
+
+def fit_keywords(api_config, keywords, text_tokens):
+    """关键词上下文超出预算（api.keyword_max_tokens，且不挤占原文和输出）时压缩"""
+    if not keywords:
+        return keywords
+    budget = keyword_budget(resolve_model(api_config), text_tokens,
+                            api_config.get('keyword_max_tokens', DEFAULT_KEYWORD_MAX_TOKENS))
+    kept, dropped = fit_terms(keywords, budget)
+    if dropped:
+        print(f"关键词超出预算（{budget} tokens），省略 {dropped} 个")
+    return kept
+
+
+def apply_token_budget(api_config, data, text_tokens, action_type):
+    """
+    估算提示词大小并按原文长度设置 max_tokens
+
+    提示词放不进模型上下文窗口时直接报错，不发送请求。
+    """
+    model = resolve_model(api_config)
+    window = context_window(model)
+    prompt_tokens = estimate_messages_tokens(data['messages'])
+    available = window - prompt_tokens
+    if available < MIN_OUTPUT_TOKENS:
+        raise ValueError(f"文本过长：提示词约 {prompt_tokens} tokens，超出模型 {model} 的上下文窗口（{window} tokens）")
+    data['max_tokens'] = output_budget(text_tokens, action_type, available)
+
+
+def parse_batch_response(content, count):
+    """
+    解析多段合并请求的结果
+
+    兼容模型用代码块包裹 JSON、返回纯字符串数组或以编号为键的对象等情况。
+
+    Args:
+        content: 模型返回的文本
+        count: 输入段落数
+
+    Returns:
+        list: 长度为 count 的结果列表，无法解析的段落为 None
+    """
+    results = [None] * count
+
+    # 取出第一个 JSON 数组或对象
+    starts = [i for i in (content.find('['), content.find('{')) if i >= 0]
+    if not starts:
+        return results
+    start = min(starts)
+    end = content.rfind(']' if content[start] == '[' else '}')
+    try:
+        parsed = json.loads(content[start:end + 1])
+    except ValueError:
+        return results
+
+    if isinstance(parsed, dict):
+        items = [{'id': key, 'text': value} for key, value in parsed.items()]
+    elif isinstance(parsed, list) and all(isinstance(item, str) for item in parsed):
+        # 纯字符串数组只有长度一致时才能按顺序对应
+        if len(parsed) != count:
+            return results
+        items = [{'id': i, 'text': item} for i, item in enumerate(parsed)]
+    elif isinstance(parsed, list):
+        items = [item for item in parsed if isinstance(item, dict)]
+    else:
+        return results
+
+    for item in items:
+        try:
+            index = int(item.get('id'))
+        except (TypeError, ValueError):
+            continue
+        text = item.get('text')
+        if 0 <= index < count and isinstance(text, str) and text.strip():
+            results[index] = text.strip()
+    return results
+
+
+def deepl_language(code, source=False):
+    """
+    将语言代码转换为 DeepL 的语言代码
+
+    Args:
+        code: 如 'zh-CN'、'en'，已经是 DeepL 代码（如 'EN-GB'）时原样使用
+        source: 源语言只接受不带地区的代码（如 'EN'、'ZH'）
+    """
+    target = DEEPL_LANGUAGES.get(code.lower(), code.upper())
+    return target.split('-')[0] if source else target
+
+
+def build_deepl_request(api_config, texts, action_type, keywords, target_lang=None):
+    """
+    构建 DeepL /v2/translate 请求，多段文本通过多个 text 参数一次发送
+
+    目标语言未指定时取 api.target_lang，为 'auto' 时与 LLM 提供商一致：
+    中文译为英文，其他语言译为中文。关键词作为 context 传入，不参与翻译也不计费。
+
+    Args:
+        texts: 待翻译的文本列表
+        target_lang: 目标语言
+
+    Returns:
+        tuple: (base_url, headers, data, error_prefix)
+    """
+    api_key = api_config.get('api_key', '')
+    if not api_key:
+        raise ValueError("API Key 未配置")
+    if action_type != 'translate':
+        raise ValueError("DeepL 不支持润色，请使用 LLM 提供商")
+
+    target = target_lang or resolve_target(''.join(texts), api_config.get('target_lang', 'auto'))
+
+    headers = {
+        'Authorization': f'DeepL-Auth-Key {api_key}',
+        'Content-Type': 'application/json'
+    }
+    data = {
+        'text': list(texts),
+        'target_lang': deepl_language(target)
+    }
+    source = api_config.get('source_lang', 'auto')
+    if source != 'auto':
+        data['source_lang'] = deepl_language(source, source=True)
+    if keywords:
+        data['context'] = f"专业领域关键词：{', '.join(keywords)}"
+    if api_config.get('model') in DEEPL_MODEL_TYPES:
+        data['model_type'] = api_config['model']
+
+    return resolve_base_url(api_config), headers, data, "DeepL 错误"
+
+
+def parse_deepl_response(result):
+    """从 DeepL 响应中按顺序取出各段译文"""
+    return [item['text'].strip() for item in result['translations']]
+
+
+def parse_chat_response(result):
+    """从完整的 chat/completions JSON 响应中取出结果文本"""
+    return result['choices'][0]['message']['content'].strip()
+
+
+def parse_sse_line(line, usage=None):
+    """
+    解析一行 SSE 数据
+
+    Args:
+        usage: 字典，数据中带有 usage 字段（stream_options.include_usage）时写入其中
+
+    Returns:
+        str: 增量文本；STREAM_DONE 表示流结束；None 表示该行没有文本
+
+    Raises:
+        StreamError: 数据为错误事件
+    """
+    if not line.startswith('data:'):
+        return None
+    payload = line[5:].strip()
+    if payload == '[DONE]':
+        return STREAM_DONE
+    chunk = json.loads(payload)
+    error = chunk.get('error')
+    if error:
+        message = error.get('message', error) if isinstance(error, dict) else error
+        raise StreamError(f"流式响应错误: {message}")
+    if usage is not None and chunk.get('usage'):
+        usage.update(chunk['usage'])
+    choices = chunk.get('choices') or []
+    if choices:
+        return (choices[0].get('delta') or {}).get('content') or None
+    return None
+
+
+def iter_stream_deltas(response, usage=None):
+    """
+    解析 OpenAI 兼容接口的 SSE 响应，逐个产出增量文本
+
+    Args:
+        response: 以 stream=True 发出的 requests 响应
+        usage: 字典，流末尾的 usage 数据写入其中
+
+    Yields:
+        str: choices[0].delta.content 中的文本片段
+    """
+    for raw_line in response.iter_lines():
+        # 按 UTF-8 自行解码，text/event-stream 未声明编码时 requests 会误用 ISO-8859-1
+        line = raw_line.decode('utf-8') if isinstance(raw_line, bytes) else raw_line
+        delta = parse_sse_line(line, usage)
+        if delta is STREAM_DONE:
+            break
+        if delta:
+            yield delta
+
+
+class StreamAccumulator:
+    """
+    流式结果累加器
+
+    收集全部增量，同时按 PARTIAL_EMIT_INTERVAL 合并待发出的部分，
+    避免逐 token 通知界面。
+    """
+
+    def __init__(self, start):
+        self.start = start
+        self.first_token = None  # 首个 token 的延迟（秒）
+        self.parts = []
+        self.pending = []
+        self.last_emit = 0.0
+
+    def add(self, delta, now=None):
+        """
+        加入一段增量
+
+        Args:
+            now: 当前时间（time.monotonic()），为 None 时读取时钟
+
+        Returns:
+            str: 到达发送间隔时返回需要发出的合并文本，否则返回 None
+        """
+        if now is None:
+            now = time.monotonic()
+        if not self.parts:
+            self.first_token = now - self.start
+            print(f"首个 token 耗时: {self.first_token * 1000:.0f} ms")
+        self.parts.append(delta)
+        self.pending.append(delta)
+
+        if now - self.last_emit >= PARTIAL_EMIT_INTERVAL:
+            return self.flush(now)
+        return None
+
+    def flush(self, now=None):
+        """取出尚未发出的增量，没有时返回 None"""
+        if not self.pending:
+            return None
+        text = ''.join(self.pending)
+        self.pending.clear()
+        self.last_emit = now if now is not None else time.monotonic()
+        return text
+
+    def text(self):
+        """完整结果"""
+        return ''.join(self.parts).strip()
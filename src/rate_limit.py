@@ -0,0 +1,309 @@
+"""
+客户端限流模块
+按提供商/模型分别维护每分钟请求数（RPM）和每分钟 token 数（TPM）两个令牌桶，
+超出预算的请求排队等待而不是失败；根据响应中的 Retry-After 和限流头自动调整
+"""
+
+import asyncio
+import re
+import threading
+import time
+
+from .latency import provider_key
+from .tokens import estimate_messages_tokens, estimate_tokens
+
+
+# 请求未设置 max_tokens 时按输入的倍数估算输出 token（翻译结果与原文长度相近）
+OUTPUT_TOKEN_RATIO = 1.0
+
+# 收到 429 但没有 Retry-After 时的暂停时间（秒）
+DEFAULT_429_PAUSE = 1.0
+
+_DURATION_PART = re.compile(r'(\d+(?:\.\d+)?)(ms|s|m|h)')
+_DURATION_UNITS = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600}
+
+
+def estimate_prompt_tokens(data):
+    """
+    估算请求体的输入 token 数
+
+    chat/completions 请求按 messages 估算；DeepL 请求没有 messages，按 text 中的各段原文估算
+    （context 不计费，不计入）。
+    """
+    if 'messages' in data:
+        return estimate_messages_tokens(data['messages'])
+    texts = data.get('text') or []
+    if isinstance(texts, str):
+        texts = [texts]
+    return sum(estimate_tokens(text) for text in texts)
+
+
+def estimate_request_tokens(data, prompt_tokens=None):
+    """
+    估算一次请求占用的 token（输入 + 输出上限，没有上限时按输入估计输出）
+
+    Args:
+        prompt_tokens: 已估算的输入 token 数，为 None 时按请求体估算
+    """
+    if prompt_tokens is None:
+        prompt_tokens = estimate_prompt_tokens(data)
+    return prompt_tokens + (data.get('max_tokens') or int(prompt_tokens * OUTPUT_TOKEN_RATIO))
+
+
+def parse_duration(value):
+    """解析限流头中的时长，如 '1s'、'6m0s'、'20ms' 或纯数字秒数"""
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
+
+
+class TokenBucket:
+    """
+    令牌桶（预约式）
+
+    reserve() 立即扣除令牌并返回需要等待的时间，令牌可以为负，
+    因此先到的请求先获得预算，排队顺序与调用顺序一致。
+    """
+
+    def __init__(self, per_minute, now):
+        self.per_minute = per_minute
+        self.level = float(per_minute)
+        self.updated = now
+
+    def reserve(self, amount, now):
+        """扣除 amount 个令牌，返回需要等待的秒数"""
+        self.refill(now)
+        # 单次需求超过桶容量时按容量计，避免永远等不到
+        self.level -= min(amount, self.per_minute)
+        if self.level >= 0:
+            return 0.0
+        return -self.level / (self.per_minute / 60)
+
+    def set_limit(self, per_minute, now):
+        """按服务端告知的上限调整容量"""
+        self.refill(now)
+        self.level = min(self.level, per_minute)
+        self.per_minute = per_minute
+
+    def set_remaining(self, remaining, now):
+        """按服务端告知的剩余额度校正（只向下校正，已预约的令牌仍然有效）"""
+        self.refill(now)
+        self.level = min(self.level, remaining)
+
+    def refill(self, now):
+        """按经过的时间补充令牌"""
+        self.level = min(self.per_minute, self.level + (now - self.updated) * self.per_minute / 60)
+        self.updated = now
+
+
+class RateLimiter:
+    """
+    按提供商/模型限流
+
+    limits 形如 {'volcengine/doubao-pro-32k': {'rpm': 1000, 'tpm': 800000}}，
+    键也可以只写提供商名；未配置的提供商不限流，直到响应头给出上限。
+    clock 为返回单调时间（秒）的函数，测试时可替换。
+    """
+
+    def __init__(self, limits=None, clock=time.monotonic):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._limits = limits or {}
+        self._buckets = {}  # key -> {'rpm': TokenBucket, 'tpm': TokenBucket}
+        self._paused_until = {}  # key -> 暂停截止时间（收到 429 时设置）
+        self._queued = {}
+        self._waits = {}  # key -> [总等待, 次数, 最近一次等待]
+        self._usage = {}  # key -> [估算的输入 token, 实际输入 token, 实际总 token]
+
+    def configure(self, limits):
+        """更新配置的限额（已从响应头学到的上限会被配置覆盖）"""
+        with self._lock:
+            self._limits = limits or {}
+            self._buckets.clear()
+
+    def reserve(self, api_config, tokens):
+        """
+        预约一次请求的预算
+
+        Returns:
+            float: 需要等待的秒数
+        """
+        key = provider_key(api_config)
+        now = self._clock()
+        with self._lock:
+            wait = max(0.0, self._paused_until.get(key, 0.0) - now)
+            buckets = self._get_buckets(key, api_config, now)
+            if 'rpm' in buckets:
+                wait = max(wait, buckets['rpm'].reserve(1, now))
+            if 'tpm' in buckets:
+                wait = max(wait, buckets['tpm'].reserve(tokens, now))
+            total = self._waits.setdefault(key, [0.0, 0, 0.0])
+            total[0] += wait
+            total[1] += 1
+            total[2] = wait
+            return wait
+
+    def acquire(self, api_config, tokens, cancelled=None):
+        """
+        同步等待到预算可用（线程池引擎使用）
+
+        Args:
+            cancelled: threading.Event，置位时提前结束等待
+
+        Returns:
+            float: 实际排队的秒数
+        """
+        wait = self.reserve(api_config, tokens)
+        if wait <= 0:
+            return 0.0
+        key = provider_key(api_config)
+        self._enter(key)
+        try:
+            if cancelled is not None:
+                cancelled.wait(wait)
+            else:
+                time.sleep(wait)
+        finally:
+            self._leave(key)
+        return wait
+
+    async def acquire_async(self, api_config, tokens):
+        """异步等待到预算可用（asyncio 引擎使用），返回排队的秒数"""
+        wait = self.reserve(api_config, tokens)
+        if wait <= 0:
+            return 0.0
+        key = provider_key(api_config)
+        self._enter(key)
+        try:
+            await asyncio.sleep(wait)
+        finally:
+            self._leave(key)
+        return wait
+
+    def release(self, api_config, tokens):
+        """退还尚未发出的请求预约的预算（排队等待期间被取消时调用）"""
+        key = provider_key(api_config)
+        now = self._clock()
+        with self._lock:
+            buckets = self._buckets.get(key, {})
+            for name, amount in (('rpm', 1), ('tpm', tokens)):
+                bucket = buckets.get(name)
+                if bucket is not None:
+                    bucket.refill(now)
+                    bucket.level = min(bucket.per_minute, bucket.level + min(amount, bucket.per_minute))
+
+    def _enter(self, key):
+        with self._lock:
+            self._queued[key] = self._queued.get(key, 0) + 1
+
+    def _leave(self, key):
+        with self._lock:
+            self._queued[key] -= 1
+
+    def observe(self, api_config, status, headers):
+        """
+        根据响应调整限流
+
+        429 时按 Retry-After（或默认值）暂停该提供商的所有请求；
+        x-ratelimit-* 头给出的上限和剩余额度用于校正令牌桶。
+        """
+        key = provider_key(api_config)
+        now = self._clock()
+        with self._lock:
+            if status == 429:
+                pause = parse_duration(headers.get('Retry-After')) or DEFAULT_429_PAUSE
+                self._paused_until[key] = max(self._paused_until.get(key, 0.0), now + pause)
+                print(f"{key} 触发限流，暂停 {pause:.1f} 秒")
+
+            buckets = self._get_buckets(key, api_config, now)
+            for name, suffix in (('rpm', 'requests'), ('tpm', 'tokens')):
+                limit = headers.get(f'x-ratelimit-limit-{suffix}')
+                remaining = headers.get(f'x-ratelimit-remaining-{suffix}')
+                try:
+                    if limit is not None:
+                        limit = float(limit)
+                        if name not in buckets:
+                            buckets[name] = TokenBucket(limit, now)
+                        elif buckets[name].per_minute != limit:
+                            buckets[name].set_limit(limit, now)
+                    if remaining is not None and name in buckets:
+                        buckets[name].set_remaining(float(remaining), now)
+                except ValueError:
+                    continue
+
+    def record_usage(self, api_config, reserved, estimated_prompt, usage):
+        """
+        按响应中的 usage 校正 TPM 预算，并记录输入 token 的估算误差
+
+        Args:
+            reserved: 发送前预约的 token 数（输入估算 + max_tokens）
+            estimated_prompt: 估算的输入 token 数
+            usage: 响应中的 usage 字段
+        """
+        key = provider_key(api_config)
+        prompt = usage.get('prompt_tokens') or 0
+        total = usage.get('total_tokens') or prompt + (usage.get('completion_tokens') or 0)
+        now = self._clock()
+        with self._lock:
+            tpm = self._buckets.get(key, {}).get('tpm')
+            if tpm is not None:
+                # 退还多预约的部分（或补扣少预约的部分）
+                tpm.refill(now)
+                tpm.level = min(tpm.per_minute, tpm.level + min(reserved, tpm.per_minute) - total)
+            totals = self._usage.setdefault(key, [0, 0, 0])
+            totals[0] += estimated_prompt
+            totals[1] += prompt
+            totals[2] += total
+
+    def queue_wait(self, api_config):
+        """新请求现在需要排队的时间（秒），不扣除预算"""
+        with self._lock:
+            return self._current_wait(provider_key(api_config), self._clock())
+
+    def stats(self):
+        """各提供商的限额、排队中的请求数、等待时间（毫秒）和 token 估算与实际用量"""
+        now = self._clock()
+        with self._lock:
+            result = {}
+            for key, (total, count, last) in self._waits.items():
+                buckets = self._buckets.get(key, {})
+                estimated, prompt, used = self._usage.get(key, (0, 0, 0))
+                result[key] = {
+                    'rpm': buckets['rpm'].per_minute if 'rpm' in buckets else None,
+                    'tpm': buckets['tpm'].per_minute if 'tpm' in buckets else None,
+                    'queued': self._queued.get(key, 0),
+                    'paused_ms': max(0.0, self._paused_until.get(key, 0.0) - now) * 1000,
+                    'queue_wait_ms': self._current_wait(key, now) * 1000,
+                    'avg_wait_ms': total / count * 1000 if count else 0.0,
+                    'last_wait_ms': last * 1000,
+                    'estimated_prompt_tokens': estimated,
+                    'actual_prompt_tokens': prompt,
+                    'actual_tokens': used,
+                    'estimate_ratio': estimated / prompt if prompt else None
+                }
+            return result
+
+    def _current_wait(self, key, now):
+        """新请求现在需要排队的时间（调用方需持有锁）"""
+        wait = max(0.0, self._paused_until.get(key, 0.0) - now)
+        for bucket in self._buckets.get(key, {}).values():
+            bucket.refill(now)
+            if bucket.level < 1:
+                wait = max(wait, (1 - bucket.level) / (bucket.per_minute / 60))
+        return wait
+
+    def _get_buckets(self, key, api_config, now):
+        """获取（必要时按配置创建）令牌桶（调用方需持有锁）"""
+        buckets = self._buckets.get(key)
+        if buckets is None:
+            limits = self._limits.get(key) or self._limits.get(api_config.get('provider', 'openai')) or {}
+            buckets = {name: TokenBucket(limits[name], now) for name in ('rpm', 'tpm') if limits.get(name)}
+            self._buckets[key] = buckets
+        return buckets
@@ -0,0 +1,297 @@
+"""
+请求容错模块
+根据最近延迟计算超时、对可重试错误做带抖动的指数退避重试，
+并为每个提供商维护熔断器：连续失败后快速失败，由后台探测恢复
+"""
+
+import logging
+import random
+import threading
+import time
+
+import requests
+
+from .latency import LatencyTracker, provider_key
+from .providers import resolve_base_url
+from .rate_limit import RateLimiter
+
+
+logger = logging.getLogger(__name__)
+
+# 超时（秒）：connect 固定；read 在样本不足时使用默认值，之后按最近延迟的 p99 乘以系数计算并限制在上下限内
+DEFAULT_CONNECT_TIMEOUT = 5.0
+DEFAULT_READ_TIMEOUT = 30.0
+MIN_READ_TIMEOUT = 5.0
+TIMEOUT_FACTOR = 3.0
+TIMEOUT_MIN_SAMPLES = 10
+
+# 重试：最多重试次数，退避基数和上限（秒）
+DEFAULT_MAX_RETRIES = 2
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 8.0
+
+# 熔断：连续失败次数阈值，熔断时长（秒，每次重新熔断翻倍），后台探测超时
+FAILURE_THRESHOLD = 5
+OPEN_COOLDOWN = 5.0
+OPEN_COOLDOWN_MAX = 60.0
+PROBE_TIMEOUT = 3.0
+
+# 可重试的 HTTP 状态码
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+# 熔断器状态
+STATE_CLOSED = 'closed'
+STATE_OPEN = 'open'
+STATE_HALF_OPEN = 'half_open'
+
+
+class ProviderError(Exception):
+    """提供商返回了非 200 响应"""
+
+    def __init__(self, message, status, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after  # Retry-After 头（秒），没有时为 None
+
+
+class CircuitOpenError(Exception):
+    """提供商处于熔断状态，请求未发出"""
+
+
+def parse_retry_after(value):
+    """解析 Retry-After 头（只支持秒数形式）"""
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def is_retryable(error, transient=()):
+    """
+    判断错误是否值得重试
+
+    Args:
+        error: 捕获的异常
+        transient: 额外视为瞬时故障的异常类型（如 aiohttp 的连接错误）
+    """
+    if isinstance(error, ProviderError):
+        return error.status in RETRYABLE_STATUS
+    return isinstance(error, (requests.ConnectionError, requests.Timeout,
+                              requests.exceptions.ChunkedEncodingError,
+                              ConnectionError, TimeoutError) + tuple(transient))
+
+
+def backoff_delay(attempt, retry_after=None, rng=random):
+    """
+    第 attempt 次重试前的等待时间（全抖动指数退避）
+
+    服务端给出 Retry-After 时以其为准（不超过上限）。
+    rng 为提供 uniform() 的随机源（测试时可传入固定种子的 random.Random）。
+    """
+    if retry_after is not None:
+        return min(retry_after, BACKOFF_MAX)
+    return rng.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """
+    单个提供商的熔断器
+
+    连续 FAILURE_THRESHOLD 次可重试类故障后熔断，熔断期间请求直接失败；
+    冷却结束或后台探测成功后进入半开状态，放行一个试探请求，成功则恢复，失败则再次熔断。
+    """
+
+    def __init__(self, key, clock=time.monotonic):
+        self.key = key
+        self._clock = clock
+        self.state = STATE_CLOSED
+        self.failures = 0
+        self.cooldown = OPEN_COOLDOWN
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+        self.api_config = None  # 熔断时的配置，供后台探测使用
+        self._lock = threading.Lock()
+
+    def check(self):
+        """请求前调用，熔断中时抛出 CircuitOpenError"""
+        with self._lock:
+            now = self._clock()
+            if self.state == STATE_OPEN and now - self.opened_at >= self.cooldown:
+                self.state = STATE_HALF_OPEN
+            if self.state == STATE_OPEN:
+                remaining = self.cooldown - (now - self.opened_at)
+                raise CircuitOpenError(f"{self.key} 暂时不可用（熔断中，{remaining:.0f} 秒后重试）")
+            if self.state == STATE_HALF_OPEN:
+                if self.trial_in_flight:
+                    raise CircuitOpenError(f"{self.key} 正在恢复检测中")
+                self.trial_in_flight = True
+
+    def record_success(self):
+        """请求成功"""
+        with self._lock:
+            if self.state != STATE_CLOSED:
+                logger.info(f"{self.key} 已恢复")
+            self.state = STATE_CLOSED
+            self.failures = 0
+            self.cooldown = OPEN_COOLDOWN
+            self.trial_in_flight = False
+
+    def record_failure(self, api_config):
+        """
+        请求因可重试类故障失败
+
+        Returns:
+            bool: 本次失败是否使熔断器进入熔断状态
+        """
+        with self._lock:
+            self.failures += 1
+            if self.state == STATE_HALF_OPEN:
+                # 试探失败，熔断时间翻倍
+                self.cooldown = min(self.cooldown * 2, OPEN_COOLDOWN_MAX)
+            elif self.state == STATE_OPEN or self.failures < FAILURE_THRESHOLD:
+                return False
+            self.state = STATE_OPEN
+            self.opened_at = self._clock()
+            self.trial_in_flight = False
+            self.api_config = api_config
+            logger.warning(f"{self.key} 连续失败 {self.failures} 次，熔断 {self.cooldown:.0f} 秒")
+            return True
+
+    def release_trial(self):
+        """半开状态下的试探请求因非故障原因结束（如被取消），允许下一个请求试探"""
+        with self._lock:
+            self.trial_in_flight = False
+
+    def reopen_ready(self):
+        """后台探测成功：提前进入半开状态"""
+        with self._lock:
+            if self.state == STATE_OPEN:
+                self.state = STATE_HALF_OPEN
+                self.trial_in_flight = False
+
+
+class ProviderHealth:
+    """
+    各提供商的健康状态：延迟统计、自适应超时、重试策略、熔断器和限流
+
+    线程池引擎和 asyncio 引擎的任务共用同一个实例，所有方法线程安全。
+    """
+
+    def __init__(self, session_pool=None, max_retries=DEFAULT_MAX_RETRIES, rate_limits=None, clock=time.monotonic):
+        self.session_pool = session_pool
+        self.max_retries = max_retries
+        self.latency = LatencyTracker()
+        self.limiter = RateLimiter(rate_limits, clock)  # 按提供商/模型的 RPM/TPM 限流
+        self._clock = clock
+        self._breakers = {}
+        self._lock = threading.Lock()
+        self.stats = {'retries': 0, 'fast_failures': 0, 'circuit_opens': 0, 'probes': 0}
+
+    def breaker(self, api_config):
+        """获取提供商的熔断器"""
+        key = provider_key(api_config)
+        with self._lock:
+            breaker = self._breakers.get(key)
+            if breaker is None:
+                breaker = self._breakers[key] = CircuitBreaker(key, self._clock)
+            return breaker
+
+    def check(self, api_config):
+        """请求前检查熔断状态"""
+        try:
+            self.breaker(api_config).check()
+        except CircuitOpenError:
+            self.stats['fast_failures'] += 1
+            raise
+
+    def timeouts(self, api_config):
+        """
+        根据最近的首次响应延迟计算 (connect, read) 超时
+
+        read 超时覆盖首个字节（流式为首个 token）之前的等待，取 p99 的 TIMEOUT_FACTOR 倍，不超过 api.timeout。
+        记录的延迟是首字延迟（主要是服务端生成时间），与建立连接的耗时无关，因此 connect 超时固定。
+        """
+        key = provider_key(api_config)
+        max_read = api_config.get('timeout', DEFAULT_READ_TIMEOUT)
+        if self.latency.count(key) < TIMEOUT_MIN_SAMPLES:
+            return DEFAULT_CONNECT_TIMEOUT, max_read
+        p99 = self.latency.percentile(key, 99)
+        return DEFAULT_CONNECT_TIMEOUT, min(max(p99 * TIMEOUT_FACTOR, MIN_READ_TIMEOUT), max_read)
+
+    def record_latency(self, api_config, seconds):
+        """记录首次响应延迟"""
+        self.latency.record(provider_key(api_config), seconds)
+
+    def record_success(self, api_config):
+        """请求成功"""
+        self.breaker(api_config).record_success()
+
+    def record_failure(self, api_config, error, transient=()):
+        """
+        请求失败，可重试类故障计入熔断器
+
+        Returns:
+            bool: 是否值得重试
+        """
+        breaker = self.breaker(api_config)
+        if not is_retryable(error, transient):
+            breaker.release_trial()
+            return False
+        if isinstance(error, ProviderError) and error.status == 429:
+            # 限流说明服务可达，由限流器暂停请求，不计入熔断
+            breaker.release_trial()
+            return True
+        if breaker.record_failure(api_config):
+            self.stats['circuit_opens'] += 1
+            threading.Thread(target=self._probe_loop, args=(breaker,),
+                             name=f"zdtrans-probe-{breaker.key}", daemon=True).start()
+        return True
+
+    def record_usage(self, api_config, request_id, estimate, usage):
+        """
+        记录实际 token 用量：输出估算与实际的对比，并按实际用量校正限流预算
+
+        Args:
+            estimate: (预约的 token 数, 估算的输入 token 数, max_tokens)
+            usage: 响应中的 usage 字段
+        """
+        reserved, prompt, max_tokens = estimate
+        print(f"请求 #{request_id} token 估算/实际: 输入 {prompt}/{usage.get('prompt_tokens')}，"
+              f"输出上限 {max_tokens}/实际 {usage.get('completion_tokens')}")
+        self.limiter.record_usage(api_config, reserved, prompt, usage)
+
+    def release(self, api_config):
+        """请求因取消等原因结束，不计成功或失败"""
+        self.breaker(api_config).release_trial()
+
+    def should_retry(self, attempt):
+        """第 attempt 次尝试（从 0 开始）失败后是否还能重试"""
+        if attempt >= self.max_retries:
+            return False
+        self.stats['retries'] += 1
+        return True
+
+    def breaker_stats(self):
+        """各提供商的熔断状态"""
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return {b.key: {'state': b.state, 'failures': b.failures, 'cooldown': b.cooldown} for b in breakers}
+
+    def _probe_loop(self, breaker):
+        """熔断期间在后台定期探测提供商是否恢复（任何 HTTP 响应都视为可达）"""
+        base_url = resolve_base_url(breaker.api_config)
+        while breaker.state == STATE_OPEN:
+            time.sleep(min(breaker.cooldown, OPEN_COOLDOWN))
+            if breaker.state != STATE_OPEN:
+                return
+            self.stats['probes'] += 1
+            try:
+                session = self.session_pool.get(base_url) if self.session_pool else requests
+                response = session.head(base_url, timeout=PROBE_TIMEOUT)
+                response.close()
+                if response.status_code < 500:
+                    logger.info(f"{breaker.key} 探测成功，放行试探请求")
+                    breaker.reopen_ready()
+                    return
+            except requests.RequestException:
+                pass
@@ -0,0 +1,523 @@
+"""
+本地 HTTP 服务模块
+在 127.0.0.1 上提供翻译/润色/批量接口，供其他本地工具复用已配置的提供商、关键词和缓存；
+连接在专用线程的 asyncio 事件循环中处理，请求交给界面线程中的 TranslatorManager 执行
+
+接口（请求和响应均为 JSON）：
+    POST /translate   {"text": "..."}                     -> {"result": "..."}
+    POST /polish      {"text": "..."}                     -> {"result": "..."}
+    POST /batch       {"segments": [...], "action": "translate"}
+                                                          -> {"results": [...]}（失败的段落为 null）
+    GET  /stats       服务、各客户端和翻译管理器的统计
+    GET  /health      {"status": "ok"}
+
+请求头 X-Client-Id 用于按客户端统计吞吐量；处理中的段落数达到队列上限时返回 429。
+
+只接受 Host 为 127.0.0.1:<端口> 或 localhost:<端口> 的请求（防止 DNS 重绑定），POST 必须使用
+Content-Type: application/json（网页无法不经预检跨站发送）；配置了 server_token 时还需要
+Authorization: Bearer <token>（/health 除外）。
+
+独立运行（不启动界面）：
+    python -m src.server --port 7878
+"""
+
+import argparse
+import asyncio
+import hmac
+import json
+import logging
+import signal
+import sys
+import threading
+import time
+
+from PySide6.QtCore import QCoreApplication, QObject, QTimer, Signal
+
+
+logger = logging.getLogger(__name__)
+
+# 只监听本机
+HOST = '127.0.0.1'
+
+# 默认端口、队列上限（处理中的段落数）、请求体上限和单次批量的段落数上限
+DEFAULT_PORT = 7878
+DEFAULT_QUEUE_SIZE = 64
+MAX_BODY_BYTES = 1024 * 1024
+MAX_BATCH_SEGMENTS = 256
+
+# 请求头最大长度；空闲连接超时（秒）
+MAX_HEADER_BYTES = 16 * 1024
+KEEPALIVE_TIMEOUT = 30
+
+# 队列已满时建议客户端等待的秒数
+RETRY_AFTER = 1
+
+# 独立运行时唤醒解释器处理 Ctrl+C 的间隔（毫秒）：Qt 事件循环运行期间 Python 不会执行信号处理函数
+SIGNAL_POLL_INTERVAL_MS = 200
+
+_REASONS = {200: 'OK', 400: 'Bad Request', 401: 'Unauthorized', 403: 'Forbidden', 404: 'Not Found',
+            405: 'Method Not Allowed', 411: 'Length Required', 413: 'Payload Too Large',
+            415: 'Unsupported Media Type', 429: 'Too Many Requests',
+            431: 'Request Header Fields Too Large', 500: 'Internal Server Error', 502: 'Bad Gateway'}
+
+
+class HttpError(Exception):
+    """返回给客户端的错误响应"""
+
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+class ServerJob:
+    """交给界面线程执行的一次请求"""
+
+    def __init__(self, kind, payload, loop, future):
+        self.kind = kind  # 'translate'、'polish'、'batch' 或 'stats'
+        self.payload = payload
+        self.loop = loop
+        self.future = future
+        self.resolved = False
+
+    def resolve(self, value):
+        """从任意线程返回结果"""
+        self.resolved = True
+        self.loop.call_soon_threadsafe(self._set, value)
+
+    def _set(self, value):
+        if not self.future.done():
+            self.future.set_result(value)
+
+
+class ClientStats:
+    """单个客户端的统计（只在事件循环线程中修改）"""
+
+    def __init__(self):
+        self.requests = 0
+        self.segments = 0
+        self.chars = 0
+        self.failed = 0
+        self.rejected = 0
+        self.busy_time = 0.0  # 请求处理时间之和
+        self.first_seen = time.monotonic()
+        self.last_seen = self.first_seen
+
+    def summary(self):
+        """请求数、段落数、失败/拒绝数、平均延迟和吞吐量（段落/秒、字符/秒）"""
+        span = max(self.last_seen - self.first_seen, 1e-3)
+        return {
+            'requests': self.requests,
+            'segments': self.segments,
+            'chars': self.chars,
+            'failed': self.failed,
+            'rejected': self.rejected,
+            'avg_latency_ms': self.busy_time / self.requests * 1000 if self.requests else 0.0,
+            'segments_per_sec': self.segments / span,
+            'chars_per_sec': self.chars / span,
+        }
+
+
+class TranslationServer(QObject):
+    """
+    本地 HTTP 翻译服务
+
+    所有连接在同一个 asyncio 事件循环中处理；需要翻译时通过 Qt 信号切回界面线程调用
+    TranslatorManager，结果经 request_ready / batch_ready 返回后再交回事件循环，
+    因此与快捷键翻译共享缓存、翻译记忆、合并和限流。处理中的段落数超过 queue_size 时
+    直接返回 429，而不是无限排队。
+    """
+
+    # 事件循环线程 -> 界面线程
+    _job_submitted = Signal(object)
+
+    def __init__(self, manager, port=DEFAULT_PORT, queue_size=DEFAULT_QUEUE_SIZE, token='', parent=None):
+        super().__init__(parent)
+        self.manager = manager
+        self.port = port
+        self.queue_size = max(1, int(queue_size))
+        self.token = token or ''  # 非空时要求 Authorization: Bearer <token>
+
+        # 以下只在界面线程中访问
+        self._jobs = {}  # 请求 ID / 批量 ID -> ServerJob
+        self._submitting = None  # 正在提交的任务（缓存命中时结果在提交过程中同步返回）
+
+        # 以下只在事件循环线程中访问
+        self._outstanding = 0  # 已接受、尚未完成的段落数
+        self._clients = {}  # 客户端 ID -> ClientStats
+        self._totals = {'requests': 0, 'rejected': 0, 'errors': 0, 'connections': 0}
+        self._started_at = None
+
+        self._loop = None
+        self._thread = None
+        self._server = None
+
+        self._job_submitted.connect(self._on_job_submitted)
+        manager.request_ready.connect(self._on_request_ready)
+        manager.request_failed.connect(self._on_request_failed)
+        manager.batch_ready.connect(self._on_batch_ready)
+
+    @property
+    def running(self):
+        """服务是否在运行"""
+        return self._server is not None
+
+    def start(self):
+        """
+        启动事件循环线程并开始监听
+
+        Returns:
+            bool: 是否启动成功（端口被占用等情况返回 False）
+        """
+        if self.running:
+            return True
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="zdtrans-server", daemon=True)
+        self._thread.start()
+        try:
+            self._server = asyncio.run_coroutine_threadsafe(self._listen(), self._loop).result(5)
+        except (OSError, TimeoutError) as e:
+            logger.error(f"本地翻译服务启动失败（端口 {self.port}）: {e}")
+            self._stop_loop()
+            return False
+        self._started_at = time.monotonic()
+        logger.info(f"本地翻译服务已启动: http://{HOST}:{self.port}")
+        return True
+
+    def stop(self, timeout=2.0):
+        """停止监听并关闭事件循环（未完成的请求直接断开）"""
+        if self._server is None:
+            return
+        server, self._server = self._server, None
+
+        async def _close():
+            server.close()
+            # 断开仍保持的连接和等待中的请求
+            tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await server.wait_closed()
+
+        try:
+            asyncio.run_coroutine_threadsafe(_close(), self._loop).result(timeout)
+        except Exception:
+            pass
+        self._stop_loop(timeout)
+        self._jobs.clear()
+        logger.info("本地翻译服务已停止")
+
+    def configure(self, port=None, queue_size=None, token=None):
+        """更新端口、队列上限和访问令牌，端口变化时重启服务"""
+        if queue_size is not None:
+            self.queue_size = max(1, int(queue_size))
+        if token is not None:
+            self.token = token
+        if port is not None and port != self.port:
+            self.port = port
+            if self.running:
+                self.stop()
+                self.start()
+
+    def _stop_loop(self, timeout=2.0):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout)
+        self._loop = None
+        self._thread = None
+
+    # ---- 以下方法在界面线程中执行 ----
+
+    def _on_job_submitted(self, job):
+        """提交给 TranslatorManager"""
+        if job.kind == 'stats':
+            job.resolve(('ok', dict(self.manager.request_stats(), cache=self.manager.cache_stats())))
+            return
+        self._submitting = job
+        try:
+            if job.kind == 'batch':
+                job_id = self.manager.translate_batch(job.payload['segments'], job.payload['action'])
+            elif job.kind == 'polish':
+                job_id = self.manager.polish(job.payload, interactive=False)
+            else:
+                job_id = self.manager.translate(job.payload, interactive=False)
+        except Exception as e:
+            logger.exception("本地翻译服务提交请求失败")
+            job.resolve(('error', str(e)))
+            return
+        finally:
+            self._submitting = None
+        if not job.resolved:
+            self._jobs[job_id] = job
+
+    def _take(self, job_id, batch=False):
+        """取出请求对应的任务（同步返回时为正在提交的任务）"""
+        job = self._jobs.get(job_id, self._submitting)
+        if job is None or (job.kind == 'batch') != batch:
+            return None
+        self._jobs.pop(job_id, None)
+        return job
+
+    def _on_request_ready(self, request_id, result, action_type):
+        job = self._take(request_id)
+        if job is not None:
+            job.resolve(('ok', result))
+
+    def _on_request_failed(self, request_id, error_msg):
+        job = self._take(request_id)
+        if job is not None:
+            job.resolve(('error', error_msg))
+
+    def _on_batch_ready(self, batch_id, results):
+        job = self._take(batch_id, batch=True)
+        if job is not None:
+            job.resolve(('ok', results))
+
+    # ---- 以下方法在事件循环线程中执行 ----
+
+    async def _listen(self):
+        return await asyncio.start_server(self._handle_connection, HOST, self.port, limit=MAX_HEADER_BYTES)
+
+    async def _handle_connection(self, reader, writer):
+        """处理一个连接上的请求（支持 keep-alive）"""
+        self._totals['connections'] += 1
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(self._read_request(reader), KEEPALIVE_TIMEOUT)
+                except HttpError as e:
+                    await self._respond(writer, e.status, {'error': str(e)}, e.headers, keep_alive=False)
+                    break
+                if request is None:
+                    break
+                method, path, headers, body = request
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                try:
+                    status, payload, extra = await self._dispatch(method, path, headers, body)
+                except HttpError as e:
+                    self._totals['errors'] += e.status != 429
+                    status, payload, extra = e.status, {'error': str(e)}, e.headers
+                except Exception as e:
+                    logger.exception("本地翻译服务处理请求失败")
+                    self._totals['errors'] += 1
+                    status, payload, extra = 500, {'error': str(e)}, {}
+                await self._respond(writer, status, payload, extra, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except asyncio.CancelledError:
+            pass  # 服务停止
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader):
+        """
+        读取一个请求
+
+        Returns:
+            tuple: (method, path, headers, body)，连接已关闭时返回 None
+        """
+        try:
+            head = await reader.readuntil(b'\r\n\r\n')
+        except asyncio.IncompleteReadError as e:
+            if not e.partial.strip():
+                return None
+            raise
+        except asyncio.LimitOverrunError:
+            raise HttpError(431, "request header too large")
+
+        lines = head.decode('latin-1').split('\r\n')
+        try:
+            method, path, _ = lines[0].split(' ', 2)
+        except ValueError:
+            raise HttpError(400, "malformed request line")
+        headers = {}
+        for line in lines[1:]:
+            if ':' in line:
+                name, value = line.split(':', 1)
+                headers[name.strip().lower()] = value.strip()
+
+        if 'chunked' in headers.get('transfer-encoding', '').lower():
+            raise HttpError(411, "chunked request body is not supported")
+        try:
+            length = int(headers.get('content-length', 0))
+        except ValueError:
+            raise HttpError(400, "invalid Content-Length")
+        if length > MAX_BODY_BYTES:
+            raise HttpError(413, f"request body exceeds {MAX_BODY_BYTES} bytes")
+        body = await reader.readexactly(length) if length else b''
+        return method.upper(), path.split('?', 1)[0], headers, body
+
+    async def _dispatch(self, method, path, headers, body):
+        """
+        路由请求
+
+        Returns:
+            tuple: (状态码, 响应 JSON, 额外响应头)
+        """
+        self._check_host(headers)
+        if path == '/health':
+            return 200, {'status': 'ok'}, {}
+        if path == '/stats':
+            if method != 'GET':
+                raise HttpError(405, "use GET")
+            self._check_token(headers)
+            return 200, await self._stats(), {}
+        if path not in ('/translate', '/polish', '/batch'):
+            raise HttpError(404, f"unknown endpoint {path}")
+        self._check_token(headers)
+        if method != 'POST':
+            raise HttpError(405, "use POST")
+        if headers.get('content-type', '').split(';', 1)[0].strip().lower() != 'application/json':
+            raise HttpError(415, "Content-Type must be application/json")
+
+        try:
+            data = json.loads(body or b'{}')
+        except (ValueError, UnicodeDecodeError):
+            raise HttpError(400, "request body must be JSON")
+        if not isinstance(data, dict):
+            raise HttpError(400, "request body must be a JSON object")
+
+        if path == '/batch':
+            segments = data.get('segments')
+            action = data.get('action', 'translate')
+            if not isinstance(segments, list) or not all(isinstance(s, str) for s in segments):
+                raise HttpError(400, "'segments' must be a list of strings")
+            if len(segments) > MAX_BATCH_SEGMENTS:
+                raise HttpError(413, f"at most {MAX_BATCH_SEGMENTS} segments per batch")
+            if action not in ('translate', 'polish'):
+                raise HttpError(400, "'action' must be 'translate' or 'polish'")
+            kind, payload, units, chars = 'batch', {'segments': segments, 'action': action}, \
+                max(1, len(segments)), sum(len(s) for s in segments)
+        else:
+            text = data.get('text')
+            if not isinstance(text, str) or not text.strip():
+                raise HttpError(400, "'text' must be a non-empty string")
+            kind, payload, units, chars = path[1:], text, 1, len(text)
+
+        client = self._client(headers)
+        if self._outstanding + units > self.queue_size and self._outstanding > 0:
+            client.rejected += 1
+            self._totals['rejected'] += 1
+            raise HttpError(429, f"queue full ({self._outstanding}/{self.queue_size} segments in progress)",
+                            {'Retry-After': str(RETRY_AFTER)})
+
+        self._outstanding += units
+        self._totals['requests'] += 1
+        start = time.monotonic()
+        try:
+            status, value = await self._submit(kind, payload)
+        finally:
+            self._outstanding -= units
+            client.requests += 1
+            client.busy_time += time.monotonic() - start
+            client.last_seen = time.monotonic()
+
+        if status != 'ok':
+            client.failed += 1
+            raise HttpError(502, value)
+        client.segments += units
+        client.chars += chars
+        if kind == 'batch':
+            failed = [i for i, result in enumerate(value) if result is None]
+            client.failed += bool(failed)
+            return 200, {'results': value, 'failed': failed}, {}
+        return 200, {'result': value}, {}
+
+    def _check_host(self, headers):
+        """只接受发往本机地址的请求：DNS 重绑定的网页发出的请求 Host 为其自己的域名"""
+        if headers.get('host', '').lower() not in (f'{HOST}:{self.port}', f'localhost:{self.port}'):
+            raise HttpError(403, "Host must be 127.0.0.1 or localhost")
+
+    def _check_token(self, headers):
+        """配置了访问令牌时校验 Authorization 请求头"""
+        if not self.token:
+            return
+        scheme, _, value = headers.get('authorization', '').partition(' ')
+        # 请求头按 latin-1 解码，还原为原始字节比较（compare_digest 不接受非 ASCII 字符串）
+        if scheme.lower() != 'bearer' or not hmac.compare_digest(value.strip().encode('latin-1'),
+                                                                 self.token.encode('utf-8')):
+            raise HttpError(401, "missing or invalid token", {'WWW-Authenticate': 'Bearer'})
+
+    async def _submit(self, kind, payload):
+        """交给界面线程执行并等待结果"""
+        future = self._loop.create_future()
+        self._job_submitted.emit(ServerJob(kind, payload, self._loop, future))
+        return await future
+
+    async def _stats(self):
+        """服务统计，以及界面线程中获取的翻译管理器统计"""
+        _, manager_stats = await self._submit('stats', None)
+        return {
+            'server': dict(self._totals,
+                           queue_depth=self._outstanding,
+                           queue_size=self.queue_size,
+                           uptime=time.monotonic() - self._started_at if self._started_at else 0.0),
+            'clients': {client_id: stats.summary() for client_id, stats in self._clients.items()},
+            'translator': manager_stats,
+        }
+
+    def _client(self, headers):
+        """按 X-Client-Id（没有时按 User-Agent）区分客户端"""
+        client_id = headers.get('x-client-id') or headers.get('user-agent') or 'anonymous'
+        client = self._clients.get(client_id)
+        if client is None:
+            client = self._clients[client_id] = ClientStats()
+        return client
+
+    async def _respond(self, writer, status, payload, headers=None, keep_alive=True):
+        """写出 JSON 响应"""
+        body = json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8')
+        lines = [f"HTTP/1.1 {status} {_REASONS.get(status, '')}",
+                 "Content-Type: application/json; charset=utf-8",
+                 f"Content-Length: {len(body)}",
+                 f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body)
+        await writer.drain()
+
+
+def main(argv=None):
+    """独立运行本地翻译服务（不启动界面）"""
+    from .translator import TranslatorManager
+    from .utils import load_config
+
+    parser = argparse.ArgumentParser(prog='python -m src.server', description='ZDTrans 本地 HTTP 翻译服务')
+    parser.add_argument('--port', type=int, help=f'监听端口（默认使用配置，或 {DEFAULT_PORT}）')
+    parser.add_argument('--queue-size', type=int, help=f'处理中的段落数上限（默认 {DEFAULT_QUEUE_SIZE}）')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    config = load_config()
+    general_config = config.get('general', {})
+    app = QCoreApplication.instance() or QCoreApplication([sys.argv[0]])
+    # Ctrl+C / SIGTERM 时退出事件循环，由 finally 停止服务并关闭翻译管理器（写回磁盘缓存和翻译记忆）
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: app.quit())
+    wakeup = QTimer()
+    wakeup.timeout.connect(lambda: None)
+    wakeup.start(SIGNAL_POLL_INTERVAL_MS)
+    manager = TranslatorManager(config['api'], general_config)
+    trans_config = config.get('translation', {})
+    if trans_config.get('keywords'):
+        manager.set_keywords(trans_config['keywords'])
+    if trans_config.get('glossary_file'):
+        manager.set_glossary_file(trans_config['glossary_file'])
+
+    server = TranslationServer(manager,
+                               args.port or general_config.get('server_port', DEFAULT_PORT),
+                               args.queue_size or general_config.get('server_queue_size', DEFAULT_QUEUE_SIZE),
+                               general_config.get('server_token', ''))
+    if not server.start():
+        manager.shutdown()
+        return 1
+    try:
+        return app.exec()
+    finally:
+        server.stop()
+        manager.shutdown()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
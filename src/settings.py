@@ -97,12 +97,17 @@ class SettingsDialog(QDialog):
         
         # 关键词输入（改为多行文本框，更大的输入区域）
         self.keywords_edit = QTextEdit()
-        self.keywords_edit.setPlaceholderText("例如：机器学习, 神经网络, 深度学习, Transformer, BERT\n用逗号分隔多个关键词，支持中英文")
+        self.keywords_edit.setPlaceholderText("例如：机器学习, 神经网络, Transformer=变换器, BERT\n用逗号分隔多个关键词，支持中英文，可用 \"术语=译法\" 指定译法")
         self.keywords_edit.setMaximumHeight(80)
         self.keywords_edit.setToolTip("输入专业领域的关键词，帮助AI更准确地翻译术语")
         self.keywords_edit.setToolTip("输入专业领域的关键词，帮助AI更准确地翻译术语")
         trans_layout.addRow("关键词:", self.keywords_edit)
         
+        self.glossary_file_edit = QLineEdit()
+        self.glossary_file_edit.setPlaceholderText("术语表文件路径（每行：术语<Tab>译法），可选")
+        self.glossary_file_edit.setToolTip("只有原文中实际出现的术语才会发送给AI，术语表再大也不会增加每次请求的长度")
+        trans_layout.addRow("术语表文件:", self.glossary_file_edit)
+        
         self.academic_mode_check = QCheckBox("学术模式")
         self.academic_mode_check.setToolTip("开启后将使用学术论文专用的翻译风格")
         trans_layout.addRow("", self.academic_mode_check)
@@ -213,6 +218,7 @@ class SettingsDialog(QDialog):
         
         self.custom_context_edit.setPlainText(trans_config.get('custom_context', ''))
         self.keywords_edit.setPlainText(trans_config.get('keywords', ''))  # 改为 setPlainText
+        self.glossary_file_edit.setText(trans_config.get('glossary_file', ''))
         self.academic_mode_check.setChecked(trans_config.get('academic_mode', False))
         self.preserve_terms_check.setChecked(trans_config.get('preserve_terms', True))
         
@@ -243,6 +249,10 @@ class SettingsDialog(QDialog):
         elif provider_text == "火山方舟(豆包)":
             self.base_url_edit.setPlaceholderText("https://ark.cn-beijing.volces.com/api/v3")
             self.model_edit.setPlaceholderText("doubao-pro-32k")
+        elif provider_text == "DeepL":
+            # 免费版密钥（以 :fx 结尾）请填写 https://api-free.deepl.com
+            self.base_url_edit.setPlaceholderText("https://api.deepl.com")
+            self.model_edit.setPlaceholderText("latency_optimized")
         elif provider_text == "Claude":
             self.base_url_edit.setPlaceholderText("https://api.anthropic.com/v1")
             self.model_edit.setPlaceholderText("claude-3-sonnet-20240229")
@@ -299,18 +309,21 @@ class SettingsDialog(QDialog):
             # 自定义领域，直接使用文本
             domain = domain_text
             
-        # 构建新配置
+        # 构建新配置（保留界面上没有暴露的高级 API 选项，如连接池参数）
+        api_config = dict(self.current_config.get('api', {}))
+        api_config.update({
+            'provider': provider,
+            'api_key': api_key,
+            'base_url': base_url,
+            'model': model
+        })
         new_config = {
-            'api': {
-                'provider': provider,
-                'api_key': api_key,
-                'base_url': base_url,
-                'model': model
-            },
+            'api': api_config,
             'translation': {
                 'domain': domain,
                 'custom_context': self.custom_context_edit.toPlainText().strip(),
                 'keywords': self.keywords_edit.toPlainText().strip(),  # 改为 toPlainText
+                'glossary_file': self.glossary_file_edit.text().strip(),
                 'preserve_terms': self.preserve_terms_check.isChecked(),
                 'academic_mode': self.academic_mode_check.isChecked()
             },
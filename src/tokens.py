@@ -0,0 +1,96 @@
+"""
+Token 估算模块
+不依赖分词器，按文字类型快速估算 token 数，在发送前控制提示词大小并按输入设置输出上限
+"""
+
+import re
+
+from .chunking import context_window, MAX_OUTPUT_TOKENS
+
+
+# 中日韩文字（含全角标点）逐字计数，拉丁文按单词，数字按每 3 位，其余符号逐个计数
+_TOKEN_PIECE = re.compile(r'[\u2e80-\u9fff\uac00-\ud7af\uf900-\ufaff\uff00-\uffef]|[A-Za-z\u00c0-\u024f]+|\d+|\S')
+
+# 每条消息的格式开销（角色标记等）和整个请求的固定开销
+MESSAGE_OVERHEAD_TOKENS = 4
+REQUEST_OVERHEAD_TOKENS = 3
+
+# 关键词上下文的默认 token 上限
+DEFAULT_KEYWORD_MAX_TOKENS = 300
+
+# 输出上限 = 输入 × 系数 + 余量：中文译成英文时 token 数通常会增加，润色结果与原文长度相近
+OUTPUT_TOKEN_RATIO = {'translate': 2.0, 'polish': 1.5}
+OUTPUT_MARGIN_TOKENS = 64
+MIN_OUTPUT_TOKENS = 256
+
+
+def estimate_tokens(text):
+    """
+    估算文本的 token 数
+
+    中日韩文字约 1 字 1 token；拉丁文单词短的约 1 token，每多 8 个字母约多 1 个；
+    数字每 3 位约 1 token；标点和其他符号各 1 个；空白并入后面的单词不单独计数。
+    """
+    count = 0
+    for piece in _TOKEN_PIECE.findall(text):
+        length = len(piece)
+        if length == 1:
+            count += 1
+        elif piece[0].isdigit():
+            count += (length + 2) // 3
+        else:
+            count += 1 + length // 8
+    return count
+
+
+def estimate_messages_tokens(messages):
+    """估算 chat/completions 消息列表的输入 token 数"""
+    return REQUEST_OVERHEAD_TOKENS + sum(
+        MESSAGE_OVERHEAD_TOKENS + estimate_tokens(message.get('content', '')) for message in messages
+    )
+
+
+def keyword_budget(model, text_tokens, max_tokens=DEFAULT_KEYWORD_MAX_TOKENS):
+    """
+    关键词上下文可用的 token 数
+
+    原文和预计的输出占满上下文窗口时相应减少，最多 max_tokens。
+    """
+    room = context_window(model) - text_tokens * 2 - MIN_OUTPUT_TOKENS
+    return max(0, min(max_tokens, room))
+
+
+def fit_terms(terms, budget):
+    """
+    把术语列表压缩到预算以内
+
+    超出时优先保留带指定译法的术语（"术语 → 译法"），其次按原顺序保留，直到用完预算。
+
+    Returns:
+        tuple: (保留的术语列表, 丢弃的术语数)
+    """
+    tokens = [estimate_tokens(term) + 1 for term in terms]  # 每个术语另加一个分隔符
+    if sum(tokens) <= budget:
+        return list(terms), 0
+
+    order = sorted(range(len(terms)), key=lambda i: ('→' not in terms[i], i))
+    kept = set()
+    used = 0
+    for i in order:
+        if used + tokens[i] <= budget:
+            kept.add(i)
+            used += tokens[i]
+    return [term for i, term in enumerate(terms) if i in kept], len(terms) - len(kept)
+
+
+def output_budget(text_tokens, action_type, available):
+    """
+    按输入大小计算 max_tokens
+
+    Args:
+        text_tokens: 原文的 token 数
+        action_type: 'translate' 或 'polish'
+        available: 上下文窗口中扣除提示词后剩余的 token 数
+    """
+    tokens = int(text_tokens * OUTPUT_TOKEN_RATIO.get(action_type, 2.0)) + OUTPUT_MARGIN_TOKENS
+    return max(1, min(max(tokens, MIN_OUTPUT_TOKENS), MAX_OUTPUT_TOKENS, available))
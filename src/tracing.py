@@ -0,0 +1,206 @@
+"""
+链路追踪模块
+按阶段记录快捷键 → 获取选中文本 → 缓存/网络 → 弹出窗口各环节的耗时，导出为 Chrome trace-event JSON
+（~/.zdtrans/traces 下，可在 chrome://tracing 或 Perfetto 中打开）；关闭时 span() 只做一次属性判断
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+from .utils import get_data_dir
+
+logger = logging.getLogger(__name__)
+
+# 内存中最多缓存的事件数，超出后丢弃（避免忘记关闭时无限增长）
+MAX_EVENTS = 100000
+
+# 追踪目录中最多保留的文件数，超出时删除最早的文件
+DEFAULT_MAX_FILES = 50
+
+
+class _NullSpan:
+    """追踪关闭时使用的空 span"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **args):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    """同步 span：在同一线程内开始和结束，导出为完整事件（ph=X）"""
+
+    __slots__ = ('tracer', 'name', 'cat', 'args', 'start')
+
+    def __init__(self, tracer, name, cat, args):
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.args = args
+
+    def __enter__(self):
+        self.start = self.tracer.now()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.args['error'] = exc_type.__name__
+        self.tracer._record({'ph': 'X', 'name': self.name, 'cat': self.cat, 'ts': self.start,
+                             'dur': self.tracer.now() - self.start, 'args': self.args})
+        return False
+
+    def set(self, **args):
+        """补充参数（如结束时才知道的大小或结果）"""
+        self.args.update(args)
+
+
+class _AsyncSpan(_Span):
+    """异步 span：可跨线程或在事件循环中交错，导出为一对异步事件（ph=b/e）"""
+
+    __slots__ = ('async_id',)
+
+    def __init__(self, tracer, name, cat, args, async_id):
+        super().__init__(tracer, name, cat, args)
+        self.async_id = async_id
+
+    def __enter__(self):
+        self.tracer.begin(self.name, self.async_id, self.cat)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.args['error'] = exc_type.__name__
+        self.tracer.end(self.name, self.async_id, self.cat, **self.args)
+        return False
+
+
+class Tracer:
+    """
+    进程内的追踪器
+
+    事件先缓存在内存中，flush() 时写成一个 trace 文件。所有方法线程安全；
+    关闭时 span()/async_span() 返回共享的空 span，instant()/begin()/end() 直接返回。
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.directory = None
+        self.max_files = DEFAULT_MAX_FILES
+        self._events = []
+        self._dropped = 0
+        self._named_threads = set()
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter_ns()
+        self._pid = os.getpid()
+
+    def configure(self, enabled, directory=None, max_files=DEFAULT_MAX_FILES):
+        """
+        开启或关闭追踪
+
+        Args:
+            enabled: 是否记录
+            directory: trace 文件目录，默认 ~/.zdtrans/traces
+            max_files: 目录中最多保留的文件数
+        """
+        if self.enabled and not enabled:
+            self.flush()
+        self.directory = Path(directory) if directory else get_data_dir() / 'traces'
+        self.max_files = max_files
+        self.enabled = enabled
+
+    def now(self):
+        """相对时间戳（微秒）"""
+        return (time.perf_counter_ns() - self._origin) / 1000
+
+    def span(self, name, cat='app', **args):
+        """同步阶段：with tracer.span('cache.lookup'): ..."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, cat, args)
+
+    def async_span(self, name, async_id, cat='request', **args):
+        """可能与其他阶段交错的阶段（如 asyncio 协程中的网络请求），按 async_id 关联"""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _AsyncSpan(self, name, cat, args, async_id)
+
+    def instant(self, name, cat='app', **args):
+        """瞬时事件（如快捷键按下、缓存命中）"""
+        if self.enabled:
+            self._record({'ph': 'i', 'name': name, 'cat': cat, 'ts': self.now(), 's': 't', 'args': args})
+
+    def begin(self, name, async_id, cat='request', **args):
+        """开始一个跨回调的阶段（如请求从提交到返回结果）"""
+        if self.enabled:
+            self._record({'ph': 'b', 'name': name, 'cat': cat, 'id': async_id, 'ts': self.now(), 'args': args})
+
+    def end(self, name, async_id, cat='request', **args):
+        """结束 begin() 开始的阶段"""
+        if self.enabled:
+            self._record({'ph': 'e', 'name': name, 'cat': cat, 'id': async_id, 'ts': self.now(), 'args': args})
+
+    def _record(self, event):
+        thread = threading.current_thread()
+        event['pid'] = self._pid
+        event['tid'] = thread.ident
+        with self._lock:
+            if len(self._events) >= MAX_EVENTS:
+                self._dropped += 1
+                return
+            if thread.ident not in self._named_threads:
+                self._named_threads.add(thread.ident)
+                self._events.append({'ph': 'M', 'name': 'thread_name', 'pid': self._pid, 'tid': thread.ident,
+                                     'args': {'name': thread.name}})
+            self._events.append(event)
+
+    def flush(self, label='trace'):
+        """
+        把缓存的事件写成一个 trace 文件并清空缓存
+
+        Returns:
+            Path: 写入的文件，没有事件或写入失败时返回 None
+        """
+        with self._lock:
+            events, self._events = self._events, []
+            dropped, self._dropped = self._dropped, 0
+            self._named_threads = set()
+        if not any(event['ph'] != 'M' for event in events) or self.directory is None:
+            return None
+
+        path = self.directory / f"{label}-{time.strftime('%Y%m%d-%H%M%S')}-{int(time.time() * 1000) % 1000:03d}.json"
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump({'traceEvents': events, 'displayTimeUnit': 'ms',
+                           'otherData': {'dropped_events': dropped}}, f, ensure_ascii=False, default=str)
+            self._prune()
+        except OSError as e:
+            logger.error(f"写入 trace 文件失败: {e}")
+            return None
+        return path
+
+    def _prune(self):
+        """只保留最新的 max_files 个文件"""
+        files = sorted(self.directory.glob('*.json'), key=lambda p: p.stat().st_mtime)
+        for old in files[:-self.max_files] if self.max_files > 0 else []:
+            try:
+                old.unlink()
+            except OSError:
+                pass
+
+
+# 全局追踪器
+tracer = Tracer()
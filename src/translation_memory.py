@@ -0,0 +1,288 @@
+"""
+翻译记忆模块
+用字符 n-gram + MinHash/LSH 建立近似匹配索引，原文与已翻译内容只差数字、名称或空白时
+直接复用已有译文；索引常驻内存，条目持久化到 ~/.zdtrans 下的 SQLite
+"""
+
+import logging
+import queue
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+import zlib
+from array import array
+from collections import Counter, OrderedDict, defaultdict
+
+
+logger = logging.getLogger(__name__)
+
+# 字符 n-gram 长度（对中日韩文字和拉丁文字都适用）
+SHINGLE_SIZE = 3
+
+# MinHash 签名长度和 LSH 分带：BANDS × ROWS = NUM_HASHES
+NUM_HASHES = 64
+BANDS = 8
+ROWS = NUM_HASHES // BANDS
+
+# 每次查询最多考虑的候选数（按命中的分带数排序）
+MAX_CANDIDATES = 16
+
+# 签名估计的相似度比阈值低出该值的候选不做精确比较（64 个哈希时估计值的标准差约 0.04）
+ESTIMATE_MARGIN = 0.15
+
+# 默认相似度阈值（字符 n-gram 的 Jaccard 相似度）
+DEFAULT_THRESHOLD = 0.9
+
+# 默认最多保留的条目数，超出时淘汰最早加入的条目
+DEFAULT_MAX_ENTRIES = 200000
+
+# 短于该长度的文本不做近似匹配（差一个字就是另一个意思）
+MIN_CHARS = 20
+
+_WHITESPACE = re.compile(r'\s+')
+_EMPTY = 0xFFFFFFFF
+
+_STOP = object()
+
+
+def normalize(text):
+    """统一全半角、大小写和空白"""
+    return _WHITESPACE.sub(' ', unicodedata.normalize('NFKC', text).lower()).strip()
+
+
+def shingles(text):
+    """规范化后的字符 n-gram 集合"""
+    text = normalize(text)
+    if len(text) <= SHINGLE_SIZE:
+        return {text}
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def signature(shingle_set):
+    """
+    计算 MinHash 签名（单次哈希分桶 + 致密化）
+
+    每个 n-gram 只哈希一次：低位决定所在的桶，高位参与桶内取最小值；
+    空桶借用右侧最近的非空桶的值，使短文本的签名同样可比。
+    """
+    sig = [_EMPTY] * NUM_HASHES
+    for s in shingle_set:
+        h = zlib.crc32(s.encode('utf-8'))
+        slot = h % NUM_HASHES
+        value = h // NUM_HASHES
+        if value < sig[slot]:
+            sig[slot] = value
+    for i in range(NUM_HASHES):
+        if sig[i] == _EMPTY:
+            for offset in range(1, NUM_HASHES):
+                value = sig[(i + offset) % NUM_HASHES]
+                if value != _EMPTY:
+                    sig[i] = (value + offset * 0x9E3779B1) & _EMPTY
+                    break
+    return array('I', sig)
+
+
+def jaccard(a, b):
+    """两个集合的 Jaccard 相似度"""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def estimate_similarity(a, b):
+    """按两个签名中相等的位置比例估计 Jaccard 相似度"""
+    return sum(x == y for x, y in zip(a, b)) / NUM_HASHES
+
+
+def _band_keys(sig):
+    """签名的各个 LSH 分带键"""
+    return [(band, tuple(sig[band * ROWS:(band + 1) * ROWS])) for band in range(BANDS)]
+
+
+class TranslationMemory:
+    """
+    近似匹配翻译记忆
+
+    lookup() 只读内存索引，在调用线程中执行；持久化读写由专用后台线程完成，
+    启动时在后台加载已有条目，加载完成前的查询只会未命中。
+    """
+
+    def __init__(self, path=None, threshold=DEFAULT_THRESHOLD, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # id -> (scope, source, translation, signature)
+        self._buckets = defaultdict(set)  # (scope, band, band_hash) -> {id}
+        self._next_id = 1
+        self._hits = 0
+        self._misses = 0
+        self._lookup_time = 0.0
+
+        self._tasks = queue.Queue()
+        self._thread = None
+        if path is not None:
+            self._thread = threading.Thread(target=self._run, name="zdtrans-memory", daemon=True)
+            self._thread.start()
+
+    def lookup(self, source, scope):
+        """
+        查找最相似的已翻译原文
+
+        Args:
+            source: 原文
+            scope: 作用域（如 'translate'），不同作用域的条目互不匹配
+
+        Returns:
+            tuple: (similarity, 匹配到的原文, 译文)，未达到阈值时返回 None
+        """
+        if len(source) < MIN_CHARS:
+            return None
+
+        start = time.perf_counter()
+        query = shingles(source)
+        sig = signature(query)
+        with self._lock:
+            counts = Counter()
+            for band, key in _band_keys(sig):
+                counts.update(self._buckets.get((scope, band, key), ()))
+            matches = [self._entries[entry_id] for entry_id, _ in counts.most_common(MAX_CANDIDATES)]
+
+        best = None
+        for _, stored_source, translation, stored_sig in matches:
+            # 重新切分候选原文的开销远大于比较签名，先排除明显不够相似的候选
+            if estimate_similarity(sig, stored_sig) < self.threshold - ESTIMATE_MARGIN:
+                continue
+            similarity = jaccard(query, shingles(stored_source))
+            if similarity >= self.threshold and (best is None or similarity > best[0]):
+                best = (similarity, stored_source, translation)
+
+        with self._lock:
+            self._lookup_time += time.perf_counter() - start
+            if best is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+        return best
+
+    def add(self, source, translation, scope):
+        """加入一条译文（同时异步写入磁盘）"""
+        if len(source) < MIN_CHARS:
+            return
+        sig = signature(shingles(source))
+        self._insert(scope, source, translation, sig)
+        if self._thread is not None:
+            self._tasks.put((self._save, (scope, source, translation, sig.tobytes())))
+
+    def configure(self, threshold=None, max_entries=None):
+        """更新相似度阈值和条目上限"""
+        if threshold is not None:
+            self.threshold = threshold
+        if max_entries is not None:
+            self.max_entries = max_entries
+            with self._lock:
+                self._trim()
+
+    def stats(self):
+        """条目数、命中次数和平均查询耗时（毫秒）"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'entries': len(self._entries),
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': self._hits / lookups if lookups else 0.0,
+                'avg_lookup_ms': self._lookup_time / lookups * 1000 if lookups else 0.0
+            }
+
+    def close(self, timeout=2.0):
+        """处理完待写入的条目后关闭数据库"""
+        if self._thread is not None:
+            self._tasks.put(_STOP)
+            self._thread.join(timeout)
+
+    def _insert(self, scope, source, translation, sig):
+        """加入内存索引"""
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = (scope, source, translation, sig)
+            for band, key in _band_keys(sig):
+                self._buckets[(scope, band, key)].add(entry_id)
+            self._trim()
+
+    def _trim(self):
+        """淘汰最早的条目直到满足上限（调用方需持有锁）"""
+        while len(self._entries) > self.max_entries:
+            entry_id, (scope, _, _, sig) = self._entries.popitem(last=False)
+            for band, key in _band_keys(sig):
+                bucket = self._buckets.get((scope, band, key))
+                if bucket is not None:
+                    bucket.discard(entry_id)
+                    if not bucket:
+                        del self._buckets[(scope, band, key)]
+
+    # ---- 以下方法只在后台线程中执行 ----
+
+    def _run(self):
+        """后台线程：加载已有条目，然后串行执行写入"""
+        try:
+            self._conn = sqlite3.connect(str(self.path))
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS memory ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " scope TEXT NOT NULL,"
+                " source TEXT NOT NULL,"
+                " translation TEXT NOT NULL,"
+                " signature BLOB NOT NULL)"
+            )
+            self._conn.commit()
+            self._load()
+        except sqlite3.Error as e:
+            logger.error(f"打开翻译记忆失败: {e}")
+            while self._tasks.get() is not _STOP:
+                pass
+            return
+
+        while True:
+            task = self._tasks.get()
+            if task is _STOP:
+                break
+            func, args = task
+            try:
+                func(*args)
+            except sqlite3.Error as e:
+                logger.error(f"翻译记忆写入失败: {e}")
+        self._conn.close()
+
+    def _load(self):
+        """加载最近的 max_entries 条记录（签名已持久化，无需重新计算）"""
+        start = time.perf_counter()
+        rows = self._conn.execute(
+            "SELECT scope, source, translation, signature FROM memory ORDER BY id DESC LIMIT ?",
+            (self.max_entries,)
+        ).fetchall()
+        for scope, source, translation, blob in reversed(rows):
+            sig = array('I')
+            sig.frombytes(blob)
+            if len(sig) == NUM_HASHES:
+                self._insert(scope, source, translation, sig)
+        logger.info(f"翻译记忆已加载 {len(rows)} 条，耗时 {(time.perf_counter() - start) * 1000:.0f} ms")
+
+        # 删除超出上限的旧记录
+        with self._conn:
+            self._conn.execute(
+                "DELETE FROM memory WHERE id NOT IN (SELECT id FROM memory ORDER BY id DESC LIMIT ?)",
+                (self.max_entries,)
+            )
+
+    def _save(self, scope, source, translation, blob):
+        """写入一条记录"""
+        with self._conn:
+            self._conn.execute(
+                "INSERT INTO memory (scope, source, translation, signature) VALUES (?, ?, ?, ?)",
+                (scope, source, translation, blob)
+            )
@@ -4,142 +4,424 @@
 """
 
 import requests
-from PySide6.QtCore import QObject, Signal, QThread
+from PySide6.QtCore import QObject, QTimer, Signal
+import itertools
+from collections import OrderedDict
 import json
+import logging
+import threading
 import time
 
+from . import async_engine
+from .async_engine import AsyncTranslationEngine, AsyncTranslatorJob, DEFAULT_MAX_CONCURRENCY
+from .chunking import split_text, join_chunks, joiner, chunk_char_limit, DEFAULT_CHUNK_MAX_CHARS
+from .cache import TranslationCache, make_cache_key, DEFAULT_MAX_BYTES
+from .disk_cache import DiskCache, DEFAULT_DISK_MAX_BYTES
+from .translation_memory import TranslationMemory, DEFAULT_THRESHOLD, DEFAULT_MAX_ENTRIES
+from .glossary import Glossary, parse_entries, load_glossary_file
+from .langdetect import is_target_language, is_untranslatable, resolve_target
+from .latency import LatencyTracker, provider_key
+from .http_pool import SessionPool, DEFAULT_POOL_SIZE, DEFAULT_IDLE_TIMEOUT
+from .resilience import ProviderHealth, ProviderError, backoff_delay, parse_retry_after, DEFAULT_MAX_RETRIES
+from .rate_limit import estimate_prompt_tokens, estimate_request_tokens
+from .tokens import estimate_tokens
+from .providers import (build_chat_request, build_batch_request, build_deepl_request,
+                        parse_chat_response, parse_batch_response, parse_deepl_response,
+                        iter_stream_deltas, resolve_base_url, resolve_model, StreamAccumulator)
+from .tracing import tracer
+from .utils import get_data_dir
+from .worker_pool import (WorkerPool, DEFAULT_MAX_WORKERS, PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND,
+                          PRIORITY_SPECULATIVE)
 
-class TranslatorWorker(QThread):
-    """翻译工作线程"""
+
+logger = logging.getLogger(__name__)
+
+# 交互式请求的取代策略：新请求取消旧请求 / 全部排队完成
+SUPERSEDE_LATEST_WINS = 'latest_wins'
+SUPERSEDE_QUEUE_ALL = 'queue_all'
+
+# 批量请求每次最多合并的段落数和字符数
+BATCH_MAX_SEGMENTS = 40
+BATCH_MAX_CHARS = 6000
+
+# 对冲请求：主提供商超过该延迟（其最近 p95，样本不足时用默认值）仍未响应时，同时请求备用提供商
+HEDGE_PERCENTILE = 95
+HEDGE_MIN_SAMPLES = 10
+HEDGE_DEFAULT_DELAY = 2.0
+HEDGE_MIN_DELAY = 0.3
+HEDGE_MAX_DELAY = 10.0
+
+# 预取：已完成但尚未被快捷键请求使用的结果最多跟踪的条数，超出时最早的一条计为浪费
+SPECULATIVE_WINDOW = 20
+
+# 请求执行引擎：线程池（默认）/ asyncio 事件循环
+ENGINE_THREAD = 'thread'
+ENGINE_ASYNCIO = 'asyncio'
+
+
+class InflightRequest:
+    """处理中的请求，相同缓存键的后续请求作为 waiters 合并到这里"""
     
-    # 信号定义
-    result_ready = Signal(str, str)  # (result_text, action_type)
-    error_occurred = Signal(str)
+    def __init__(self, request_id, cache_key, text, action_type, target_lang=None):
+        self.request_id = request_id
+        self.cache_key = cache_key
+        self.text = text
+        self.action_type = action_type
+        self.target_lang = target_lang  # 翻译的目标语言，润色时为 None
+        self.speculative = False  # 剪贴板预取发起的请求
+        self.speculative_used = False  # 预取的请求已被快捷键请求合并
+        self.tokens = 0  # 预取请求发出时估算的 token（输入 + 输出）
+        self.worker = None
+        self.waiters = [request_id]
+        self.interactive_ids = set()  # 可被更新请求取代的交互式请求
+
+
+class ChunkedJob:
+    """
+    长文本分块后的任务组，作为 InflightRequest.worker 使用
+
+    各块并发翻译，按原顺序拼接；取消时取消所有块。
+    """
     
-    def __init__(self, text, action_type, api_config, keywords=None):
-        super().__init__()
+    def __init__(self, chunks, separators):
+        self.chunks = chunks
+        self.separators = separators
+        self.results = [None] * len(chunks)
+        self.workers = {}  # 块的请求 ID -> 工作任务
+        self.emitted = 0  # 已按顺序发出增量的块数
+        self._cancelled = False
+        
+    def cancel(self):
+        """取消所有块"""
+        self._cancelled = True
+        for worker in self.workers.values():
+            worker.cancel()
+            
+    def is_cancelled(self):
+        """任务组是否已取消"""
+        return self._cancelled
+        
+    def take_ready(self):
+        """
+        取出从头开始连续完成、尚未发出的块结果
+        
+        Returns:
+            str: 需要追加显示的文本（含与前一块的连接符），没有时返回空字符串
+        """
+        parts = []
+        while self.emitted < len(self.results) and self.results[self.emitted] is not None:
+            index = self.emitted
+            if index > 0:
+                parts.append(joiner(self.separators[index - 1], self.results[index - 1], self.results[index]))
+            parts.append(self.results[index])
+            self.emitted += 1
+        return ''.join(parts)
+        
+    def done(self):
+        """所有块是否都已完成"""
+        return self.emitted == len(self.results)
+        
+    def text(self):
+        """拼接后的完整结果"""
+        return join_chunks(self.results, self.separators)
+
+
+class HedgedJob:
+    """
+    对冲请求，作为 InflightRequest.worker 使用
+
+    主提供商先发出；超过阈值仍未响应或请求失败时再发给备用提供商。
+    先响应（首个流式增量或完整结果）的一方胜出，另一方被取消。
+    """
+    
+    def __init__(self):
+        self.workers = {}  # 尝试的请求 ID -> 工作任务
+        self.labels = {}  # 尝试的请求 ID -> 'primary' / 'secondary'
+        self.configs = {}  # 尝试的请求 ID -> 使用的提供商配置
+        self.started = {}  # 尝试的请求 ID -> 提交时间
+        self.winner = None
+        self.hedged = False
+        self._cancelled = False
+        
+    def cancel(self, keep=None):
+        """取消所有尝试（keep 指定的除外）"""
+        if keep is None:
+            self._cancelled = True
+        for attempt_id, worker in self.workers.items():
+            if attempt_id != keep:
+                worker.cancel()
+                
+    def is_cancelled(self):
+        """任务是否已取消"""
+        return self._cancelled
+
+
+class BatchRequest:
+    """批量请求，相同文本的段落共用一个缓存键，只处理一次"""
+    
+    def __init__(self, batch_id, segments, action_type):
+        self.batch_id = batch_id
+        self.segments = segments
+        self.action_type = action_type
+        self.results = [None] * len(segments)
+        self.errors = {}  # 段落序号 -> 错误信息
+        self.indices = {}  # 缓存键 -> 段落序号列表
+        self.texts = {}  # 缓存键 -> 原文
+        self.targets = {}  # 缓存键 -> 目标语言
+        self.pending = len(segments)
+
+
+class TranslatorWorker:
+    """
+    翻译任务
+    
+    在 WorkerPool 的线程中执行，结果通过回调返回：
+    on_result(request_id, result_text, action_type)、
+    on_partial(request_id, delta_text, action_type)（仅流式模式）、
+    on_error(request_id, error_msg)。
+    """
+    
+    def __init__(self, text, action_type, api_config, keywords=None, session_pool=None, request_id=0,
+                 on_result=None, on_partial=None, on_error=None, request_builder=None, stream=None,
+                 health=None, target_lang=None):
+        self.request_id = request_id
+        # 请求构建函数，默认按提供商构建单段请求；批量请求时 text 为段落列表
+        self.request_builder = request_builder or build_chat_request
+        self.stream = api_config.get('stream', True) if stream is None else stream
+        self.on_result = on_result
+        self.on_partial = on_partial
+        self.on_error = on_error
         self.text = text
         self.action_type = action_type  # 'translate' or 'polish'
         self.api_config = api_config
         self.keywords = keywords or []  # 关键词列表
+        self.target_lang = target_lang  # 目标语言，为 None 时由请求构建函数按原文确定
+        self.session_pool = session_pool  # 共享的 keep-alive 会话池
+        self.health = health  # 共享的提供商健康状态（超时、重试、熔断），为 None 时不重试
+        self._emitted = False  # 是否已发出过增量，发出后不再重试以免界面内容重复
+        self._cancelled = threading.Event()
+        self._response = None  # 当前正在读取的响应，取消时关闭以中断连接
+        self._estimate = None  # 最近一次请求的 (预约 token, 估算输入 token, max_tokens)
         
     def run(self):
         """执行翻译/润色"""
         try:
-            result = self._call_api()
-            self.result_ready.emit(result, self.action_type)
+            with tracer.span('worker.run', 'worker', request_id=self.request_id):
+                result = self._call_with_retries()
+            if not self.is_cancelled() and self.on_result:
+                self.on_result(self.request_id, result, self.action_type)
         except Exception as e:
-            self.error_occurred.emit(str(e))
+            if not self.is_cancelled() and self.on_error:
+                self.on_error(self.request_id, str(e))
+                
+    def cancel(self):
+        """
+        取消请求（可从其他线程调用）
+        
+        已收到响应头时关闭响应以中断读取；之后不再发出任何信号。
+        """
+        self._cancelled.set()
+        response = self._response
+        if response is not None:
+            response.close()
+            
+    def is_cancelled(self):
+        """请求是否已取消"""
+        return self._cancelled.is_set()
+        
+    def _call_with_retries(self):
+        """
+        调用API，可重试的错误按带抖动的指数退避重试
+        
+        提供商处于熔断状态时直接失败；已发出增量或请求被取消后不再重试。
+        """
+        if self.health is None:
+            return self._call_api()
+            
+        attempt = 0
+        while True:
+            self.health.check(self.api_config)
+            try:
+                result = self._call_api()
+            except Exception as e:
+                if self.is_cancelled():
+                    self.health.release(self.api_config)
+                    raise
+                retryable = self.health.record_failure(self.api_config, e)
+                if not retryable or self._emitted or not self.health.should_retry(attempt):
+                    raise
+                delay = backoff_delay(attempt, getattr(e, 'retry_after', None))
+                print(f"请求 #{self.request_id} 失败，{delay:.1f} 秒后重试: {e}")
+                tracer.instant('retry', 'worker', request_id=self.request_id, attempt=attempt, delay=delay)
+                if self._cancelled.wait(delay):
+                    raise
+                attempt += 1
+                continue
+                
+            if self.is_cancelled():
+                self.health.release(self.api_config)
+            else:
+                self.health.record_success(self.api_config)
+            return result
+            
+    def _timeouts(self):
+        """(connect, read) 超时，有健康状态时按最近延迟自适应"""
+        if self.health is None:
+            return 30
+        return self.health.timeouts(self.api_config)
+        
+    def _acquire_budget(self, data):
+        """估算请求的 token 数，按提供商的 RPM/TPM 限额排队等待"""
+        prompt_tokens = estimate_prompt_tokens(data)
+        reserved = estimate_request_tokens(data, prompt_tokens)
+        self._estimate = (reserved, prompt_tokens, data.get('max_tokens'))
+        if self.health is None:
+            return
+        with tracer.span('rate_limit.wait', 'worker', tokens=reserved):
+            wait = self.health.limiter.acquire(self.api_config, reserved, self._cancelled)
+        if wait:
+            print(f"请求 #{self.request_id} 限流排队 {wait * 1000:.0f} ms")
+        if self.is_cancelled():
+            self.health.limiter.release(self.api_config, reserved)
+            raise RuntimeError("请求已取消")
             
+    def _record_latency(self, seconds):
+        """记录首次响应延迟"""
+        if self.health is not None:
+            self.health.record_latency(self.api_config, seconds)
+            
+    def _record_usage(self, usage):
+        """对比估算与响应中的实际 token 用量"""
+        if usage and self.health is not None and self._estimate is not None:
+            self.health.record_usage(self.api_config, self.request_id, self._estimate, usage)
+            
+    def _emit_partial(self, delta):
+        """发出流式增量"""
+        self._emitted = True
+        if self.on_partial:
+            self.on_partial(self.request_id, delta, self.action_type)
+            
+    def _post(self, base_url, path, **kwargs):
+        """通过共享会话池发送 POST 请求（未提供会话池时退回一次性连接）"""
+        url = f'{base_url}{path}'
+        if self.session_pool is None:
+            return requests.post(url, **kwargs)
+        return self.session_pool.get(base_url).post(url, **kwargs)
+
+    def _request(self, base_url, path, headers, data, error_prefix):
+        """
+        限流排队后发送 JSON 请求，返回状态为 200 的响应
+        
+        总是延迟读取响应体（stream=True），以便取消时可以关闭连接中断读取。
+        """
+        self._acquire_budget(data)
+        # 连接 + 发送 + 服务端处理，直到收到响应头
+        with tracer.span('http.request', 'http', path=path) as span:
+            response = self._post(
+                base_url, path,
+                headers=headers,
+                json=data,
+                timeout=self._timeouts(),
+                stream=True
+            )
+            span.set(status=response.status_code)
+        self._response = response
+        if self.health is not None:
+            self.health.limiter.observe(self.api_config, response.status_code, response.headers)
+        if self.is_cancelled():
+            response.close()
+            raise RuntimeError("请求已取消")
+        
+        if response.status_code != 200:
+            raise ProviderError(f"{error_prefix}: {response.status_code} - {response.text}",
+                                response.status_code, parse_retry_after(response.headers.get('Retry-After')))
+        return response
+        
+    def _send_chat(self, base_url, headers, data, error_prefix):
+        """
+        发送 chat/completions 请求
+        
+        开启流式模式（api.stream，默认开启）时使用 SSE 接收，
+        边接收边通过 on_partial 回调发出增量文本，最终返回完整结果。
+        """
+        stream = self.stream
+        if stream:
+            # 要求在流末尾返回 usage，用于核对 token 估算
+            data = dict(data, stream=True, stream_options={'include_usage': True})
+            
+        start = time.monotonic()
+        response = self._request(base_url, '/chat/completions', headers, data, error_prefix)
+        
+        # 服务端可能忽略 stream 参数，直接返回完整 JSON
+        content_type = response.headers.get('Content-Type', '')
+        if not stream or 'text/event-stream' not in content_type:
+            self._record_latency(time.monotonic() - start)
+            with tracer.span('http.read', 'http') as span:
+                span.set(bytes=len(response.content))
+            with tracer.span('json.parse', 'http'):
+                result = response.json()
+                self._record_usage(result.get('usage'))
+                return parse_chat_response(result)
+            
+        return self._read_stream(response, start)
+        
+    def _read_stream(self, response, start):
+        """读取 SSE 流，按时间间隔合并增量后发出，避免逐 token 刷新界面"""
+        accumulator = StreamAccumulator(start)
+        usage = {}
+        
+        with response, tracer.span('http.stream', 'http') as span:
+            for delta in iter_stream_deltas(response, usage):
+                if self.is_cancelled():
+                    break
+                pending = accumulator.add(delta)
+                if pending:
+                    self._emit_partial(pending)
+            span.set(first_token_ms=None if accumulator.first_token is None else accumulator.first_token * 1000)
+                    
+        pending = accumulator.flush()
+        if pending:
+            self._emit_partial(pending)
+        if accumulator.first_token is not None:
+            self._record_latency(accumulator.first_token)
+        self._record_usage(usage)
+            
+        return accumulator.text()
+
     def _call_api(self):
         """调用API"""
         provider = self.api_config.get('provider', 'openai')
         
-        if provider == 'openai':
-            return self._call_openai()
-        elif provider == 'volcengine' or provider == 'doubao':
-            return self._call_volcengine()
-        elif provider == 'deepl':
+        if provider == 'deepl':
             return self._call_deepl()
-        else:
-            raise ValueError(f"Unsupported API provider: {provider}")
-            
-    def _call_openai(self):
-        """调用OpenAI API"""
-        api_key = self.api_config.get('api_key', '')
-        base_url = self.api_config.get('base_url', 'https://api.openai.com/v1')
-        
-        if not api_key:
-            raise ValueError("API Key is not configured")
-            
-        # 构建提示词
-        keyword_context = ""
-        if self.keywords:
-            keyword_context = f"\n\n关键词提示：{', '.join(self.keywords)}"
-            
-        if self.action_type == 'translate':
-            prompt = f"请将以下文本翻译成中文（如果是中文则翻译成英文）{keyword_context}：\n\n{self.text}"
-        else:  # polish
-            prompt = f"请润色以下文本，使其更加流畅和专业{keyword_context}：\n\n{self.text}"
-            
-        # 调用API
-        headers = {
-            'Authorization': f'Bearer {api_key}',
-            'Content-Type': 'application/json'
-        }
-        
-        data = {
-            'model': 'gpt-3.5-turbo',
-            'messages': [
-                {'role': 'user', 'content': prompt}
-            ],
-            'temperature': 0.3
-        }
-        
-        response = requests.post(
-            f'{base_url}/chat/completions',
-            headers=headers,
-            json=data,
-            timeout=30
-        )
+        with tracer.span('build_request', 'worker'):
+            request = self.request_builder(
+                self.api_config, self.text, self.action_type, self.keywords, self.target_lang
+            )
+        return self._send_chat(*request)
+    
+    def _call_deepl(self):
+        """
+        调用DeepL API
         
-        if response.status_code == 200:
-            result = response.json()
-            return result['choices'][0]['message']['content'].strip()
-        else:
-            raise Exception(f"API Error: {response.status_code} - {response.text}")
-            
-    def _call_volcengine(self):
-        """调用火山方舟（豆包）API"""
-        api_key = self.api_config.get('api_key', '')
-        base_url = self.api_config.get('base_url', 'https://ark.cn-beijing.volces.com/api/v3')
-        model = self.api_config.get('model', 'doubao-pro-32k')
-        
-        if not api_key:
-            raise ValueError("API Key 未配置")
-            
-        # 构建关键词上下文
-        keyword_context = ""
-        if self.keywords:
-            keyword_context = f"\n\n专业领域关键词：{', '.join(self.keywords)}\n请在翻译时注意这些领域的专业术语。"
-            
-        # 构建提示词
-        if self.action_type == 'translate':
-            prompt = f"请将以下文本翻译成中文（如果是中文则翻译成英文），只返回翻译结果，不要添加任何解释{keyword_context}：\n\n{self.text}"
-        else:  # polish
-            prompt = f"请润色以下文本，使其更加流畅和专业，只返回润色后的文本，不要添加任何解释{keyword_context}：\n\n{self.text}"
-            
-        # 调用API
-        headers = {
-            'Authorization': f'Bearer {api_key}',
-            'Content-Type': 'application/json'
-        }
-        
-        data = {
-            'model': model,
-            'messages': [
-                {'role': 'user', 'content': prompt}
-            ],
-            'temperature': 0.3
-        }
-        
-        response = requests.post(
-            f'{base_url}/chat/completions',
-            headers=headers,
-            json=data,
-            timeout=30
+        批量请求（text 为段落列表）一次发送全部段落，结果以 JSON 字符串数组返回，
+        与 parse_batch_response 兼容。
+        """
+        texts = self.text if isinstance(self.text, list) else [self.text]
+        base_url, headers, data, error_prefix = build_deepl_request(
+            self.api_config, texts, self.action_type, self.keywords, self.target_lang
         )
+        start = time.monotonic()
+        with self._request(base_url, '/v2/translate', headers, data, error_prefix) as response:
+            with tracer.span('http.read', 'http') as span:
+                span.set(bytes=len(response.content))
+            with tracer.span('json.parse', 'http'):
+                results = parse_deepl_response(response.json())
+        self._record_latency(time.monotonic() - start)
         
-        if response.status_code == 200:
-            result = response.json()
-            return result['choices'][0]['message']['content'].strip()
-        else:
-            raise Exception(f"API 错误: {response.status_code} - {response.text}")
-    
-    def _call_deepl(self):
-        """调用DeepL API"""
-        # TODO: 实现DeepL API调用
-        raise NotImplementedError("DeepL API not implemented yet")
+        if isinstance(self.text, list):
+            return json.dumps(results, ensure_ascii=False)
+        return results[0]
 
 
 class TranslatorManager(QObject):
@@ -147,66 +429,1055 @@ class TranslatorManager(QObject):
     
     # 信号定义
     translation_ready = Signal(str, str)
+    translation_partial = Signal(str, str)  # 流式增量 (delta_text, action_type)
     translation_error = Signal(str)
     
-    def __init__(self, api_config):
+    # 按请求 ID 返回的结果（合并的请求各自收到一次）
+    request_ready = Signal(int, str, str)  # (request_id, result_text, action_type)
+    request_failed = Signal(int, str)  # (request_id, error_msg)
+    request_cancelled = Signal(int)  # 被更新的交互式请求取代
+    
+    # 翻译记忆近似命中 (request_id, similarity, matched_source)，该请求仍会调用API
+    memory_match = Signal(int, float, str)
+    
+    # 交互式请求的翻译记忆近似命中 (相似原文的译文, similarity, action_type)，在API结果返回前供参考
+    translation_suggested = Signal(str, float, str)
+    
+    # 批量请求
+    batch_progress = Signal(int, int, int)  # (batch_id, completed, total)
+    batch_ready = Signal(int, list)  # (batch_id, results)，失败的段落为 None
+    
+    # 磁盘缓存查询完成（从后台线程发出）: (request_id, value)
+    _disk_lookup_done = Signal(int, object)
+    _batch_disk_lookup_done = Signal(int, object)  # (batch_id, {cache_key: value})
+    
+    # 工作线程回调（从线程池发出，排队到主线程处理）
+    _worker_result = Signal(int, str, str)
+    _worker_partial = Signal(int, str, str)
+    _worker_error = Signal(int, str)
+    
+    def __init__(self, api_config, general_config=None):
         super().__init__()
         self.api_config = api_config
-        self.worker = None
-        self.cache = {}  # 简单的缓存
+        
+        # 处理中请求表：请求 ID -> InflightRequest，缓存键 -> 请求 ID
+        self._request_ids = itertools.count(1)
+        self._inflight = {}
+        self._inflight_keys = {}
+        
+        # 固定大小的工作线程池，所有请求排队执行
+        self.worker_pool = WorkerPool(api_config.get('max_workers', DEFAULT_MAX_WORKERS))
+        self._worker_result.connect(self._on_result)
+        self._worker_partial.connect(self._on_partial)
+        self._worker_error.connect(self._on_error)
+        
+        # 可选的 asyncio 引擎（api.engine = 'asyncio' 时使用）
+        self.async_engine = None
+        self._configure_engine(api_config)
+        self.stats = {'requests': 0, 'coalesced': 0, 'cancelled': 0, 'aborted': 0,
+                      'batches': 0, 'batch_calls': 0, 'batch_fallbacks': 0, 'chunked': 0, 'chunks': 0,
+                      'memory_hits': 0, 'passthrough': 0, 'hedge_eligible': 0, 'hedged': 0, 'failovers': 0, 'primary_wins': 0, 'secondary_wins': 0}
+        
+        # 批量请求表：batch_id -> BatchRequest；合并调用的请求 ID -> (batch_id, 缓存键列表)；
+        # 单独重试的请求 ID -> (batch_id, 缓存键)
+        self._batches = {}
+        self._batch_jobs = {}
+        self._batch_segments = {}
+        self._batch_disk_lookup_done.connect(self._on_batch_disk_lookup)
+        self.request_ready.connect(self._on_batch_segment_ready)
+        self.request_failed.connect(self._on_batch_segment_failed)
+        
+        # 长文本分块：块的请求 ID -> (所属请求 ID, 块序号)
+        self._chunk_jobs = {}
+        
+        # 对冲请求：尝试的请求 ID -> 所属请求 ID
+        self._hedge_attempts = {}
+        
+        # 剪贴板预取：单独统计命中和浪费（started 为登记的预取数，包括磁盘缓存命中的，
+        # 不含 skipped）；已完成、尚未被使用的预取结果（缓存键 -> 估算 token，磁盘缓存命中的为 0）
+        self.speculative_stats = {'started': 0, 'skipped': 0, 'hits': 0, 'cancelled': 0, 'failed': 0,
+                                  'wasted': 0, 'used_tokens': 0, 'wasted_tokens': 0}
+        self._speculative_results = OrderedDict()
+        self._speculative_id = None  # 最近一次预取的请求 ID
+        self.supersede_policy = SUPERSEDE_LATEST_WINS
+        self._latest_interactive = None  # 最近一次交互式请求的 ID，只有它的流式增量显示在界面上
+        
+        self.cache = TranslationCache()  # 内存 LRU + TTL 缓存
+        self.disk_cache = None  # 持久化缓存，内存未命中时查询
+        self.memory = None  # 翻译记忆，精确缓存都未命中时做近似匹配
+        self._disk_lookup_done.connect(self._on_disk_lookup)
+        self._configure_cache(general_config or {})
+        self._configure_policy(general_config or {})
         self.keywords = []  # 当前关键词列表
+        self._keyword_entries = []  # [(术语, 译法)]
+        self.glossary_file = ''  # 术语表文件路径
+        self.glossary = Glossary()  # 关键词和术语表编译成的匹配器，只把原文中出现的术语放进提示词
+        
+        # 所有工作线程共享的连接池，启动时预热
+        self.session_pool = SessionPool(
+            api_config.get('pool_size', DEFAULT_POOL_SIZE),
+            api_config.get('pool_idle_timeout', DEFAULT_IDLE_TIMEOUT)
+        )
+        self.session_pool.warmup(resolve_base_url(api_config))
+        
+        # 各提供商的延迟统计、自适应超时、重试和熔断，所有任务共用
+        self.health = ProviderHealth(self.session_pool, api_config.get('max_retries', DEFAULT_MAX_RETRIES),
+                                     api_config.get('rate_limits'))
+        self.latency = self.health.latency
+        # 对冲阈值只按单段交互式请求的首次响应延迟计算（批量和分块请求的延迟不可比）
+        self.hedge_latency = LatencyTracker()
+        secondary = self._secondary_config()
+        if secondary is not None:
+            self.session_pool.warmup(resolve_base_url(secondary))
         
     def set_keywords(self, keywords):
-        """设置关键词列表"""
+        """
+        设置关键词列表
+        
+        每条关键词可以用 "术语=译法" 指定译法；关键词与术语表一起编译成匹配器，
+        请求时只把原文中实际出现的术语放进提示词。
+        """
         if isinstance(keywords, str):
-            # 如果是字符串，按逗号分割
-            self.keywords = [k.strip() for k in keywords.split(',') if k.strip()]
+            entries = parse_entries(keywords)
         elif isinstance(keywords, list):
-            self.keywords = keywords
+            entries = [entry for keyword in keywords for entry in parse_entries(keyword)]
         else:
-            self.keywords = []
+            entries = []
+        self.keywords = [term for term, _ in entries]
+        self._keyword_entries = entries
+        self._compile_glossary()
         print(f"关键词已更新: {self.keywords}")
         
-    def translate(self, text):
-        """翻译文本"""
-        self._process(text, 'translate')
+    def set_glossary_file(self, path):
+        """
+        设置术语表文件（每行 "术语<Tab>译法" 或 "术语,译法"）
+        
+        Args:
+            path: 文件路径，为空时清除术语表
+        """
+        self.glossary_file = path or ''
+        self._compile_glossary()
+        
+    def _compile_glossary(self):
+        """关键词或术语表变化时重新编译匹配器（关键词中的译法优先）"""
+        entries = list(self._keyword_entries)
+        if self.glossary_file:
+            try:
+                entries += load_glossary_file(self.glossary_file)
+            except (OSError, UnicodeDecodeError) as e:
+                logger.error(f"读取术语表失败: {e}")
+        start = time.perf_counter()
+        self.glossary = Glossary(entries)
+        print(f"术语表已编译: {len(self.glossary)} 条，耗时 {(time.perf_counter() - start) * 1000:.0f} ms")
+        
+    def translate(self, text, interactive=True):
+        """
+        翻译文本
+        
+        Args:
+            text: 原文
+            interactive: 是否为交互式请求（快捷键触发），交互式请求可取代之前的交互式请求
+            
+        Returns:
+            int: 请求 ID，结果通过 request_ready / request_failed 按 ID 返回
+        """
+        return self._process(text, 'translate', interactive)
         
-    def polish(self, text):
-        """润色文本"""
-        self._process(text, 'polish')
+    def polish(self, text, interactive=True):
+        """
+        润色文本
         
-    def _process(self, text, action_type):
+        Returns:
+            int: 请求 ID
+        """
+        return self._process(text, 'polish', interactive)
+        
+    def prefetch(self, text, action_type='translate'):
+        """
+        预取：以最低优先级提前翻译（如剪贴板中新复制的文本）
+        
+        结果写入缓存，之后的快捷键请求直接命中缓存或合并到处理中的预取请求；
+        新的预取会取消之前尚未被使用的预取。预取的命中和浪费单独统计（speculative_stats）。
+        
+        Returns:
+            int: 请求 ID
+        """
+        return self._process(text, action_type, interactive=False, speculative=True)
+        
+    def _process(self, text, action_type, interactive=True, speculative=False):
         """处理文本（翻译或润色）"""
+        request_id = next(self._request_ids)
+        if not speculative:
+            self.stats['requests'] += 1
+        if interactive:
+            self._latest_interactive = request_id
+        
         if not text or not text.strip():
-            self.translation_error.emit("No text to process")
+            if interactive:
+                self.translation_error.emit("No text to process")
+            self.request_failed.emit(request_id, "No text to process")
+            return request_id
+            
+        # 只有数字、代码或链接，或者已经是目标语言：原样返回，不调用API
+        with tracer.span('langdetect', 'translator', request_id=request_id) as span:
+            target_lang = self._target_lang(text, action_type)
+            noop = self._is_noop(text, action_type, target_lang)
+            span.set(target_lang=target_lang, noop=noop)
+        if noop:
+            if speculative:
+                self.speculative_stats['skipped'] += 1
+                return request_id
+            self.stats['passthrough'] += 1
+            print(f"请求 #{request_id} 无需{'翻译' if action_type == 'translate' else '润色'}，原样返回")
+            if interactive:
+                self.translation_ready.emit(text, action_type)
+            self.request_ready.emit(request_id, text, action_type)
+            return request_id
+            
+        cache_key = self._cache_key(text, action_type, target_lang)
+        if interactive and self.supersede_policy == SUPERSEDE_LATEST_WINS:
+            self._supersede(cache_key)
+            
+        # 先查内存缓存
+        with tracer.span('cache.lookup', 'translator', request_id=request_id) as span:
+            cached = self.cache.get(cache_key)
+            span.set(hit=cached is not None)
+        if cached is not None:
+            if speculative:
+                self.speculative_stats['skipped'] += 1
+                return request_id
+            self._use_speculative(cache_key)
+            if interactive:
+                self.translation_ready.emit(cached, action_type)
+            self.request_ready.emit(request_id, cached, action_type)
+            return request_id
+            
+        # 相同请求正在处理中，合并到已有条目，不再重复调用API
+        primary_id = self._inflight_keys.get(cache_key)
+        if primary_id is not None:
+            if speculative:
+                self.speculative_stats['skipped'] += 1
+                return request_id
+            primary = self._inflight[primary_id]
+            primary.waiters.append(request_id)
+            if interactive:
+                primary.interactive_ids.add(request_id)
+            if primary.speculative and not primary.speculative_used:
+                self._claim_speculative(primary)
+            self.stats['coalesced'] += 1
+            tracer.instant('coalesced', 'translator', request_id=request_id, primary_id=primary_id)
+            print(f"请求 #{request_id} 与处理中的请求 #{primary_id} 合并")
+            return request_id
+            
+        entry = InflightRequest(request_id, cache_key, text, action_type, target_lang)
+        if interactive:
+            entry.interactive_ids.add(request_id)
+        if speculative:
+            # 新的预取取代之前尚未被使用的预取
+            entry.speculative = True
+            self.speculative_stats['started'] += 1
+            self._cancel_speculative()
+            self._speculative_id = request_id
+        self._inflight[request_id] = entry
+        self._inflight_keys[cache_key] = request_id
+        # 请求从登记到返回结果（或失败、取消）的整个过程，在 _release 中结束
+        tracer.begin('request', request_id, action=action_type, chars=len(text), speculative=speculative)
+        
+        # 再到后台线程查询磁盘缓存，结果通过信号回到主线程
+        if self.disk_cache is not None:
+            tracer.begin('disk.lookup', request_id)
+            self.disk_cache.get(
+                cache_key,
+                lambda value: self._disk_lookup_done.emit(request_id, value)
+            )
+            return request_id
+            
+        self._dispatch(entry)
+        return request_id
+        
+    def _supersede(self, cache_key):
+        """
+        新的交互式请求取代之前所有未完成的交互式请求
+        
+        条目上不再有等待者时取消其网络请求，结果和增量都不再发出。
+        与新请求相同的条目会被新请求合并，因此保留。
+        """
+        for entry in list(self._inflight.values()):
+            if entry.cache_key == cache_key or not entry.interactive_ids:
+                continue
+            
+            superseded = entry.interactive_ids
+            entry.interactive_ids = set()
+            entry.waiters = [w for w in entry.waiters if w not in superseded]
+            self.stats['cancelled'] += len(superseded)
+            for waiter_id in superseded:
+                self.request_cancelled.emit(waiter_id)
+                
+            if not entry.waiters:
+                self._release(entry.request_id)
+                if entry.worker is not None:
+                    entry.worker.cancel()
+                    self.stats['aborted'] += 1
+                print(f"请求 #{entry.request_id} 已被新的请求取代")
+        
+    def _cancel_speculative(self):
+        """取消上一个尚未被使用的预取请求（可能已消耗了部分额度，计入 cancelled）"""
+        entry = self._inflight.get(self._speculative_id)
+        if entry is None or not entry.speculative or entry.speculative_used or len(entry.waiters) > 1:
             return
+        self._release(entry.request_id)
+        if entry.worker is not None:
+            entry.worker.cancel()
+            self.stats['aborted'] += 1
+        self.speculative_stats['cancelled'] += 1
+        self.speculative_stats['wasted_tokens'] += entry.tokens
+        print(f"预取请求 #{entry.request_id} 已被新的预取取代")
+        
+    def _claim_speculative(self, entry):
+        """快捷键请求合并到处理中的预取请求：计为命中，并把仍在排队的任务提到交互式优先级"""
+        entry.speculative_used = True
+        self.speculative_stats['hits'] += 1
+        self.speculative_stats['used_tokens'] += entry.tokens
+        print(f"命中处理中的预取请求 #{entry.request_id}")
+        if self.async_engine is not None or entry.worker is None:
+            return
+        workers = entry.worker.workers.values() if isinstance(entry.worker, (ChunkedJob, HedgedJob)) else [entry.worker]
+        for worker in list(workers):
+            self.worker_pool.reprioritize(worker, PRIORITY_INTERACTIVE)
+            
+    def _use_speculative(self, cache_key):
+        """请求命中了已完成的预取结果"""
+        tokens = self._speculative_results.pop(cache_key, None)
+        if tokens is not None:
+            self.speculative_stats['hits'] += 1
+            self.speculative_stats['used_tokens'] += tokens
+            print("命中预取结果")
             
-        # 检查缓存（包含关键词的缓存键）
-        cache_key = f"{action_type}:{','.join(self.keywords)}:{text}"
-        if cache_key in self.cache:
-            self.translation_ready.emit(self.cache[cache_key], action_type)
+    def _record_speculative(self, entry, failed=False):
+        """预取请求结束：未被使用的结果进入跟踪窗口，超出窗口或失败的计为浪费"""
+        if not entry.speculative or entry.speculative_used:
             return
+        if failed:
+            self.speculative_stats['failed'] += 1
+            self.speculative_stats['wasted_tokens'] += entry.tokens
+            return
+        self._speculative_results[entry.cache_key] = entry.tokens
+        while len(self._speculative_results) > SPECULATIVE_WINDOW:
+            _, tokens = self._speculative_results.popitem(last=False)
+            self.speculative_stats['wasted'] += 1
+            self.speculative_stats['wasted_tokens'] += tokens
             
-        # 创建工作线程
-        self.worker = TranslatorWorker(text, action_type, self.api_config, self.keywords)
-        self.worker.result_ready.connect(self._on_result)
-        self.worker.error_occurred.connect(self._on_error)
-        self.worker.start()
+    def _priority(self, entry):
+        """任务优先级：交互式 > 后台 > 预取"""
+        if entry.interactive_ids:
+            return PRIORITY_INTERACTIVE
+        if entry.speculative and not entry.speculative_used:
+            return PRIORITY_SPECULATIVE
+        return PRIORITY_BACKGROUND
+        
+    def _on_disk_lookup(self, request_id, value):
+        """磁盘缓存查询完成"""
+        tracer.end('disk.lookup', request_id, hit=value is not None)
+        entry = self._inflight.get(request_id)
+        if entry is None:
+            return
+        if value is not None:
+            self.cache.put(entry.cache_key, value, entry.action_type)
+            self._finish(entry, value)
+            return
+        self._dispatch(entry)
+        
+    def _dispatch(self, entry):
+        """
+        精确缓存都未命中：调用API
+        
+        翻译记忆近似命中时先把相似原文的译文作为参考发出（相似原文可能只差一个数字、否定词或名称，
+        不能直接代替译文），API结果返回后照常替换。
+        """
+        if self._uses_memory(entry.action_type):
+            scope = self._memory_scope(entry.text, entry.action_type, entry.target_lang)
+            with tracer.span('memory.lookup', 'translator', request_id=entry.request_id) as span:
+                match = self.memory.lookup(entry.text, scope)
+                span.set(hit=match is not None)
+            if match is not None:
+                similarity, source, translation = match
+                self.stats['memory_hits'] += 1
+                print(f"请求 #{entry.request_id} 命中翻译记忆（相似度 {similarity:.0%}），先显示参考译文")
+                for waiter_id in entry.waiters:
+                    self.memory_match.emit(waiter_id, similarity, source)
+                if entry.interactive_ids:
+                    self.translation_suggested.emit(translation, similarity, entry.action_type)
+        self._start_worker(entry)
+        
+    def _uses_memory(self, action_type):
+        """是否查询和写入翻译记忆（润色结果依赖原文的每个细节，不使用近似匹配）"""
+        return self.memory is not None and action_type == 'translate'
         
-    def _on_result(self, result, action_type):
+    def _memory_scope(self, text, action_type, target_lang, api_config=None):
+        """
+        翻译记忆的作用域：操作类型、目标语言、提供商、实际请求的模型和原文中出现的术语
+        （与缓存键相同的配置）都相同的条目才能互相匹配
+        """
+        api_config = api_config or self.api_config
+        terms = ','.join(self.glossary.terms(text))
+        return (f"{action_type}:{target_lang or ''}:{api_config.get('provider', 'openai')}/"
+                f"{resolve_model(api_config)}:{terms}")
+        
+    def _target_lang(self, text, action_type):
+        """翻译的目标语言（api.target_lang 为 'auto' 时按原文语言确定方向），润色时为 None"""
+        if action_type != 'translate':
+            return None
+        return resolve_target(text, self.api_config.get('target_lang', 'auto'))
+        
+    def _is_noop(self, text, action_type, target_lang):
+        """只有数字、代码或链接，或者原文已经是目标语言（仅限文字体系能确定语言的情况）"""
+        if is_untranslatable(text):
+            return True
+        return is_target_language(text, target_lang)
+        
+    def _start_worker(self, entry):
+        """
+        将请求交给执行引擎
+        
+        线程池引擎中有交互式请求等待的任务优先执行；asyncio 引擎的回调在事件循环线程中
+        触发，同样通过信号回到主线程。超过分块上限的长文本拆成多个块并发执行。
+        """
+        if entry.speculative:
+            entry.tokens = estimate_tokens(entry.text) * 2  # 输入 + 输出
+        chunks, separators = split_text(entry.text, self._chunk_limit())
+        if len(chunks) > 1:
+            self._start_chunked(entry, chunks, separators)
+            return
+            
+        if self._secondary_config() is not None:
+            self._start_hedged(entry)
+            return
+            
+        entry.worker = self._make_worker(entry.text, entry.action_type, entry.request_id, self.api_config,
+                                         target_lang=entry.target_lang)
+        self._submit(entry.worker, self._priority(entry))
+        
+    def _make_worker(self, text, action_type, request_id, api_config, **kwargs):
+        """按当前执行引擎创建工作任务，回调统一转为信号"""
+        task_class = AsyncTranslatorJob if self.async_engine is not None else TranslatorWorker
+        kwargs.setdefault('on_partial', self._worker_partial.emit)
+        return task_class(
+            text, action_type, api_config, self.glossary.match(text),
+            session_pool=self.session_pool,
+            request_id=request_id,
+            on_result=self._worker_result.emit,
+            on_error=self._worker_error.emit,
+            health=self.health,
+            **kwargs
+        )
+        
+    def _submit(self, worker, priority):
+        """提交到执行引擎，线程池中按优先级执行（交互式任务优先）"""
+        if self.async_engine is not None:
+            self.async_engine.submit(worker)
+            return
+        self.worker_pool.submit(worker, priority)
+        
+    def _start_chunked(self, entry, chunks, separators):
+        """分块提交长文本，块按顺序排队，前面的块先完成、先显示"""
+        job = ChunkedJob(chunks, separators)
+        entry.worker = job
+        self.stats['chunked'] += 1
+        self.stats['chunks'] += len(chunks)
+        print(f"请求 #{entry.request_id} 共 {len(entry.text)} 字，分为 {len(chunks)} 块并发处理")
+        
+        for index, chunk in enumerate(chunks):
+            job_id = next(self._request_ids)
+            self._chunk_jobs[job_id] = (entry.request_id, index)
+            worker = self._make_worker(chunk, entry.action_type, job_id, self.api_config,
+                                       on_partial=None, stream=False, target_lang=entry.target_lang)
+            job.workers[job_id] = worker
+            self._submit(worker, self._priority(entry))
+                
+    def _on_chunk_result(self, job_id, result):
+        """一个块完成，从头开始连续完成的块作为增量发出，全部完成后按普通结果处理"""
+        request_id, index = self._chunk_jobs.pop(job_id)
+        entry = self._inflight.get(request_id)
+        if entry is None:
+            return
+        job = entry.worker
+        job.results[index] = result
+        
+        ready = job.take_ready()
+        if ready and self._shows_partials(entry):
+            self.translation_partial.emit(ready, entry.action_type)
+        if job.done():
+            self._on_result(request_id, job.text(), entry.action_type)
+            
+    def _on_chunk_error(self, job_id, error_msg):
+        """任一块失败则整个请求失败，取消其余的块"""
+        request_id, index = self._chunk_jobs.pop(job_id)
+        entry = self._inflight.get(request_id)
+        if entry is None:
+            return
+        entry.worker.cancel()
+        self._on_error(request_id, f"第 {index + 1}/{len(entry.worker.chunks)} 段处理失败: {error_msg}")
+        
+    def _chunk_limit(self):
+        """当前模型每块的最大字符数"""
+        return chunk_char_limit(
+            resolve_model(self.api_config),
+            self.api_config.get('chunk_max_chars', DEFAULT_CHUNK_MAX_CHARS)
+        )
+        
+    def _start_hedged(self, entry):
+        """先向主提供商发出请求，超过阈值仍未响应时对冲到备用提供商"""
+        job = HedgedJob()
+        entry.worker = job
+        self.stats['hedge_eligible'] += 1
+        self._start_attempt(entry, 'primary')
+        
+        request_id = entry.request_id
+        delay = self._hedge_delay()
+        QTimer.singleShot(int(delay * 1000), lambda: self._hedge(request_id))
+        
+    def _start_attempt(self, entry, label):
+        """向主提供商或备用提供商发出一次尝试"""
+        api_config = self.api_config if label == 'primary' else self._secondary_config()
+        attempt_id = next(self._request_ids)
+        self._hedge_attempts[attempt_id] = entry.request_id
+        job = entry.worker
+        job.labels[attempt_id] = label
+        job.configs[attempt_id] = api_config
+        job.started[attempt_id] = time.monotonic()
+        job.workers[attempt_id] = self._make_worker(entry.text, entry.action_type, attempt_id, api_config,
+                                                    target_lang=entry.target_lang)
+        self._submit(job.workers[attempt_id], self._priority(entry))
+        
+    def _hedge(self, request_id):
+        """阈值到期时主提供商仍未响应，同时请求备用提供商"""
+        entry = self._inflight.get(request_id)
+        if entry is None or not isinstance(entry.worker, HedgedJob):
+            return
+        job = entry.worker
+        if job.winner is not None or job.hedged or self._secondary_config() is None:
+            return
+        job.hedged = True
+        self.stats['hedged'] += 1
+        print(f"请求 #{request_id} 主提供商未在 {self._hedge_delay() * 1000:.0f} ms 内响应，对冲到备用提供商")
+        self._start_attempt(entry, 'secondary')
+        
+    def _hedge_delay(self):
+        """对冲阈值：主提供商最近的 p95 延迟"""
+        key = provider_key(self.api_config)
+        if self.hedge_latency.count(key) < HEDGE_MIN_SAMPLES:
+            return self.api_config.get('hedge_delay', HEDGE_DEFAULT_DELAY)
+        p95 = self.hedge_latency.percentile(key, HEDGE_PERCENTILE)
+        return min(max(p95, HEDGE_MIN_DELAY), HEDGE_MAX_DELAY)
+        
+    def _claim_attempt(self, attempt_id):
+        """
+        尝试首次响应时决定胜负
+        
+        Returns:
+            InflightRequest: 该尝试胜出（或此前已胜出）时返回所属条目，否则返回 None
+        """
+        entry = self._inflight.get(self._hedge_attempts.get(attempt_id))
+        if entry is None:
+            return None
+        job = entry.worker
+        if job.winner is None:
+            job.winner = attempt_id
+            label = job.labels[attempt_id]
+            self._record_hedge_latency(entry)
+            if job.hedged:
+                self.stats[f'{label}_wins'] += 1
+                print(f"请求 #{entry.request_id} 对冲结果：{label} 胜出")
+            job.cancel(keep=attempt_id)
+        return entry if job.winner == attempt_id else None
+        
+    def _record_hedge_latency(self, entry):
+        """
+        记录交互式请求主提供商的首次响应延迟（含排队时间，即用户等待的时间）
+
+        备用提供商胜出时主提供商尚未响应，记录已等待的时间作为下限，避免阈值被低估。
+        """
+        job = entry.worker
+        primary = next((attempt_id for attempt_id, label in job.labels.items() if label == 'primary'), None)
+        if not entry.interactive_ids or primary is None:
+            return
+        self.hedge_latency.record(provider_key(job.configs[primary]), time.monotonic() - job.started[primary])
+        
+    def _on_attempt_error(self, attempt_id, error_msg):
+        """尝试失败：主提供商失败时立即转到备用提供商，其余情况在没有其他尝试时报错"""
+        request_id = self._hedge_attempts.pop(attempt_id)
+        entry = self._inflight.get(request_id)
+        if entry is None:
+            return
+        job = entry.worker
+        label = job.labels[attempt_id]
+        del job.workers[attempt_id]
+        
+        if job.winner is None and label == 'primary' and not job.hedged and self._secondary_config() is not None:
+            job.hedged = True
+            self.stats['failovers'] += 1
+            print(f"请求 #{request_id} 主提供商失败，转到备用提供商: {error_msg}")
+            self._start_attempt(entry, 'secondary')
+            return
+        if job.winner == attempt_id or (job.winner is None and not job.workers):
+            self._on_error(request_id, error_msg)
+            
+    def _secondary_config(self):
+        """
+        备用提供商配置（api.secondary），未配置或关闭对冲时返回 None
+        
+        未指定的字段（超时、流式等）沿用主配置，地址和模型使用备用提供商自身的默认值。
+        """
+        secondary = self.api_config.get('secondary') or {}
+        if not self.api_config.get('hedge_enabled', True) or not secondary.get('provider') \
+                or not secondary.get('api_key'):
+            return None
+        config = {key: value for key, value in self.api_config.items()
+                  if key not in ('secondary', 'base_url', 'model')}
+        config.update({key: value for key, value in secondary.items() if value})
+        return config
+        
+    def _on_partial(self, request_id, delta, action_type):
+        """转发流式增量（仅交互式请求显示在界面上）"""
+        if request_id in self._hedge_attempts:
+            entry = self._claim_attempt(request_id)
+            if entry is not None and self._shows_partials(entry):
+                self.translation_partial.emit(delta, action_type)
+            return
+            
+        entry = self._inflight.get(request_id)
+        if entry is not None and self._shows_partials(entry):
+            self.translation_partial.emit(delta, action_type)
+            
+    def _shows_partials(self, entry):
+        """
+        条目的增量是否显示在界面上：只显示最近一次交互式请求的增量
+        （queue_all 策略下多个交互式请求同时执行，增量不能交错写入同一个窗口）
+        """
+        return self._latest_interactive in entry.interactive_ids
+        
+    def _on_result(self, request_id, result, action_type):
         """处理结果"""
-        # 缓存结果（包含关键词）
-        cache_key = f"{action_type}:{','.join(self.keywords)}:{self.worker.text}"
-        self.cache[cache_key] = result
+        if request_id in self._batch_jobs:
+            self._on_batch_result(request_id, result)
+            return
+        if request_id in self._chunk_jobs:
+            self._on_chunk_result(request_id, result)
+            return
+        api_config = self.api_config
+        if request_id in self._hedge_attempts:
+            entry = self._claim_attempt(request_id)
+            del self._hedge_attempts[request_id]
+            if entry is None:
+                return
+            api_config = entry.worker.configs[request_id]
+            request_id = entry.request_id
+            
+        entry = self._inflight.get(request_id)
+        if entry is None:
+            return
+            
+        # 按请求发起时的缓存键缓存结果；备用提供商胜出时按实际给出结果的提供商和模型缓存
+        cache_key = entry.cache_key
+        if api_config is not self.api_config:
+            cache_key = self._cache_key(entry.text, entry.action_type, entry.target_lang, api_config)
+        self.cache.put(cache_key, result, entry.action_type)
+        if self.disk_cache is not None:
+            self.disk_cache.put(cache_key, result, entry.action_type)
+        if self._uses_memory(entry.action_type):
+            scope = self._memory_scope(entry.text, entry.action_type, entry.target_lang, api_config)
+            self.memory.add(entry.text, result, scope)
+        logger.info(f"翻译缓存: {self.cache.format_stats()}")
+        pool = self.pool_stats()
+        logger.info(f"执行引擎: 执行中 {pool['active']}，排队 {pool['queue_depth']}，"
+                    f"平均等待 {pool['avg_wait_ms']:.0f} ms，最长等待 {pool['max_wait_ms']:.0f} ms")
         
-        # 发送信号
-        self.translation_ready.emit(result, action_type)
+        self._finish(entry, result)
         
-    def _on_error(self, error_msg):
+    def _on_error(self, request_id, error_msg):
         """处理错误"""
-        self.translation_error.emit(error_msg)
+        if request_id in self._batch_jobs:
+            self._on_batch_error(request_id, error_msg)
+            return
+        if request_id in self._chunk_jobs:
+            self._on_chunk_error(request_id, error_msg)
+            return
+        if request_id in self._hedge_attempts:
+            self._on_attempt_error(request_id, error_msg)
+            return
+            
+        entry = self._release(request_id, 'error')
+        if entry is None:
+            return
+        self._record_speculative(entry, failed=True)
+        if entry.interactive_ids:
+            self.translation_error.emit(error_msg)
+        for waiter_id in entry.waiters:
+            self.request_failed.emit(waiter_id, error_msg)
+            
+    def _finish(self, entry, result):
+        """将结果发给该条目上合并的所有请求"""
+        self._release(entry.request_id, 'ok')
+        self._record_speculative(entry)
+        if entry.interactive_ids:
+            self.translation_ready.emit(result, entry.action_type)
+        for waiter_id in entry.waiters:
+            self.request_ready.emit(waiter_id, result, entry.action_type)
+            
+    def _release(self, request_id, outcome='cancelled'):
+        """从处理中请求表移除条目"""
+        entry = self._inflight.pop(request_id, None)
+        if entry is not None:
+            tracer.end('request', request_id, outcome=outcome)
+        if entry is not None and self._inflight_keys.get(entry.cache_key) == request_id:
+            del self._inflight_keys[entry.cache_key]
+        if entry is not None and isinstance(entry.worker, (ChunkedJob, HedgedJob)):
+            for job_id in entry.worker.workers:
+                self._chunk_jobs.pop(job_id, None)
+                self._hedge_attempts.pop(job_id, None)
+        return entry
+        
+    def translate_batch(self, segments, action_type='translate'):
+        """
+        批量翻译（或润色）多段短文本
+        
+        未命中缓存的段落按 BATCH_MAX_SEGMENTS / BATCH_MAX_CHARS 打包，每包只调用一次API，
+        以 JSON 格式收发；无法从结果中解析出的段落再单独请求。每段结果分别写入缓存。
         
-    def update_config(self, api_config):
+        Args:
+            segments: 文本列表
+            action_type: 'translate' 或 'polish'
+            
+        Returns:
+            int: 批量请求 ID，进度通过 batch_progress、结果通过 batch_ready 返回
+        """
+        batch_id = next(self._request_ids)
+        batch = BatchRequest(batch_id, list(segments), action_type)
+        self._batches[batch_id] = batch
+        self.stats['batches'] += 1
+        
+        misses = []
+        hits = {}
+        for index, segment in enumerate(batch.segments):
+            if not segment or not segment.strip():
+                # 空白段落原样返回
+                batch.results[index] = segment or ''
+                batch.pending -= 1
+                continue
+            target_lang = self._target_lang(segment, action_type)
+            if self._is_noop(segment, action_type, target_lang):
+                self.stats['passthrough'] += 1
+                batch.results[index] = segment
+                batch.pending -= 1
+                continue
+            cache_key = self._cache_key(segment, action_type, target_lang)
+            if cache_key not in batch.indices:
+                batch.indices[cache_key] = []
+                batch.texts[cache_key] = segment
+                batch.targets[cache_key] = target_lang
+                cached = self.cache.get(cache_key)
+                if cached is None:
+                    misses.append(cache_key)
+                else:
+                    hits[cache_key] = cached
+            batch.indices[cache_key].append(index)
+            
+        # 内存命中的段落直接填入
+        for cache_key, cached in hits.items():
+            self._batch_fill(batch, cache_key, cached, notify=False)
+                
+        if not misses:
+            self._batch_check_done(batch)
+        elif self.disk_cache is not None:
+            self.disk_cache.get_many(
+                misses,
+                lambda found: self._batch_disk_lookup_done.emit(batch_id, (misses, found))
+            )
+        else:
+            self._dispatch_batch(batch, misses)
+        return batch_id
+        
+    def _on_batch_disk_lookup(self, batch_id, lookup):
+        """批量请求的磁盘缓存查询完成"""
+        batch = self._batches.get(batch_id)
+        if batch is None:
+            return
+        misses, found = lookup
+        for cache_key, value in found.items():
+            self.cache.put(cache_key, value, batch.action_type)
+            self._batch_fill(batch, cache_key, value)
+        remaining = [key for key in misses if key not in found]
+        if remaining:
+            self._dispatch_batch(batch, remaining)
+            
+    def _dispatch_batch(self, batch, cache_keys):
+        """将未命中的段落按目标语言分组打包提交，只剩一段的包按普通请求处理"""
+        chunk, chunk_chars = [], 0
+        chunks = []
+        for cache_key in sorted(cache_keys, key=lambda key: batch.targets[key] or ''):
+            length = len(batch.texts[cache_key])
+            if chunk and (len(chunk) >= BATCH_MAX_SEGMENTS or chunk_chars + length > BATCH_MAX_CHARS
+                          or batch.targets[chunk[0]] != batch.targets[cache_key]):
+                chunks.append(chunk)
+                chunk, chunk_chars = [], 0
+            chunk.append(cache_key)
+            chunk_chars += length
+        if chunk:
+            chunks.append(chunk)
+            
+        for chunk in chunks:
+            if len(chunk) == 1:
+                self._batch_fallback(batch, chunk[0])
+                continue
+                
+            job_id = next(self._request_ids)
+            self._batch_jobs[job_id] = (batch.batch_id, chunk)
+            self.stats['batch_calls'] += 1
+            worker = self._make_worker(
+                [batch.texts[key] for key in chunk], batch.action_type, job_id, self.api_config,
+                on_partial=None,
+                request_builder=build_batch_request,
+                stream=False,
+                target_lang=batch.targets[chunk[0]]
+            )
+            self._submit(worker, PRIORITY_BACKGROUND)
+                
+    def _on_batch_result(self, job_id, content):
+        """拆分合并调用的结果，解析失败的段落单独请求"""
+        batch_id, chunk = self._batch_jobs.pop(job_id)
+        batch = self._batches.get(batch_id)
+        if batch is None:
+            return
+            
+        results = parse_batch_response(content, len(chunk))
+        for cache_key, result in zip(chunk, results):
+            if result is None:
+                self._batch_fallback(batch, cache_key)
+                continue
+            self.cache.put(cache_key, result, batch.action_type)
+            if self.disk_cache is not None:
+                self.disk_cache.put(cache_key, result, batch.action_type)
+            if self._uses_memory(batch.action_type):
+                text = batch.texts[cache_key]
+                self.memory.add(text, result, self._memory_scope(text, batch.action_type, batch.targets[cache_key]))
+            self._batch_fill(batch, cache_key, result)
+            
+    def _on_batch_error(self, job_id, error_msg):
+        """合并调用失败时逐段重试"""
+        batch_id, chunk = self._batch_jobs.pop(job_id)
+        batch = self._batches.get(batch_id)
+        if batch is None:
+            return
+        print(f"批量请求 #{batch_id} 的合并调用失败，改为逐段请求: {error_msg}")
+        for cache_key in chunk:
+            self._batch_fallback(batch, cache_key)
+            
+    def _batch_fallback(self, batch, cache_key):
+        """
+        单独请求一个段落
+        
+        走处理中请求表（可与相同的请求合并），但跳过缓存查询——批量请求已经查过。
+        """
+        self.stats['batch_fallbacks'] += 1
+        request_id = next(self._request_ids)
+        self._batch_segments[request_id] = (batch.batch_id, cache_key)
+        
+        primary_id = self._inflight_keys.get(cache_key)
+        if primary_id is not None:
+            self._inflight[primary_id].waiters.append(request_id)
+            return
+        entry = InflightRequest(request_id, cache_key, batch.texts[cache_key], batch.action_type,
+                                batch.targets[cache_key])
+        self._inflight[request_id] = entry
+        self._inflight_keys[cache_key] = request_id
+        self._start_worker(entry)
+        
+    def _on_batch_segment_ready(self, request_id, result, action_type):
+        """单独请求的段落完成"""
+        target = self._batch_segments.pop(request_id, None)
+        if target is None:
+            return
+        batch = self._batches.get(target[0])
+        if batch is not None:
+            self._batch_fill(batch, target[1], result)
+            
+    def _on_batch_segment_failed(self, request_id, error_msg):
+        """单独请求的段落失败"""
+        target = self._batch_segments.pop(request_id, None)
+        if target is None:
+            return
+        batch = self._batches.get(target[0])
+        if batch is None:
+            return
+        for index in batch.indices[target[1]]:
+            batch.errors[index] = error_msg
+        self._batch_fill(batch, target[1], None)
+        
+    def _batch_fill(self, batch, cache_key, result, notify=True):
+        """填入一个缓存键对应的所有段落结果"""
+        for index in batch.indices[cache_key]:
+            batch.results[index] = result
+            batch.pending -= 1
+        if notify:
+            self._batch_check_done(batch)
+            
+    def _batch_check_done(self, batch):
+        """发出进度，全部完成时发出结果"""
+        total = len(batch.segments)
+        self.batch_progress.emit(batch.batch_id, total - batch.pending, total)
+        if batch.pending == 0:
+            del self._batches[batch.batch_id]
+            if batch.errors:
+                print(f"批量请求 #{batch.batch_id} 有 {len(batch.errors)} 段失败")
+            self.batch_ready.emit(batch.batch_id, batch.results)
+            
+    def request_stats(self):
+        """获取请求统计（总数、合并数、被取代数、中止的网络请求数、对冲次数与胜出次数、重试与熔断、术语表节省的 token、处理中数量）"""
+        eligible = self.stats['hedge_eligible']
+        return dict(self.stats, inflight=len(self._inflight),
+                    hedge_rate=self.stats['hedged'] / eligible if eligible else 0.0,
+                    glossary=self.glossary.summary(),
+                    speculative=self.speculative_stats_summary(),
+                    latency=self.latency.stats(),
+                    hedge_latency=self.hedge_latency.stats(),
+                    resilience=dict(self.health.stats, breakers=self.health.breaker_stats()))
+        
+    def speculative_stats_summary(self):
+        """预取统计：发起数、命中数与命中率、取消/失败/未使用的数量和浪费的估算 token"""
+        started = self.speculative_stats['started']
+        return dict(self.speculative_stats, pending=len(self._speculative_results),
+                    hit_rate=self.speculative_stats['hits'] / started if started else 0.0)
+        
+    def rate_limit_stats(self):
+        """获取各提供商的限流状态（限额、排队中的请求数、当前排队等待时间等）"""
+        return self.health.limiter.stats()
+        
+    def pool_stats(self):
+        """获取当前执行引擎的统计（排队深度、排队等待时间等）"""
+        if self.async_engine is not None:
+            return self.async_engine.stats()
+        return self.worker_pool.stats()
+        
+    def _cache_key(self, text, action_type, target_lang=None, api_config=None):
+        """生成缓存键（包含提供商、实际请求的模型、目标语言和原文中出现的术语），默认按主提供商的配置"""
+        api_config = api_config or self.api_config
+        return make_cache_key(
+            api_config.get('provider', 'openai'),
+            resolve_model(api_config),
+            action_type,
+            self.glossary.terms(text),
+            text,
+            target_lang
+        )
+        
+    def _configure_cache(self, general_config):
+        """根据 general 配置更新缓存开关、容量和过期时间"""
+        enabled = general_config.get('cache_enabled', True)
+        ttl = general_config.get('cache_ttl')
+        self.cache.configure(
+            enabled=enabled,
+            max_bytes=int(general_config.get('cache_max_mb', DEFAULT_MAX_BYTES / 1024 / 1024) * 1024 * 1024),
+            ttl=ttl
+        )
+        
+        disk_enabled = enabled and general_config.get('disk_cache_enabled', True)
+        disk_max_bytes = int(general_config.get('disk_cache_max_mb', DEFAULT_DISK_MAX_BYTES / 1024 / 1024) * 1024 * 1024)
+        if disk_enabled and self.disk_cache is None:
+            self.disk_cache = DiskCache(get_data_dir() / 'cache.db', disk_max_bytes, ttl)
+        elif disk_enabled:
+            self.disk_cache.configure(disk_max_bytes, ttl)
+        elif self.disk_cache is not None:
+            self.disk_cache.close()
+            self.disk_cache = None
+            
+        memory_enabled = enabled and general_config.get('memory_enabled', False)
+        threshold = general_config.get('memory_threshold', DEFAULT_THRESHOLD)
+        max_entries = general_config.get('memory_max_entries', DEFAULT_MAX_ENTRIES)
+        if memory_enabled and self.memory is None:
+            self.memory = TranslationMemory(get_data_dir() / 'memory.db', threshold, max_entries)
+        elif memory_enabled:
+            self.memory.configure(threshold, max_entries)
+        elif self.memory is not None:
+            self.memory.close()
+            self.memory = None
+        
+    def _configure_engine(self, api_config):
+        """根据 api.engine 选择线程池或 asyncio 引擎"""
+        engine = api_config.get('engine', ENGINE_THREAD)
+        if engine == ENGINE_ASYNCIO and not async_engine.is_available():
+            print("⚠️  asyncio 引擎需要安装 aiohttp，改用线程池引擎")
+            engine = ENGINE_THREAD
+            
+        if engine == ENGINE_ASYNCIO:
+            max_concurrency = api_config.get('max_concurrency', DEFAULT_MAX_CONCURRENCY)
+            if self.async_engine is None:
+                self.async_engine = AsyncTranslationEngine(
+                    max_concurrency,
+                    api_config.get('pool_idle_timeout', DEFAULT_IDLE_TIMEOUT)
+                )
+            else:
+                self.async_engine.set_concurrency(max_concurrency)
+        elif self.async_engine is not None:
+            # 已提交的任务会随事件循环停止而结束
+            self.async_engine.shutdown()
+            self.async_engine = None
+        
+    def _configure_policy(self, general_config):
+        """根据 general 配置更新交互式请求的取代策略"""
+        policy = general_config.get('supersede_policy', SUPERSEDE_LATEST_WINS)
+        if policy not in (SUPERSEDE_LATEST_WINS, SUPERSEDE_QUEUE_ALL):
+            print(f"未知的请求取代策略: {policy}，使用 {SUPERSEDE_LATEST_WINS}")
+            policy = SUPERSEDE_LATEST_WINS
+        self.supersede_policy = policy
+        
+    def cache_stats(self):
+        """获取缓存统计（命中、未命中、淘汰等），磁盘缓存和翻译记忆的统计位于 'disk'、'memory' 键"""
+        stats = self.cache.stats()
+        if self.disk_cache is not None:
+            stats['disk'] = self.disk_cache.stats()
+        if self.memory is not None:
+            stats['memory'] = self.memory.stats()
+        return stats
+        
+    def update_config(self, api_config, general_config=None):
         """更新API配置"""
+        old_base_url = resolve_base_url(self.api_config)
         self.api_config = api_config
-        self.cache.clear()  # 清空缓存
+        # 缓存键已包含提供商和模型，切换配置无需清空缓存
+        if general_config is not None:
+            self._configure_cache(general_config)
+            self._configure_policy(general_config)
+        
+        self.worker_pool.resize(api_config.get('max_workers', DEFAULT_MAX_WORKERS))
+        self.health.max_retries = api_config.get('max_retries', DEFAULT_MAX_RETRIES)
+        self.health.limiter.configure(api_config.get('rate_limits'))
+        self._configure_engine(api_config)
+        
+        # 更新连接池参数；API 地址变化时重建连接并重新预热
+        self.session_pool.configure(
+            api_config.get('pool_size', DEFAULT_POOL_SIZE),
+            api_config.get('pool_idle_timeout', DEFAULT_IDLE_TIMEOUT)
+        )
+        secondary = self._secondary_config()
+        if secondary is not None:
+            self.session_pool.warmup(resolve_base_url(secondary))
+        new_base_url = resolve_base_url(api_config)
+        if new_base_url != old_base_url:
+            self.session_pool.reset(old_base_url)
+            self.session_pool.warmup(new_base_url)
+            if self.async_engine is not None:
+                self.async_engine.reset()
+            
+    def shutdown(self):
+        """退出前关闭工作线程池、磁盘缓存和连接池"""
+        self.worker_pool.shutdown()
+        if self.async_engine is not None:
+            self.async_engine.shutdown()
+            self.async_engine = None
+        if self.disk_cache is not None:
+            self.disk_cache.close()
+            self.disk_cache = None
+        if self.memory is not None:
+            self.memory.close()
+            self.memory = None
+        self.session_pool.close()
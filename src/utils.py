@@ -53,6 +53,18 @@ def get_config_path():
     return config_dir / 'config.json'
 
 
+def get_data_dir():
+    """
+    获取用户数据目录（~/.zdtrans），用于保存缓存等运行时数据
+    
+    Returns:
+        Path: 数据目录路径
+    """
+    data_dir = Path.home() / '.zdtrans'
+    data_dir.mkdir(exist_ok=True)
+    return data_dir
+
+
 def load_config():
     """
     加载配置文件
@@ -68,11 +80,33 @@ def load_config():
             'provider': 'openai',
             'api_key': '',
             'base_url': 'https://api.openai.com/v1',
-            'model': 'gpt-3.5-turbo'
+            'model': 'gpt-3.5-turbo',
+            'pool_size': 4,
+            'pool_idle_timeout': 90,
+            'max_workers': 4,
+            'engine': 'thread',
+            'max_concurrency': 16,
+            'stream': True,
+            'chunk_max_chars': 2000,
+            'keyword_max_tokens': 300,
+            'timeout': 30,
+            'max_retries': 2,
+            'rate_limits': {},
+            'source_lang': 'auto',
+            'target_lang': 'auto',
+            'hedge_enabled': True,
+            'secondary': {
+                'provider': '',
+                'api_key': '',
+                'base_url': '',
+                'model': ''
+            }
         },
         'translation': {
             'domain': 'general',
             'custom_context': '',
+            'keywords': '',
+            'glossary_file': '',
             'preserve_terms': True,
             'academic_mode': False
         },
@@ -88,6 +122,29 @@ def load_config():
         'general': {
             'auto_start': False,
             'cache_enabled': True,
+            'cache_max_mb': 4,
+            'cache_ttl': {
+                'translate': 604800,
+                'polish': 86400
+            },
+            'disk_cache_enabled': True,
+            'disk_cache_max_mb': 64,
+            'memory_enabled': False,
+            'memory_threshold': 0.9,
+            'memory_max_entries': 200000,
+            'supersede_policy': 'latest_wins',
+            'capture_timeout_ms': 500,
+            'capture_adaptive': True,
+            'prefetch_enabled': False,
+            'prefetch_debounce_ms': 400,
+            'prefetch_min_chars': 2,
+            'prefetch_max_chars': 2000,
+            'server_enabled': False,
+            'server_port': 7878,
+            'server_queue_size': 64,
+            'server_token': '',
+            'trace_enabled': False,
+            'trace_max_files': 50,
             'language': 'zh-CN'
         }
     }
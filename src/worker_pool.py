@@ -0,0 +1,161 @@
+"""
+工作线程池模块
+固定数量的常驻线程 + 优先级请求队列，替代每个请求新建一个线程
+"""
+
+import heapq
+import itertools
+import queue
+import threading
+import time
+
+
+# 默认并发数
+DEFAULT_MAX_WORKERS = 4
+
+# 任务优先级（数值越小越先执行）
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 10
+PRIORITY_SPECULATIVE = 20  # 预取，只在没有其他任务时执行
+
+# 空闲线程检查是否需要退出的间隔（秒）
+IDLE_CHECK_INTERVAL = 1.0
+
+
+class WorkerPool:
+    """
+    线程池
+
+    任务是带有 run() 方法的对象；若任务提供 is_cancelled()，
+    出队时已取消的任务会被直接跳过。线程按需启动、常驻复用，
+    缩小并发数时多余的线程在空闲后自行退出。
+    """
+
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS, name='zdtrans-worker'):
+        self.max_workers = max(1, int(max_workers))
+        self.name = name
+        self._queue = queue.PriorityQueue()
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._threads = set()
+        self._idle = 0
+        self._shutdown = False
+
+        # 统计
+        self._active = 0
+        self._completed = 0
+        self._skipped = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._last_wait = 0.0
+
+    def submit(self, task, priority=PRIORITY_INTERACTIVE):
+        """
+        提交任务
+
+        Args:
+            task: 带 run() 方法的任务对象
+            priority: 优先级，数值越小越先执行
+        """
+        if self._shutdown:
+            raise RuntimeError("线程池已关闭")
+        self._queue.put((priority, next(self._seq), time.monotonic(), task))
+
+        with self._lock:
+            # 排队任务多于空闲线程且未达到并发上限时才新建线程
+            if self._queue.qsize() > self._idle and len(self._threads) < self.max_workers:
+                thread = threading.Thread(target=self._worker_loop, name=f"{self.name}-{len(self._threads)}",
+                                          daemon=True)
+                self._threads.add(thread)
+                thread.start()
+
+    def reprioritize(self, task, priority):
+        """
+        提高排队中任务的优先级（不重复提交，排队等待时间从最初提交时算起）
+
+        Returns:
+            bool: 任务仍在排队并已调整时返回 True；已开始执行或不在队列中时返回 False
+        """
+        with self._queue.mutex:
+            items = self._queue.queue
+            for index, (old_priority, seq, enqueued_at, queued) in enumerate(items):
+                if queued is task:
+                    if priority < old_priority:
+                        items[index] = (priority, seq, enqueued_at, queued)
+                        heapq.heapify(items)
+                    return True
+        return False
+
+    def resize(self, max_workers):
+        """调整并发数"""
+        self.max_workers = max(1, int(max_workers))
+
+    def stats(self):
+        """
+        获取线程池统计
+
+        Returns:
+            dict: 线程数、执行中任务数、排队深度，以及排队等待时间（毫秒）
+        """
+        with self._lock:
+            started = self._completed + self._active
+            return {
+                'max_workers': self.max_workers,
+                'threads': len(self._threads),
+                'active': self._active,
+                'queue_depth': self._queue.qsize(),
+                'completed': self._completed,
+                'skipped': self._skipped,
+                'avg_wait_ms': self._wait_total / started * 1000 if started else 0.0,
+                'max_wait_ms': self._wait_max * 1000,
+                'last_wait_ms': self._last_wait * 1000
+            }
+
+    def shutdown(self):
+        """停止接收任务，线程处理完队列后退出"""
+        self._shutdown = True
+        with self._lock:
+            count = len(self._threads)
+        for _ in range(count):
+            self._queue.put((float('inf'), next(self._seq), 0, None))
+
+    def _worker_loop(self):
+        """工作线程主循环"""
+        current = threading.current_thread()
+        while True:
+            with self._lock:
+                if len(self._threads) > self.max_workers:
+                    self._threads.discard(current)
+                    return
+                self._idle += 1
+
+            try:
+                _, _, enqueued_at, task = self._queue.get(timeout=IDLE_CHECK_INTERVAL)
+            except queue.Empty:
+                with self._lock:
+                    self._idle -= 1
+                continue
+
+            with self._lock:
+                self._idle -= 1
+                if task is None:
+                    self._threads.discard(current)
+                    return
+                if getattr(task, 'is_cancelled', None) and task.is_cancelled():
+                    self._skipped += 1
+                    continue
+                wait = time.monotonic() - enqueued_at
+                self._wait_total += wait
+                self._wait_max = max(self._wait_max, wait)
+                self._last_wait = wait
+                self._active += 1
+
+            try:
+                task.run()
+            except Exception as e:
+                print(f"工作线程任务异常: {e}")
+            finally:
+                del task
+                with self._lock:
+                    self._active -= 1
+                    self._completed += 1
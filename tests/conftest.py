@@ -0,0 +1,68 @@
+"""
+测试共用的 fixture：Qt 事件循环、临时用户目录、模拟服务和 TranslatorManager
+"""
+
+import os
+
+import pytest
+
+from benchmarks.stub_provider import StubConfig, StubProvider
+
+
+@pytest.fixture
+def qapp():
+    """离屏 QApplication（界面组件的测试也可以使用）"""
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PySide6.QtWidgets import QApplication
+
+    return QApplication.instance() or QApplication([])
+
+
+@pytest.fixture
+def home(tmp_path, monkeypatch):
+    """把用户目录（~/.zdtrans 中的缓存、翻译记忆和 trace）指向临时目录"""
+    monkeypatch.setenv('HOME', str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def stub():
+    provider = StubProvider(config=StubConfig(latency=0.01, jitter=0, seed=0)).start()
+    yield provider
+    provider.stop()
+
+
+@pytest.fixture
+def make_manager(qapp, home, stub):
+    """
+    创建使用模拟服务的 TranslatorManager，测试结束时关闭
+
+    默认不读写磁盘缓存和翻译记忆、不重试、不对冲，参数覆盖 api / general 配置
+    """
+    from src.translator import TranslatorManager
+
+    managers = []
+
+    def make(api=None, general=None):
+        api_config = {
+            'provider': 'volcengine',
+            'api_key': 'test-key',
+            'base_url': stub.base_url,
+            'model': 'stub-model',
+            'stream': False,
+            'max_retries': 0,
+            'hedge_enabled': False,
+            'rate_limits': {},
+        }
+        api_config.update(api or {})
+        general_config = {'cache_enabled': True, 'disk_cache_enabled': False, 'memory_enabled': False}
+        general_config.update(general or {})
+        manager = TranslatorManager(api_config, general_config)
+        managers.append(manager)
+        return manager
+
+    yield make
+    for manager in managers:
+        manager.shutdown()
+        manager.deleteLater()
+    qapp.processEvents()
@@ -0,0 +1,74 @@
+"""
+测试用的模拟剪贴板和键盘
+"""
+
+import threading
+
+
+class FakeClipboardBackend:
+    """
+    内存中的剪贴板，用于在没有图形环境的系统上测试获取选中文本
+
+    keyboard 属性模拟键盘：松开 C 键（模拟复制）latency 秒后把 selection 写入剪贴板，
+    selection 为 None 时不写入（模拟没有选中文本）。sequence=False 时模拟不支持变化序号的平台。
+    events 按顺序记录 (事件, 线程名)，模拟复制记为 'copy'，测试可以追加自己的事件比较先后。
+    """
+
+    def __init__(self, text='', selection=None, latency=0.0, sequence=True):
+        self.text = text
+        self.selection = selection
+        self.latency = latency
+        self.writes = 0
+        self.events = []
+        self._sequence = 0 if sequence else None
+        self._lock = threading.Lock()
+        self.keyboard = FakeKeyboard(self)
+
+    def read(self):
+        with self._lock:
+            return self.text
+
+    def write(self, text):
+        with self._lock:
+            self.text = text
+            self.writes += 1
+            if self._sequence is not None:
+                self._sequence += 1
+
+    def sequence(self):
+        with self._lock:
+            return self._sequence
+
+    def record(self, event):
+        """记录事件和所在线程"""
+        self.events.append((event, threading.current_thread().name))
+
+    def copies(self):
+        """模拟复制的次数"""
+        return sum(event == 'copy' for event, _ in self.events)
+
+    def copy_selection(self):
+        """目标程序响应复制快捷键"""
+        self.record('copy')
+        if self.selection is None:
+            return
+        if self.latency > 0:
+            timer = threading.Timer(self.latency, self.write, (self.selection,))
+            timer.daemon = True
+            timer.start()
+        else:
+            self.write(self.selection)
+
+
+class FakeKeyboard:
+    """与 pynput Controller 接口相同的模拟键盘"""
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def press(self, key):
+        pass
+
+    def release(self, key):
+        if key == 'c':
+            self.backend.copy_selection()
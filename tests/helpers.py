@@ -0,0 +1,31 @@
+"""
+测试辅助函数
+"""
+
+import time
+
+
+def wait_until(condition, timeout=5.0):
+    """
+    处理 Qt 事件（工作线程排队到主线程的信号）直到 condition() 为真
+
+    Returns:
+        bool: 超时前条件是否成立
+    """
+    from PySide6.QtCore import QCoreApplication, QEventLoop
+
+    app = QCoreApplication.instance()
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() >= deadline:
+            return False
+        app.processEvents(QEventLoop.AllEvents, 10)
+        time.sleep(0.002)
+    return True
+
+
+def collect(signal):
+    """把信号的参数记录到列表中"""
+    received = []
+    signal.connect(lambda *args: received.append(args))
+    return received
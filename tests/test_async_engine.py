@@ -0,0 +1,149 @@
+"""
+asyncio 引擎的测试：使用模拟服务执行任务，取消时释放熔断器的试探名额和限流预约；
+未安装 aiohttp 时改用线程池引擎
+"""
+
+import threading
+
+import pytest
+
+from src import async_engine
+from src.resilience import FAILURE_THRESHOLD, STATE_CLOSED, STATE_HALF_OPEN, ProviderHealth
+from tests.helpers import collect, wait_until
+
+
+pytest.importorskip('aiohttp')
+
+from src.async_engine import AsyncTranslationEngine, AsyncTranslatorJob  # noqa: E402
+
+
+KEY = 'volcengine/stub-model'
+
+
+@pytest.fixture
+def engine(qapp):
+    engine = AsyncTranslationEngine(max_concurrency=4)
+    yield engine
+    engine.shutdown()
+
+
+@pytest.fixture
+def api(stub):
+    return {'provider': 'volcengine', 'api_key': 'test-key', 'base_url': stub.base_url, 'model': 'stub-model',
+            'target_lang': 'zh-CN', 'stream': False}
+
+
+class Callbacks:
+    """记录任务回调（在事件循环线程中执行）"""
+
+    def __init__(self):
+        self.results, self.partials, self.errors = [], [], []
+        self.done = threading.Event()
+
+    def kwargs(self):
+        return {'on_result': self._result, 'on_partial': lambda *args: self.partials.append(args),
+                'on_error': self._error}
+
+    def _result(self, *args):
+        self.results.append(args)
+        self.done.set()
+
+    def _error(self, *args):
+        self.errors.append(args)
+        self.done.set()
+
+
+def submit(engine, text, api, health=None, request_id=1, **kwargs):
+    callbacks = Callbacks()
+    job = AsyncTranslatorJob(text, 'translate', api, request_id=request_id, health=health,
+                             target_lang='zh-CN', **callbacks.kwargs(), **kwargs)
+    engine.submit(job)
+    return job, callbacks
+
+
+def test_job_result_and_stream(engine, api, stub):
+    stub.config.token_rate = 200
+    job, callbacks = submit(engine, 'Hello async world', api, ProviderHealth())
+    assert callbacks.done.wait(5)
+    assert callbacks.results == [(1, '[译] Hello async world', 'translate')]
+
+    job, callbacks = submit(engine, 'Streamed reply', dict(api, stream=True), ProviderHealth(), request_id=2)
+    assert callbacks.done.wait(5)
+    assert callbacks.results == [(2, '[译] Streamed reply', 'translate')]
+    assert ''.join(delta for _, delta, _ in callbacks.partials) == '[译] Streamed reply'
+    assert wait_until(lambda: engine.stats()['completed'] == 2)
+
+
+def test_provider_error_is_reported(engine, api, stub):
+    stub.config.failure_rate = 1.0
+    _, callbacks = submit(engine, 'Fails', api, ProviderHealth(max_retries=0))
+    assert callbacks.done.wait(5)
+    assert callbacks.errors and callbacks.errors[0][0] == 1
+    assert '503' in callbacks.errors[0][1]
+
+
+def test_cancel_while_rate_limited_releases_reservation(engine, api, stub):
+    health = ProviderHealth(rate_limits={KEY: {'rpm': 1}})
+    _, first = submit(engine, 'Uses the only request this minute', api, health)
+    assert first.done.wait(5)
+
+    job, callbacks = submit(engine, 'Waits for the next minute', api, health, request_id=2)
+    assert wait_until(lambda: health.limiter.stats()[KEY]['queued'] == 1)
+    assert health.limiter.queue_wait(api) == pytest.approx(120, abs=1)
+
+    job.cancel()
+    assert wait_until(lambda: health.limiter.stats()[KEY]['queued'] == 0)
+    assert wait_until(lambda: engine.stats()['cancelled'] == 1)
+    # 预约退还后，新请求只需等待第一个请求占用的额度恢复
+    assert health.limiter.queue_wait(api) == pytest.approx(60, abs=1)
+    assert not callbacks.done.is_set()
+    assert stub.config.snapshot()['requests'] == 1
+
+
+def test_cancel_releases_half_open_trial(engine, api, stub):
+    stub.config.latency = 1.0
+    health = ProviderHealth()
+    breaker = health.breaker(api)
+    for _ in range(FAILURE_THRESHOLD):
+        breaker.record_failure(api)
+    breaker.reopen_ready()
+
+    job, callbacks = submit(engine, 'Trial request', api, health)
+    assert wait_until(lambda: stub.config.snapshot()['requests'] == 1)
+    assert breaker.trial_in_flight
+    job.cancel()
+    assert wait_until(lambda: not breaker.trial_in_flight)
+    assert breaker.state == STATE_HALF_OPEN
+    assert not callbacks.done.is_set()
+
+    # 下一个请求可以作为试探请求，成功后恢复
+    stub.config.latency = 0.01
+    _, callbacks = submit(engine, 'Next trial', api, health, request_id=2)
+    assert callbacks.done.wait(5)
+    assert callbacks.results
+    assert breaker.state == STATE_CLOSED
+
+
+def test_falls_back_to_thread_pool_without_aiohttp(make_manager, monkeypatch):
+    monkeypatch.setattr(async_engine, 'aiohttp', None)
+    assert not async_engine.is_available()
+    with pytest.raises(RuntimeError):
+        AsyncTranslationEngine()
+
+    manager = make_manager({'engine': 'asyncio'})
+    assert manager.async_engine is None
+    ready = collect(manager.request_ready)
+    request_id = manager.translate('Still translated')
+    assert wait_until(lambda: ready)
+    assert ready == [(request_id, '[译] Still translated', 'translate')]
+    assert manager.pool_stats().get('engine') != 'asyncio'
+
+
+def test_manager_uses_async_engine(make_manager):
+    manager = make_manager({'engine': 'asyncio'})
+    assert manager.async_engine is not None
+    ready = collect(manager.request_ready)
+    request_id = manager.translate('Through the event loop')
+    assert wait_until(lambda: ready)
+    assert ready == [(request_id, '[译] Through the event loop', 'translate')]
+    assert manager.pool_stats()['engine'] == 'asyncio'
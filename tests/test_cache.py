@@ -0,0 +1,102 @@
+"""
+翻译缓存（按字节的 LRU 淘汰、按操作类型过期）的测试
+"""
+
+import pytest
+
+from src import cache as cache_module
+from src.cache import ENTRY_OVERHEAD, TranslationCache, make_cache_key
+
+
+class FakeClock:
+    """代替 time 模块，手动推进 monotonic()"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cache_module, 'time', clock)
+    return clock
+
+
+def entry_size(key, value):
+    return len(key) + len(value.encode('utf-8')) + ENTRY_OVERHEAD
+
+
+def test_evicts_least_recently_used_by_bytes():
+    size = entry_size('a', '一二三')
+    cache = TranslationCache(max_bytes=size * 2)
+    cache.put('a', '一二三')
+    cache.put('b', '四五六')
+    assert cache.get('a') == '一二三'  # b 成为最久未使用的条目
+
+    cache.put('c', '七八九')
+    assert cache.get('b') is None
+    assert cache.get('a') == '一二三'
+    assert cache.get('c') == '七八九'
+    stats = cache.stats()
+    assert stats['evictions'] == 1
+    assert stats['bytes'] == size * 2 <= stats['max_bytes']
+
+
+def test_large_value_evicts_several_entries():
+    cache = TranslationCache(max_bytes=entry_size('a', 'x' * 100) * 3)
+    for key in 'abc':
+        cache.put(key, 'x' * 100)
+    cache.put('d', 'x' * 250)
+    assert cache.get('a') is None and cache.get('b') is None
+    assert cache.get('c') is not None and cache.get('d') is not None
+    assert cache.stats()['evictions'] == 2
+
+
+def test_value_larger_than_budget_is_not_cached():
+    cache = TranslationCache(max_bytes=200)
+    cache.put('a', 'short')
+    cache.put('b', 'x' * 500)
+    assert cache.get('b') is None
+    assert cache.get('a') == 'short'
+
+
+def test_shrinking_max_bytes_evicts():
+    cache = TranslationCache()
+    for key in 'abcd':
+        cache.put(key, 'value')
+    cache.configure(max_bytes=entry_size('a', 'value') * 2)
+    assert cache.stats()['entries'] == 2
+    assert cache.get('a') is None and cache.get('d') == 'value'
+
+
+def test_entries_expire_by_action_type(clock):
+    cache = TranslationCache(ttl={'translate': 100, 'polish': 10})
+    cache.put('t', 'translated', 'translate')
+    cache.put('p', 'polished', 'polish')
+
+    clock.now += 10
+    assert cache.get('p') is None
+    assert cache.get('t') == 'translated'
+
+    clock.now += 90
+    assert cache.get('t') is None
+    stats = cache.stats()
+    assert stats['expirations'] == 2
+    assert stats['entries'] == 0 and stats['bytes'] == 0
+
+
+def test_zero_ttl_never_expires(clock):
+    cache = TranslationCache(ttl={'translate': 0})
+    cache.put('t', 'translated')
+    clock.now += 10 ** 9
+    assert cache.get('t') == 'translated'
+
+
+def test_key_ignores_whitespace_but_not_settings():
+    key = make_cache_key('openai', 'gpt', 'translate', ['ml'], 'Hello\r\nworld  ', 'zh-CN')
+    assert key == make_cache_key('openai', 'gpt', 'translate', ['ml'], ' Hello\nworld', 'zh-CN')
+    assert key != make_cache_key('openai', 'gpt-4', 'translate', ['ml'], 'Hello\nworld', 'zh-CN')
+    assert key != make_cache_key('openai', 'gpt', 'translate', ['ml'], 'Hello\nworld', 'ja')
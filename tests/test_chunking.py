@@ -0,0 +1,80 @@
+"""
+长文本分块和按原顺序拼接的测试
+"""
+
+import pytest
+
+from src.chunking import chunk_char_limit, context_window, join_chunks, split_text
+
+
+def test_short_text_is_one_chunk():
+    assert split_text('  short text \n', 100) == (['short text'], [])
+
+
+def test_splits_on_paragraphs_first():
+    paragraphs = ['a' * 40, 'b' * 40, 'c' * 40]
+    chunks, separators = split_text('\n\n'.join(paragraphs), 90)
+    assert chunks == ['a' * 40 + '\n\n' + 'b' * 40, 'c' * 40]
+    assert separators == ['\n\n']
+
+
+def test_long_paragraph_splits_on_sentences():
+    sentences = ['This is sentence number %d.' % i for i in range(10)]
+    chunks, separators = split_text(' '.join(sentences), 60)
+    assert all(len(chunk) <= 60 for chunk in chunks)
+    # 每块以完整的句子结尾
+    assert all(chunk.endswith('.') for chunk in chunks)
+    assert separators == [' '] * (len(chunks) - 1)
+
+
+def test_cjk_sentences_split_without_whitespace():
+    text = '这是第一句话。' * 10
+    chunks, separators = split_text(text, 30)
+    assert all(len(chunk) <= 30 and chunk.endswith('。') for chunk in chunks)
+    assert set(separators) == {''}
+
+
+def test_latin_period_without_space_is_not_a_break():
+    """拉丁文句末标点后没有空白（如版本号、小数）时不切分，只能按长度硬切"""
+    chunks, _ = split_text('v1.2.3' * 10, 25)
+    assert all(len(chunk) <= 25 for chunk in chunks)
+    assert ''.join(chunks) == 'v1.2.3' * 10
+
+
+@pytest.mark.parametrize('text', [
+    '\n\n'.join(['First paragraph. It has two sentences.', '第二段。包含两句话。', 'Third one? Yes! Done.'] * 5),
+    'Line one.\nLine two.\nLine three.\n' * 20,
+    # 中日韩文与拉丁文之间有空白（拼接时在两者之间补空格）
+    '中文句子一。中文句子二！ English after CJK. 又回到中文；结束。' * 8,
+    'a long paragraph without any sentence punctuation that must be cut between words ' * 4,
+])
+def test_round_trip(text):
+    text = text.strip()
+    for limit in (15, 40, 120):
+        chunks, separators = split_text(text, limit)
+        assert len(separators) == len(chunks) - 1
+        assert all(len(chunk) <= limit for chunk in chunks)
+        assert join_chunks(chunks, separators) == text
+
+
+def test_hard_split_prefers_word_boundaries():
+    chunks, separators = split_text('one two three four five six seven eight nine ten', 12)
+    assert chunks == ['one two', 'three four', 'five six', 'seven eight', 'nine ten']
+    assert separators == [' '] * 4
+
+
+def test_join_normalizes_separators():
+    assert join_chunks(['甲。', '乙。'], ['']) == '甲。乙。'
+    assert join_chunks(['A.', 'B.'], ['   ']) == 'A. B.'
+    assert join_chunks(['A', 'B', 'C'], ['\n \n\n', ' \n ']) == 'A\n\nB\nC'
+    # 原文在中文句中切分、译文为英文时补空格
+    assert join_chunks(['First.', 'Second.'], ['']) == 'First. Second.'
+    assert join_chunks([], []) == ''
+
+
+def test_chunk_limit_follows_context_window():
+    assert context_window('doubao-pro-32k') == 32 * 1024
+    assert context_window('unknown-model') == 8192
+    assert chunk_char_limit('gpt-4', max_chars=10000) == (8192 - 512) // 2
+    assert chunk_char_limit('gpt-4o', max_chars=10000) == 4096
+    assert chunk_char_limit('gpt-4o') == 2000
@@ -0,0 +1,74 @@
+"""
+命令行批量翻译的测试：段落拆分、按原文顺序输出、原样返回、失败退出码和缓存命中统计
+"""
+
+import json
+
+import pytest
+
+from src import cli
+
+
+@pytest.fixture
+def run_cli(qapp, home, stub, tmp_path, monkeypatch, capsys):
+    """在临时目录中写入指向模拟服务的 config.json，运行命令行并返回 (退出码, 输出, 标准错误)"""
+    monkeypatch.chdir(tmp_path)
+    config = {
+        'api': {'provider': 'volcengine', 'api_key': 'test-key', 'base_url': stub.base_url, 'model': 'stub-model',
+                'target_lang': 'zh-CN', 'max_retries': 0, 'hedge_enabled': False},
+        'general': {'disk_cache_enabled': True, 'memory_enabled': False},
+    }
+    (tmp_path / 'config.json').write_text(json.dumps(config), encoding='utf-8')
+
+    def run(text, *args):
+        source = tmp_path / 'input.txt'
+        target = tmp_path / 'output.txt'
+        source.write_text(text, encoding='utf-8')
+        code = cli.main(['translate', str(source), '-o', str(target), *args])
+        return code, target.read_text(encoding='utf-8'), capsys.readouterr().err
+
+    return run
+
+
+def test_split_segments_round_trips():
+    text = 'first\n\n  second\nstill second\n \n\nthird\n'
+    pieces = cli.split_segments(text)
+    assert pieces[::2] == ['first', 'second\nstill second', 'third\n']
+    assert ''.join(pieces) == text
+    assert cli.split_segments('a\nb', 'line') == ['a', '\n', 'b']
+    assert cli.split_segments('a\n\nb', 'none') == ['a\n\nb']
+
+
+def test_output_keeps_order_separators_and_passthrough(run_cli, stub):
+    text = '\n\n'.join(f'Paragraph number {i}' for i in range(8)) + '\n\n3.14 + 42\n'
+    code, output, err = run_cli(text, '-j', '3')
+
+    assert code == cli.EXIT_OK
+    expected = '\n\n'.join(f'[译] Paragraph number {i}' for i in range(8)) + '\n\n3.14 + 42\n'
+    assert output == expected
+    assert stub.config.snapshot()['requests'] == 8
+    assert '无需处理 1 段' in err
+
+
+def test_failed_segments_keep_source_and_exit_1(run_cli, stub):
+    stub.config.failure_rate = 1.0
+    code, output, err = run_cli('First paragraph\n\nSecond paragraph')
+    assert code == cli.EXIT_FAILED
+    assert output == 'First paragraph\n\nSecond paragraph'
+    assert '失败 2 段' in err
+
+
+def test_second_run_reports_cache_hits(run_cli, stub):
+    text = 'One paragraph\n\nAnother paragraph'
+    assert run_cli(text)[0] == cli.EXIT_OK
+    requests = stub.config.snapshot()['requests']
+
+    code, output, err = run_cli(text)
+    assert code == cli.EXIT_OK
+    assert output == '[译] One paragraph\n\n[译] Another paragraph'
+    assert stub.config.snapshot()['requests'] == requests
+    assert '缓存命中 2 段' in err
+
+
+def test_unreadable_input_is_usage_error(run_cli, tmp_path):
+    assert cli.main(['translate', str(tmp_path / 'missing.txt')]) == cli.EXIT_USAGE
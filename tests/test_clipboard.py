@@ -0,0 +1,186 @@
+"""
+获取选中文本（轮询剪贴板变化）的测试，使用内存中的模拟剪贴板，无需图形环境；
+以及 SelectionCapture 在后台线程中获取、合并重复请求、完成后交回界面线程激活弹出窗口
+"""
+
+import threading
+import time
+
+from PySide6.QtCore import Qt, QTimer
+
+from src.clipboard import ClipboardManager, MIN_CAPTURE_TIMEOUT_MS, SelectionCapture
+from tests.fake_clipboard import FakeClipboardBackend
+from tests.helpers import collect, wait_until
+
+
+def make_manager(**kwargs):
+    backend = FakeClipboardBackend(**kwargs)
+    return ClipboardManager(backend, backend.keyboard), backend
+
+
+def test_sequence_change_returns_as_soon_as_copied():
+    manager, backend = make_manager(text='original', selection='selected', latency=0.02)
+    start = time.monotonic()
+    assert manager.get_selected_text() == 'selected'
+    assert time.monotonic() - start < 0.2
+    assert manager.stats['timeouts'] == 0
+
+
+def test_fallback_without_sequence_number():
+    manager, backend = make_manager(text='original', selection='selected', latency=0.02, sequence=False)
+    assert backend.sequence() is None
+    assert manager.get_selected_text() == 'selected'
+
+
+def test_same_text_as_clipboard_is_detected_by_sequence():
+    """选中文本与剪贴板原内容相同时，序号仍会变化"""
+    manager, _ = make_manager(text='same', selection='same')
+    assert manager.get_selected_text() == 'same'
+
+
+def test_wait_times_out_with_none():
+    manager, backend = make_manager(text='original')
+    before = backend.sequence()
+    start = time.monotonic()
+    assert manager._wait_for_update(before, start + 0.05) is None
+    assert 0.05 <= time.monotonic() - start < 0.2
+
+
+def test_no_selection_returns_empty_string():
+    manager, _ = make_manager(text='original')
+    manager.configure({'capture_timeout_ms': MIN_CAPTURE_TIMEOUT_MS})
+    assert manager.get_selected_text() == ''
+    assert manager.stats['timeouts'] == 1
+
+
+def test_original_clipboard_is_restored():
+    for sequence in (True, False):
+        manager, backend = make_manager(text='original', selection='selected', sequence=sequence)
+        assert manager.get_selected_text() == 'selected'
+        assert backend.text == 'original'
+
+
+def test_untouched_clipboard_is_not_rewritten():
+    """支持变化序号且没有选中文本时，剪贴板没有被改动，不需要恢复"""
+    manager, backend = make_manager(text='original')
+    manager.configure({'capture_timeout_ms': MIN_CAPTURE_TIMEOUT_MS})
+    manager.get_selected_text()
+    assert backend.writes == 0
+    assert backend.text == 'original'
+
+
+def test_adaptive_deadline():
+    manager, _ = make_manager()
+    manager.configure({'capture_timeout_ms': 500})
+    # 样本不足时使用最长时间
+    assert manager.capture_timeout() == 0.5
+    for _ in range(10):
+        manager.latency.record('selection', 0.03)
+    timeout = manager.capture_timeout()
+    assert MIN_CAPTURE_TIMEOUT_MS / 1000 <= timeout < 0.5
+    assert abs(timeout - 0.09) < 1e-6
+
+    # 在缩短的等待时间内超时后，下一次按最长时间等待
+    manager.get_selected_text()
+    assert manager.stats['timeouts'] == 1
+    assert manager.capture_timeout() == 0.5
+
+    manager.configure({'capture_timeout_ms': 500, 'capture_adaptive': False})
+    assert manager.capture_timeout() == 0.5
+
+
+def test_slow_copy_is_caught_after_probe():
+    """目标程序变慢：自适应等待时间内超时，下一次按最长时间等待并记录新的延迟"""
+    manager, backend = make_manager(text='original', selection='slow', latency=0.15)
+    manager.configure({'capture_timeout_ms': 500})
+    for _ in range(10):
+        manager.latency.record('selection', 0.01)
+    assert manager.get_selected_text() == ''
+    time.sleep(0.2)
+    backend.text = 'original'
+    assert manager.get_selected_text() == 'slow'
+
+
+def make_capture(**kwargs):
+    manager, backend = make_manager(**kwargs)
+    capture = SelectionCapture(manager)
+    return capture, collect(capture.captured), backend
+
+
+def test_capture_completes_in_background(qapp):
+    capture, captured, backend = make_capture(text='original', selection='selected', latency=0.1)
+    # 等待剪贴板期间界面线程继续处理事件
+    ticks = []
+    timer = QTimer()
+    timer.timeout.connect(lambda: ticks.append(1))
+    timer.start(10)
+
+    start = time.monotonic()
+    assert capture.request('translate')
+    assert time.monotonic() - start < 0.05
+    assert capture.busy
+    assert wait_until(lambda: captured)
+    timer.stop()
+
+    assert captured == [('selected', 'translate')]
+    assert not capture.busy
+    assert len(ticks) >= 3
+    assert [thread for event, thread in backend.events] == ['zdtrans-capture']
+    assert backend.text == 'original'
+
+
+def test_capture_times_out_in_background(qapp):
+    capture, captured, backend = make_capture(text='original')
+    capture.clipboard_manager.configure({'capture_timeout_ms': MIN_CAPTURE_TIMEOUT_MS})
+    assert capture.request('polish')
+    assert capture.busy
+    assert wait_until(lambda: captured)
+    assert captured == [('', 'polish')]
+    assert capture.clipboard_manager.stats['timeouts'] == 1
+    assert not capture.busy
+
+    # 超时后可以开始新的获取
+    backend.selection = 'selected later'
+    assert capture.request('translate')
+    assert wait_until(lambda: len(captured) == 2)
+    assert captured[1] == ('selected later', 'translate')
+
+
+def test_repeated_requests_coalesce(qapp):
+    capture, captured, backend = make_capture(text='original', selection='selected', latency=0.1)
+    assert capture.request('translate')
+    assert not capture.request('translate')
+    assert not capture.request('polish')
+    assert wait_until(lambda: captured)
+    wait_until(lambda: False, timeout=0.2)
+
+    # 只模拟了一次复制，结果按最后一次请求的操作类型发出
+    assert captured == [('selected', 'polish')]
+    assert backend.copies() == 1
+    assert capture.stats == {'requests': 3, 'coalesced': 2}
+
+
+def test_popup_is_activated_only_after_capture(qapp):
+    """获取期间弹出窗口不抢焦点（复制快捷键发到选中文本所在的程序），完成后在界面线程激活"""
+    from src.popup import PopupWindow
+
+    capture, captured, backend = make_capture(text='original', selection='selected', latency=0.05)
+    popup = PopupWindow()
+    activate = popup.activateWindow
+    popup.activateWindow = lambda: (backend.record('activate'), activate())
+
+    def on_captured(text, action_type):
+        backend.record('captured')
+        popup.activateWindow()
+
+    capture.captured.connect(on_captured)
+    popup.show_loading('translate', activate=False)
+    assert popup.isVisible()
+    assert popup.testAttribute(Qt.WA_ShowWithoutActivating)
+    capture.request('translate')
+    assert wait_until(lambda: captured)
+
+    gui = threading.current_thread().name
+    assert backend.events == [('copy', 'zdtrans-capture'), ('captured', gui), ('activate', gui)]
+    popup.hide()
+    popup.deleteLater()
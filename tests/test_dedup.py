@@ -0,0 +1,80 @@
+"""
+处理中请求表的测试：相同请求合并到一次API调用、结果按请求 ID 返回并按各自的原文缓存，
+queue_all 策略下只转发最近一次交互式请求的流式增量
+"""
+
+from src.translator import SUPERSEDE_QUEUE_ALL
+from tests.helpers import collect, wait_until
+
+
+def test_identical_requests_share_one_worker(make_manager, stub):
+    stub.config.latency = 0.2
+    manager = make_manager()
+    ready = collect(manager.request_ready)
+    shown = collect(manager.translation_ready)
+
+    first = manager.translate('Press the hotkey again')
+    entry = manager._inflight[first]
+    worker = entry.worker
+    others = [manager.translate('Press the hotkey again'),
+              manager.translate('Press the hotkey again', interactive=False)]
+    assert entry.waiters == [first, *others]
+    assert entry.worker is worker
+
+    assert wait_until(lambda: len(ready) == 3)
+    assert sorted(ready) == [(request_id, '[译] Press the hotkey again', 'translate')
+                             for request_id in [first, *others]]
+    # 界面只更新一次
+    assert shown == [('[译] Press the hotkey again', 'translate')]
+    assert stub.config.snapshot()['requests'] == 1
+    assert manager.stats['coalesced'] == 2
+    assert not manager._inflight and not manager._inflight_keys
+
+
+def test_results_are_routed_and_cached_by_request(make_manager, stub):
+    """重叠的两个请求各自收到自己的结果，并按各自的原文缓存"""
+    stub.config.latency = 0.1
+    manager = make_manager()
+    ready = collect(manager.request_ready)
+
+    texts = ['Slow first paragraph', 'Second paragraph']
+    ids = [manager.translate(text, interactive=False) for text in texts]
+    assert wait_until(lambda: len(ready) == 2)
+    assert dict((request_id, result) for request_id, result, _ in ready) == \
+        {request_id: f'[译] {text}' for request_id, text in zip(ids, texts)}
+    for text in texts:
+        key = manager._cache_key(text, 'translate', manager._target_lang(text, 'translate'))
+        assert manager.cache.get(key) == f'[译] {text}'
+
+    # 之后的相同请求直接命中缓存
+    again = manager.translate(texts[0])
+    assert ready[-1] == (again, '[译] Slow first paragraph', 'translate')
+    assert stub.config.snapshot()['requests'] == 2
+
+
+def test_failure_reaches_every_waiter(make_manager, stub):
+    stub.config.failure_rate = 1.0
+    manager = make_manager()
+    failed = collect(manager.request_failed)
+
+    ids = [manager.translate('Will fail'), manager.translate('Will fail', interactive=False)]
+    assert wait_until(lambda: len(failed) == 2)
+    assert sorted(request_id for request_id, _ in failed) == ids
+    assert stub.config.snapshot()['requests'] == 1
+    assert not manager._inflight
+
+
+def test_queue_all_streams_only_latest_request(make_manager, stub):
+    stub.config.token_rate = 40
+    manager = make_manager({'stream': True}, {'supersede_policy': SUPERSEDE_QUEUE_ALL})
+    partials = collect(manager.translation_partial)
+    ready = collect(manager.request_ready)
+
+    older = manager.translate('Older selection that keeps streaming')
+    assert wait_until(lambda: partials)
+    newer = manager.translate('Newer selection')
+    partials.clear()
+
+    assert wait_until(lambda: len(ready) == 2, timeout=10)
+    assert {request_id for request_id, _, _ in ready} == {older, newer}
+    assert ''.join(delta for delta, _ in partials) == '[译] Newer selection'
@@ -0,0 +1,110 @@
+"""
+DeepL 批量翻译的测试，使用 benchmarks 中的模拟服务，不需要真实的 API Key
+"""
+
+import json
+import urllib.error
+import urllib.request
+
+import pytest
+from PySide6.QtCore import QEventLoop, QTimer
+
+from benchmarks.stub_provider import StubConfig, StubProvider
+from src.providers import build_deepl_request
+from src.rate_limit import estimate_prompt_tokens, estimate_request_tokens
+from src.tokens import estimate_tokens
+
+
+@pytest.fixture
+def stub():
+    provider = StubProvider(config=StubConfig(latency=0.01, jitter=0)).start()
+    yield provider
+    provider.stop()
+
+
+@pytest.fixture
+def manager(qapp, stub, home):
+    from src.translator import TranslatorManager
+
+    api_config = {
+        'provider': 'deepl',
+        'api_key': 'test-key',
+        'base_url': stub.deepl_url,
+        'target_lang': 'zh-CN',
+        'max_retries': 0,
+        'hedge_enabled': False,
+        'rate_limits': {},
+    }
+    general_config = {'cache_enabled': True, 'disk_cache_enabled': False, 'memory_enabled': False}
+    manager = TranslatorManager(api_config, general_config)
+    yield manager
+    manager.shutdown()
+    manager.deleteLater()
+    qapp.processEvents()
+
+
+def wait_for_batch(manager, batch_id, timeout_ms=5000):
+    """运行事件循环直到批量请求完成，返回结果列表"""
+    loop = QEventLoop()
+    results = {}
+
+    def on_ready(ready_id, values):
+        if ready_id == batch_id:
+            results['values'] = values
+            loop.quit()
+
+    manager.batch_ready.connect(on_ready)
+    QTimer.singleShot(timeout_ms, loop.quit)
+    if 'values' not in results:
+        loop.exec()
+    return results.get('values')
+
+
+def post_deepl(stub, body, headers):
+    request = urllib.request.Request(f"{stub.deepl_url}/v2/translate", data=body, headers=headers)
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_batch_is_one_deepl_call_in_order(stub, manager):
+    segments = ['first paragraph', 'second paragraph', 'third paragraph']
+    batch_id = manager.translate_batch(segments)
+    results = wait_for_batch(manager, batch_id)
+
+    assert results == [f"[译:ZH-HANS] {segment}" for segment in segments]
+    stats = stub.config.snapshot()
+    assert stats['deepl_requests'] == 1
+    assert stats['deepl_texts'] == len(segments)
+    assert manager.stats['batch_fallbacks'] == 0
+
+
+def test_stub_accepts_form_encoded_text_entries(stub):
+    body = b'text=one&text=two&target_lang=de'
+    status, payload = post_deepl(stub, body, {'Authorization': 'DeepL-Auth-Key test-key',
+                                              'Content-Type': 'application/x-www-form-urlencoded'})
+    assert status == 200
+    assert [item['text'] for item in payload['translations']] == ['[译:DE] one', '[译:DE] two']
+
+
+def test_stub_rejects_missing_key_and_unknown_target(stub):
+    body = json.dumps({'text': ['one'], 'target_lang': 'ZH-HANS'}).encode('utf-8')
+    status, _ = post_deepl(stub, body, {'Content-Type': 'application/json'})
+    assert status == 403
+
+    body = json.dumps({'text': ['one'], 'target_lang': 'zh-CN'}).encode('utf-8')
+    status, _ = post_deepl(stub, body, {'Authorization': 'DeepL-Auth-Key test-key',
+                                        'Content-Type': 'application/json'})
+    assert status == 400
+
+
+def test_deepl_request_tokens_come_from_text():
+    """DeepL 请求没有 messages，限流按各段原文估算"""
+    texts = ['first paragraph', '第二段']
+    _, _, data, _ = build_deepl_request({'provider': 'deepl', 'api_key': 'test-key'}, texts, 'translate',
+                                        ['keyword'], 'zh-CN')
+    prompt_tokens = estimate_prompt_tokens(data)
+    assert prompt_tokens == sum(estimate_tokens(text) for text in texts)
+    assert estimate_request_tokens(data) > prompt_tokens
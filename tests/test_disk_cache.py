@@ -0,0 +1,154 @@
+"""
+磁盘缓存的测试：读写往返、过期、容量淘汰，以及数据库损坏或被锁定时的恢复
+"""
+
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from src import disk_cache
+from src.disk_cache import DiskCache
+
+
+def get(cache, key):
+    """同步读取（等待后台线程的回调）"""
+    done = threading.Event()
+    result = []
+    cache.get(key, lambda value: (result.append(value), done.set()))
+    assert done.wait(5)
+    return result[0]
+
+
+def get_many(cache, keys):
+    done = threading.Event()
+    result = []
+    cache.get_many(keys, lambda found: (result.append(found), done.set()))
+    assert done.wait(5)
+    return result[0]
+
+
+@pytest.fixture
+def make_cache(tmp_path):
+    caches = []
+
+    def make(path=None, **kwargs):
+        cache = DiskCache(path or tmp_path / 'cache.db', **kwargs)
+        caches.append(cache)
+        return cache
+
+    yield make
+    for cache in caches:
+        cache.close()
+
+
+def test_round_trip_and_persistence(make_cache, tmp_path):
+    cache = make_cache()
+    cache.put('key', '译文')
+    cache.put('other', '另一个译文', 'polish')
+    assert get(cache, 'key') == '译文'
+    assert get(cache, 'missing') is None
+    assert get_many(cache, ['key', 'other', 'missing']) == {'key': '译文', 'other': '另一个译文'}
+
+    cache.put('key', '新的译文')
+    assert get(cache, 'key') == '新的译文'
+    stats = cache.stats()
+    assert (stats['entries'], stats['hits'], stats['misses']) == (2, 4, 2)
+    assert stats['bytes'] == len('key') + len('新的译文'.encode('utf-8')) + len('other') + len('另一个译文'.encode('utf-8'))
+    cache.close()
+
+    reopened = make_cache()
+    assert get(reopened, 'key') == '新的译文'
+    assert reopened.stats()['entries'] == 2
+
+    reopened.clear()
+    assert get(reopened, 'key') is None
+    assert reopened.stats()['entries'] == 0
+
+
+def test_entries_expire(make_cache):
+    cache = make_cache(ttl={'translate': 0.05, 'polish': None})
+    cache.put('short', '很快过期')
+    cache.put('forever', '不过期', 'polish')
+    time.sleep(0.1)
+    assert get(cache, 'short') is None
+    assert get(cache, 'forever') == '不过期'
+    # 过期的条目在查询时删除
+    assert cache.stats()['entries'] == 1
+
+
+def test_evicts_least_recently_used_when_over_cap(make_cache, monkeypatch):
+    monkeypatch.setattr(disk_cache, 'IDLE_EVICT_DELAY', 0.05)
+    cache = make_cache(max_bytes=10 ** 6)
+    value = 'x' * 100
+    for i in range(10):
+        cache.put(f'key{i}', value)
+        time.sleep(0.002)
+    assert get(cache, 'key0') == value  # 最早写入的条目刚被访问过
+
+    entry_size = len('key0') + len(value)
+    cache.configure(max_bytes=entry_size * 5)
+    deadline = time.monotonic() + 5
+    while cache.stats()['bytes'] > entry_size * 5 * disk_cache.EVICT_TARGET_RATIO:
+        assert time.monotonic() < deadline
+        time.sleep(0.02)
+
+    remaining = get_many(cache, [f'key{i}' for i in range(10)])
+    assert set(remaining) == {'key0', 'key7', 'key8', 'key9'}
+    assert cache.stats()['entries'] == 4
+
+
+def test_corrupt_file_is_moved_aside(make_cache, tmp_path):
+    path = tmp_path / 'cache.db'
+    path.write_bytes(b'this is not a sqlite database' * 100)
+    cache = make_cache(path)
+    cache.put('key', '译文')
+    assert get(cache, 'key') == '译文'
+    assert (tmp_path / 'cache.db.corrupt').read_bytes().startswith(b'this is not')
+
+
+def test_locked_file_is_not_treated_as_corrupt(make_cache, tmp_path, monkeypatch):
+    monkeypatch.setattr(disk_cache, 'BUSY_TIMEOUT', 0.1)
+    path = tmp_path / 'cache.db'
+    other = sqlite3.connect(str(path), isolation_level=None)
+    other.execute("CREATE TABLE unrelated (x)")
+    other.execute("BEGIN EXCLUSIVE")
+    try:
+        cache = make_cache(path)
+        cache.put('key', '译文')
+        # 无法打开时所有查询直接未命中
+        assert get(cache, 'key') is None
+        assert get_many(cache, ['key']) == {}
+    finally:
+        other.execute("ROLLBACK")
+        other.close()
+    cache.close()
+    assert not (tmp_path / 'cache.db.corrupt').exists()
+
+    # 锁释放后下次启动正常使用
+    reopened = make_cache(path)
+    reopened.put('key', '译文')
+    assert get(reopened, 'key') == '译文'
+
+
+def test_write_while_locked_is_skipped(make_cache, tmp_path, monkeypatch):
+    monkeypatch.setattr(disk_cache, 'BUSY_TIMEOUT', 0.1)
+    path = tmp_path / 'cache.db'
+    cache = make_cache(path)
+    cache.put('before', '锁定前')
+    assert get(cache, 'before') == '锁定前'
+
+    other = sqlite3.connect(str(path), isolation_level=None)
+    other.execute("BEGIN EXCLUSIVE")
+    try:
+        cache.put('during', '锁定中')
+        assert get(cache, 'before') == '锁定前'
+    finally:
+        other.execute("ROLLBACK")
+        other.close()
+
+    assert get(cache, 'during') is None
+    cache.put('after', '锁定后')
+    assert get(cache, 'after') == '锁定后'
+    assert cache.stats()['entries'] == 2
@@ -0,0 +1,71 @@
+"""
+术语表（Aho-Corasick 匹配）的测试
+"""
+
+import random
+
+from src.glossary import Glossary, parse_entries
+
+
+def found(glossary, text):
+    return [text[start:end] for start, end, _ in glossary.find(text)]
+
+
+def test_nested_terms_keep_longest():
+    glossary = Glossary([('network', ''), ('neural network', ''), ('neural', '')])
+    assert found(glossary, 'a neural network and a network') == ['neural network', 'network']
+
+
+def test_term_found_through_failure_link():
+    """沿较长术语的前缀走到一半失配时，失配指针上的较短术语也要报告"""
+    glossary = Glossary([('甲乙丙丁', ''), ('乙丙', '')])
+    assert found(glossary, '甲乙丙戊') == ['乙丙']
+    glossary = Glossary([(term, '') for term in ('他', '她们', '们的', '她')])
+    assert found(glossary, '她们的书') == ['她们']
+
+
+def test_partial_overlap_keeps_leftmost():
+    glossary = Glossary([('machine learning', ''), ('learning rate', '')])
+    assert found(glossary, 'machine learning rate') == ['machine learning']
+    assert found(glossary, 'the learning rate of machine learning') == ['learning rate', 'machine learning']
+
+
+def test_latin_terms_match_whole_words_ignoring_case():
+    glossary = Glossary([('BERT', '')])
+    assert found(glossary, 'RoBERTa and bert-base') == ['bert']
+    assert found(glossary, 'BERTology') == []
+
+
+def test_cjk_terms_match_inside_words():
+    glossary = Glossary([('神经网络', ''), ('网络', '')])
+    assert found(glossary, '深度神经网络模型和网络') == ['神经网络', '网络']
+
+
+def test_terms_are_unique_in_first_occurrence_order():
+    glossary = Glossary(parse_entries('Transformer=变换器, attention; BERT → BERT模型\nattention'))
+    assert len(glossary) == 3
+    assert glossary.terms(['BERT uses attention.', 'A Transformer with attention and BERT']) == [
+        'BERT → BERT模型', 'attention', 'Transformer → 变换器']
+
+
+def leftmost_longest(terms, text):
+    """逐位置尝试所有术语的朴素实现"""
+    result = []
+    pos = 0
+    while pos < len(text):
+        longest = max((term for term in terms if text.startswith(term, pos)), key=len, default=None)
+        if longest is None:
+            pos += 1
+        else:
+            result.append(longest)
+            pos += len(longest)
+    return result
+
+
+def test_matches_naive_scan_on_random_overlapping_terms():
+    rng = random.Random(0)
+    for _ in range(200):
+        terms = {''.join(rng.choice('甲乙丙') for _ in range(rng.randint(1, 4))) for _ in range(6)}
+        text = ''.join(rng.choice('甲乙丙') for _ in range(30))
+        glossary = Glossary([(term, '') for term in terms])
+        assert found(glossary, text) == leftmost_longest(terms, text)
@@ -0,0 +1,134 @@
+"""
+对冲请求的测试：主提供商慢时备用提供商胜出、主提供商失败时转移、对冲阈值的延迟样本和按胜出方缓存
+"""
+
+import time
+
+import pytest
+
+from benchmarks.stub_provider import StubConfig, StubProvider
+from src.latency import provider_key
+from src.translator import HEDGE_MAX_DELAY, HEDGE_MIN_DELAY, HEDGE_MIN_SAMPLES
+from tests.helpers import collect, wait_until
+
+
+@pytest.fixture
+def secondary():
+    provider = StubProvider(config=StubConfig(latency=0.01, jitter=0, seed=1)).start()
+    yield provider
+    provider.stop()
+
+
+@pytest.fixture
+def make_hedged(make_manager, secondary):
+    def make(api=None, general=None):
+        api_config = {'hedge_enabled': True, 'hedge_delay': 0.3,
+                      'secondary': {'provider': 'volcengine', 'api_key': 'secondary-key',
+                                    'base_url': secondary.base_url, 'model': 'secondary-model'}}
+        api_config.update(api or {})
+        return make_manager(api_config, general)
+
+    return make
+
+
+def cached(manager, text, api_config=None):
+    key = manager._cache_key(text, 'translate', manager._target_lang(text, 'translate'), api_config)
+    return manager.cache.get(key)
+
+
+def test_secondary_wins_when_primary_is_slow(make_hedged, stub, secondary):
+    stub.config.latency = 1.5
+    manager = make_hedged()
+    ready = collect(manager.request_ready)
+
+    start = time.monotonic()
+    request_id = manager.translate('Slow primary provider')
+    assert wait_until(lambda: ready)
+    elapsed = time.monotonic() - start
+
+    assert ready == [(request_id, '[译] Slow primary provider', 'translate')]
+    assert 0.3 <= elapsed < 1.0
+    stats = manager.request_stats()
+    assert (stats['hedge_eligible'], stats['hedged'], stats['secondary_wins'], stats['primary_wins']) == (1, 1, 1, 0)
+    assert (stub.config.snapshot()['requests'], secondary.config.snapshot()['requests']) == (1, 1)
+    assert not manager._hedge_attempts
+
+    # 结果按备用提供商的模型缓存，不会当作主提供商的结果
+    assert cached(manager, 'Slow primary provider') is None
+    assert cached(manager, 'Slow primary provider', manager._secondary_config()) == '[译] Slow primary provider'
+    # 主提供商的延迟至少为已等待的时间
+    samples = manager.hedge_latency._samples[provider_key(manager.api_config)]
+    assert list(samples) and samples[0] >= 0.3
+
+
+def test_primary_wins_without_hedging(make_hedged, stub, secondary):
+    manager = make_hedged()
+    ready = collect(manager.request_ready)
+
+    manager.translate('Fast primary provider')
+    assert wait_until(lambda: ready)
+    wait_until(lambda: False, timeout=0.4)  # 对冲定时器到期时请求已完成
+
+    stats = manager.request_stats()
+    assert (stats['hedge_eligible'], stats['hedged']) == (1, 0)
+    assert secondary.config.snapshot()['requests'] == 0
+    assert cached(manager, 'Fast primary provider') == '[译] Fast primary provider'
+    assert manager.hedge_latency.count(provider_key(manager.api_config)) == 1
+
+
+def test_primary_failure_fails_over(make_hedged, stub, secondary):
+    stub.config.failure_rate = 1.0
+    manager = make_hedged()
+    ready = collect(manager.request_ready)
+
+    request_id = manager.translate('Primary is down')
+    assert wait_until(lambda: ready)
+    assert ready == [(request_id, '[译] Primary is down', 'translate')]
+    assert manager.stats['failovers'] == 1
+
+
+def test_both_attempts_failing_reports_error(make_hedged, stub, secondary):
+    stub.config.failure_rate = 1.0
+    secondary.config.failure_rate = 1.0
+    manager = make_hedged()
+    failed = collect(manager.request_failed)
+
+    request_id = manager.translate('Everything is down')
+    assert wait_until(lambda: failed)
+    assert failed[0][0] == request_id
+    assert not manager._inflight and not manager._hedge_attempts
+
+
+def test_hedge_delay_samples_only_single_interactive_requests(make_hedged, stub):
+    manager = make_hedged({'chunk_max_chars': 40})
+    ready = collect(manager.request_ready)
+    batches = collect(manager.batch_ready)
+    key = provider_key(manager.api_config)
+
+    manager.translate('Background request', interactive=False)
+    manager.translate('First sentence of a long text. Second sentence of a long text. Third sentence here.')
+    manager.translate_batch(['one segment', 'another segment'])
+    assert wait_until(lambda: len(ready) == 2 and batches)
+    assert manager.stats['chunked'] == 1
+    assert manager.hedge_latency.count(key) == 0
+    # 自适应超时仍然使用所有请求的延迟
+    assert manager.latency.count(key) >= 3
+
+    manager.translate('Interactive single request')
+    assert wait_until(lambda: len(ready) == 3)
+    assert manager.hedge_latency.count(key) == 1
+
+
+def test_hedge_delay_follows_p95(make_hedged):
+    manager = make_hedged()
+    key = provider_key(manager.api_config)
+    assert manager._hedge_delay() == 0.3
+    for _ in range(HEDGE_MIN_SAMPLES):
+        manager.hedge_latency.record(key, 0.01)
+    assert manager._hedge_delay() == HEDGE_MIN_DELAY
+    for _ in range(100):
+        manager.hedge_latency.record(key, 60)
+    assert manager._hedge_delay() == HEDGE_MAX_DELAY
+    for _ in range(100):
+        manager.hedge_latency.record(key, 0.8)
+    assert manager._hedge_delay() == 0.8
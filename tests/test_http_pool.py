@@ -0,0 +1,127 @@
+"""
+连接池的测试：按提供商复用会话和连接、空闲过期和配置变化时重建、关闭时释放
+"""
+
+import time
+
+import pytest
+
+from src.http_pool import SessionPool
+from tests.helpers import collect, wait_until
+
+
+@pytest.fixture
+def closed(monkeypatch):
+    """记录被关闭的会话"""
+    sessions = []
+    create = SessionPool._create_session
+
+    def create_tracked(self):
+        session = create(self)
+        close = session.close
+
+        def tracked_close():
+            sessions.append(session)
+            close()
+
+        session.close = tracked_close
+        return session
+
+    monkeypatch.setattr(SessionPool, '_create_session', create_tracked)
+    return sessions
+
+
+def test_one_session_per_base_url(closed):
+    pool = SessionPool()
+    session = pool.get('https://api.example.com/v1')
+    assert pool.get('https://api.example.com/v1/') is session
+    other = pool.get('https://other.example.com/v1')
+    assert other is not session
+    assert session.get_adapter('https://api.example.com/v1')._pool_maxsize == pool.pool_size
+
+    pool.reset('https://other.example.com/v1')
+    assert closed == [other]
+    assert pool.get('https://api.example.com/v1') is session
+    pool.close()
+    assert closed == [other, session]
+    assert pool.get('https://api.example.com/v1') is not session
+
+
+def test_idle_session_is_rebuilt(closed):
+    pool = SessionPool(idle_timeout=0.05)
+    session = pool.get('https://api.example.com')
+    assert pool.get('https://api.example.com') is session
+    time.sleep(0.1)
+    assert pool.get('https://api.example.com') is not session
+    assert closed == [session]
+
+
+def test_configure_rebuilds_only_when_pool_size_changes(closed):
+    pool = SessionPool(pool_size=4)
+    session = pool.get('https://api.example.com')
+    pool.configure(pool_size=4, idle_timeout=30)
+    assert pool.get('https://api.example.com') is session
+    assert pool.idle_timeout == 30
+
+    pool.configure(pool_size=8)
+    assert closed == [session]
+    assert pool.get('https://api.example.com').get_adapter('https://api.example.com')._pool_maxsize == 8
+
+
+def host_pools(session, url):
+    """会话中各主机的 urllib3 连接池"""
+    pools = session.get_adapter(url).poolmanager.pools
+    return [pools[key] for key in pools.keys()]
+
+
+def connections(session, url):
+    """会话中新建过的连接数"""
+    return sum(pool.num_connections for pool in host_pools(session, url))
+
+
+def idle(session, url):
+    """已建立过连接且所有连接都已归还到池中"""
+    pools = host_pools(session, url)
+    return bool(pools) and all(pool.pool.qsize() == pool.pool.maxsize for pool in pools)
+
+
+def test_manager_reuses_connections(make_manager, stub):
+    manager = make_manager()
+    session = manager.session_pool.get(stub.base_url)
+    # 等预热请求完成，避免与第一次请求并发各开一个连接
+    assert wait_until(lambda: idle(session, stub.base_url))
+    ready = collect(manager.request_ready)
+    for i in range(3):
+        manager.translate(f'Sequential request {i}', interactive=False)
+        assert wait_until(lambda: len(ready) == i + 1)
+
+    assert list(manager.session_pool._sessions) == [stub.base_url]
+    assert manager.session_pool.get(stub.base_url) is session
+    # 预热和三次请求共用同一个 keep-alive 连接
+    assert connections(session, stub.base_url) == 1
+
+
+def test_manager_rebuilds_on_base_url_change_and_closes_on_shutdown(make_manager, stub, closed):
+    manager = make_manager()
+    ready = collect(manager.request_ready)
+    manager.translate('Before switching', interactive=False)
+    assert wait_until(lambda: ready)
+    old = manager.session_pool.get(stub.base_url)
+
+    # 同一个服务换一个等价地址，旧会话被关闭
+    new_base_url = stub.base_url.replace('127.0.0.1', 'localhost')
+    manager.update_config(dict(manager.api_config, base_url=new_base_url))
+    assert old in closed
+    manager.translate('After switching', interactive=False)
+    assert wait_until(lambda: len(ready) == 2)
+    assert ready[-1][1] == '[译] After switching'
+    assert set(manager.session_pool._sessions) == {new_base_url}
+
+    # 地址不变时保留会话
+    current = manager.session_pool.get(new_base_url)
+    manager.update_config(dict(manager.api_config, max_workers=2))
+    assert current not in closed
+
+    manager.shutdown()
+    assert current in closed
+    assert not manager.session_pool._sessions
@@ -0,0 +1,44 @@
+"""
+语言检测和无需翻译判断的测试
+"""
+
+import pytest
+
+from src.langdetect import detect_language, is_target_language, is_untranslatable, looks_like_code
+
+
+@pytest.mark.parametrize('text', ['iPhone', 'eBay', 'Note: call me;', 'result = good', 'for example:',
+                                  'He said (quietly);', 'Let me know;\nThanks!'])
+def test_prose_is_not_code(text):
+    assert not looks_like_code(text)
+    assert not is_untranslatable(text)
+
+
+@pytest.mark.parametrize('text', ['user.name', 'get_name()', 'print("hi");', 'const x = 5;', 'import os',
+                                  '~/bin/run.sh', 'def f(x):\n    return x', 'x = 1\ny = 2'])
+def test_code_is_detected(text):
+    assert looks_like_code(text)
+
+
+def test_numbers_and_links_are_untranslatable():
+    assert is_untranslatable('3.14 + 42')
+    assert is_untranslatable('https://example.com/a?b=c')
+
+
+def test_latin_text_never_matches_latin_target():
+    """法文、德文原文在目标语言为英文时仍需翻译"""
+    assert detect_language('Bonjour tout le monde') == 'en'
+    assert not is_target_language('Bonjour tout le monde', 'en')
+    assert not is_target_language('Guten Morgen', 'de')
+
+
+def test_script_languages_match_target():
+    assert is_target_language('今天天气很好', 'zh-CN')
+    assert is_target_language('こんにちは、世界', 'ja')
+    assert is_target_language('Привет, мир', 'ru')
+    assert not is_target_language('今天天气很好', 'en')
+
+
+def test_chinese_variant_target_is_not_skipped():
+    """简体译为繁体需要调用 API"""
+    assert not is_target_language('今天天气很好', 'zh-TW')
@@ -0,0 +1,57 @@
+"""
+多段合并请求（build_batch_request / parse_batch_response）的测试
+"""
+
+import json
+
+from src.providers import build_batch_request, parse_batch_response
+
+
+def test_results_follow_ids_not_reply_order():
+    content = json.dumps([{'id': 2, 'text': 'C'}, {'id': 0, 'text': 'A'}, {'id': 1, 'text': 'B'}])
+    assert parse_batch_response(content, 3) == ['A', 'B', 'C']
+
+
+def test_code_fenced_reply():
+    content = '好的，结果如下：\n```json\n[{"id": 0, "text": "甲"}, {"id": 1, "text": "乙"}]\n```\n'
+    assert parse_batch_response(content, 2) == ['甲', '乙']
+
+
+def test_missing_segments_are_none():
+    content = json.dumps([{'id': 0, 'text': 'A'}, {'id': 2, 'text': 'C'}])
+    assert parse_batch_response(content, 3) == ['A', None, 'C']
+
+
+def test_extra_and_invalid_items_are_ignored():
+    content = json.dumps([{'id': 0, 'text': 'A'}, {'id': 5, 'text': 'X'}, {'id': 'one', 'text': 'Y'},
+                          {'id': 1, 'text': '  '}, 'stray'])
+    assert parse_batch_response(content, 2) == ['A', None]
+
+
+def test_plain_string_array_needs_matching_count():
+    assert parse_batch_response('["A", "B"]', 2) == ['A', 'B']
+    # 数量不一致时无法确定对应关系，全部单独重试
+    assert parse_batch_response('["A", "B"]', 3) == [None, None, None]
+    assert parse_batch_response('["A", "B", "C"]', 2) == [None, None]
+
+
+def test_object_keyed_by_id():
+    assert parse_batch_response('{"1": "B", "0": "A"}', 2) == ['A', 'B']
+
+
+def test_unparseable_reply():
+    assert parse_batch_response('抱歉，我无法完成这个请求。', 2) == [None, None]
+    assert parse_batch_response('[{"id": 0, "text": "A"', 1) == [None]
+
+
+def test_batch_request_round_trip():
+    """请求中的段落编号与解析结果一一对应"""
+    segments = ['first line\nsecond line', 'quote "here"', '第三段']
+    _, _, data, _ = build_batch_request({'provider': 'openai', 'api_key': 'k'}, segments, 'translate', [], 'zh-CN')
+    prompt = data['messages'][-1]['content']
+    items = json.loads(prompt[prompt.index('[{'):])
+    assert [item['text'] for item in items] == segments
+
+    reply = json.dumps([{'id': item['id'], 'text': item['text'].upper()} for item in reversed(items)],
+                       ensure_ascii=False)
+    assert parse_batch_response(f"```\n{reply}\n```", len(segments)) == [s.upper() for s in segments]
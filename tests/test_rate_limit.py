@@ -0,0 +1,183 @@
+"""
+限流模块的测试：RPM/TPM 预约、Retry-After、x-ratelimit-* 响应头和按实际用量校正（注入假时钟）
+"""
+
+import pytest
+
+from src.rate_limit import (
+    DEFAULT_429_PAUSE, OUTPUT_TOKEN_RATIO, RateLimiter, TokenBucket, estimate_prompt_tokens,
+    estimate_request_tokens, parse_duration,
+)
+from src.tokens import estimate_tokens
+
+
+API = {'provider': 'volcengine', 'model': 'test-model'}
+KEY = 'volcengine/test-model'
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def test_token_bucket_reservations_queue_in_order():
+    bucket = TokenBucket(60, now=0.0)
+    assert [bucket.reserve(1, 0.0) for _ in range(60)] == [0.0] * 60
+    # 每秒补充 1 个令牌，后来的请求依次多等 1 秒
+    assert [bucket.reserve(1, 0.0) for _ in range(3)] == [1.0, 2.0, 3.0]
+    assert bucket.reserve(1, 10.0) == 0.0
+    # 单次需求超过容量时按容量计
+    big = TokenBucket(100, now=0.0)
+    assert big.reserve(1000, 0.0) == 0.0
+    assert big.level == 0
+
+
+def test_rpm_limit(clock):
+    limiter = RateLimiter({KEY: {'rpm': 120}}, clock)
+    waits = [limiter.reserve(API, 10) for _ in range(122)]
+    assert waits[:120] == [0.0] * 120
+    assert waits[120:] == [0.5, 1.0]
+    clock.advance(1.0)
+    assert limiter.queue_wait(API) == pytest.approx(0.5)
+    # queue_wait 不扣除预算
+    assert limiter.queue_wait(API) == pytest.approx(0.5)
+    # 其他模型不受影响
+    assert limiter.reserve(dict(API, model='other'), 10) == 0.0
+
+
+def test_tpm_limit_by_provider_name(clock):
+    limiter = RateLimiter({'volcengine': {'tpm': 600}}, clock)
+    assert limiter.reserve(API, 500) == 0.0
+    # 还剩 100，再预约 300 缺 200 个令牌，每秒补充 10 个
+    assert limiter.reserve(API, 300) == pytest.approx(20.0)
+    clock.advance(20.0)
+    assert limiter.reserve(API, 0) == 0.0
+
+
+def test_unconfigured_provider_is_unlimited(clock):
+    limiter = RateLimiter(None, clock)
+    assert all(limiter.reserve(API, 100000) == 0.0 for _ in range(1000))
+
+
+def test_retry_after_pauses_provider(clock):
+    limiter = RateLimiter(None, clock)
+    limiter.observe(API, 429, {'Retry-After': '2'})
+    assert limiter.reserve(API, 10) == pytest.approx(2.0)
+    clock.advance(1.5)
+    assert limiter.reserve(API, 10) == pytest.approx(0.5)
+    # 较短的 Retry-After 不会缩短已有的暂停
+    limiter.observe(API, 429, {'Retry-After': '0.1'})
+    assert limiter.queue_wait(API) == pytest.approx(0.5)
+    clock.advance(0.5)
+    assert limiter.reserve(API, 10) == 0.0
+
+    limiter.observe(API, 429, {})
+    assert limiter.queue_wait(API) == pytest.approx(DEFAULT_429_PAUSE)
+    assert limiter.stats()[KEY]['paused_ms'] == pytest.approx(DEFAULT_429_PAUSE * 1000)
+
+
+def test_rate_limit_headers_create_and_correct_buckets(clock):
+    limiter = RateLimiter(None, clock)
+    limiter.observe(API, 200, {'x-ratelimit-limit-requests': '120', 'x-ratelimit-remaining-requests': '0'})
+    assert limiter.reserve(API, 100) == pytest.approx(0.5)
+    assert limiter.stats()[KEY]['rpm'] == 120
+
+    # 无法解析的值被忽略
+    limiter.observe(API, 200, {'x-ratelimit-limit-requests': 'n/a'})
+    assert limiter.stats()[KEY]['rpm'] == 120
+
+    tokens = RateLimiter(None, clock)
+    # 剩余额度只向下校正
+    tokens.observe(API, 200, {'x-ratelimit-limit-tokens': '6000', 'x-ratelimit-remaining-tokens': '600'})
+    tokens.observe(API, 200, {'x-ratelimit-remaining-tokens': '99999'})
+    assert tokens.reserve(API, 600) == 0.0
+    assert tokens.reserve(API, 100) == pytest.approx(1.0)
+
+    # 上限变小时水位随之降低
+    clock.advance(60)
+    tokens.observe(API, 200, {'x-ratelimit-limit-tokens': '3000'})
+    assert tokens.stats()[KEY]['tpm'] == 3000
+    assert tokens.reserve(API, 3000) == 0.0
+    assert tokens.reserve(API, 50) == pytest.approx(1.0)
+
+
+def test_configured_limits_override_learned_ones(clock):
+    limiter = RateLimiter(None, clock)
+    limiter.observe(API, 200, {'x-ratelimit-limit-requests': '1'})
+    limiter.configure({KEY: {'rpm': 600}})
+    assert limiter.reserve(API, 1) == 0.0
+    assert limiter.stats()[KEY]['rpm'] == 600
+
+
+def test_record_usage_refunds_over_reservation(clock):
+    limiter = RateLimiter({KEY: {'tpm': 1000}}, clock)
+    assert limiter.reserve(API, 800) == 0.0
+    # 实际只用了 100：退还 700
+    limiter.record_usage(API, 800, 50, {'prompt_tokens': 60, 'completion_tokens': 40})
+    assert limiter.reserve(API, 900) == 0.0
+    # 实际用量超过预约时补扣
+    limiter.record_usage(API, 900, 50, {'prompt_tokens': 60, 'total_tokens': 1000})
+    assert limiter.reserve(API, 30) == pytest.approx((100 + 30) / (1000 / 60))
+
+    stats = limiter.stats()[KEY]
+    assert (stats['estimated_prompt_tokens'], stats['actual_prompt_tokens']) == (100, 120)
+    assert stats['actual_tokens'] == 1100
+    assert stats['estimate_ratio'] == pytest.approx(100 / 120)
+
+
+def test_wait_statistics(clock):
+    limiter = RateLimiter({KEY: {'rpm': 60}}, clock)
+    for _ in range(61):
+        limiter.reserve(API, 1)
+    stats = limiter.stats()[KEY]
+    assert stats['last_wait_ms'] == pytest.approx(1000)
+    assert stats['avg_wait_ms'] == pytest.approx(1000 / 61)
+    assert stats['queued'] == 0
+
+
+def test_parse_duration():
+    assert parse_duration('1s') == 1
+    assert parse_duration('6m0s') == 360
+    assert parse_duration('20ms') == pytest.approx(0.02)
+    assert parse_duration('1h2m') == 3720
+    assert parse_duration('2.5') == 2.5
+    assert parse_duration('soon') is None
+    assert parse_duration(None) is None
+
+
+def test_request_token_estimates():
+    chat = {'messages': [{'role': 'user', 'content': 'Hello world'}]}
+    prompt = estimate_prompt_tokens(chat)
+    assert prompt > 0
+    assert estimate_request_tokens(chat) == prompt + int(prompt * OUTPUT_TOKEN_RATIO)
+    assert estimate_request_tokens(dict(chat, max_tokens=256)) == prompt + 256
+    assert estimate_request_tokens(chat, prompt_tokens=10) == 10 + int(10 * OUTPUT_TOKEN_RATIO)
+
+    deepl = {'text': ['Hello world', '你好世界'], 'context': 'ignored context text'}
+    assert estimate_prompt_tokens(deepl) == estimate_tokens('Hello world') + estimate_tokens('你好世界')
+    assert estimate_prompt_tokens({'text': 'Hello world'}) == estimate_tokens('Hello world')
+
+
+def test_release_refunds_unsent_request(clock):
+    limiter = RateLimiter({KEY: {'rpm': 60, 'tpm': 600}}, clock)
+    assert limiter.reserve(API, 600) == 0.0
+    assert limiter.reserve(API, 300) == pytest.approx(30.0)
+    # 排队中的请求被取消：退还 1 个请求和 300 token
+    limiter.release(API, 300)
+    assert limiter.queue_wait(API) == pytest.approx(0.1)
+    # 退还不会超过容量
+    clock.advance(60)
+    limiter.release(API, 600)
+    assert limiter.reserve(API, 600) == 0.0
+    assert limiter.reserve(API, 1) == pytest.approx(0.1)
@@ -0,0 +1,191 @@
+"""
+容错模块的测试：熔断器状态机、抖动退避的范围和自适应读超时（注入假时钟和固定种子的随机源）
+"""
+
+import random
+
+import pytest
+import requests
+
+from src import resilience
+from src.resilience import (
+    BACKOFF_BASE, BACKOFF_MAX, DEFAULT_CONNECT_TIMEOUT, FAILURE_THRESHOLD, MIN_READ_TIMEOUT, OPEN_COOLDOWN,
+    OPEN_COOLDOWN_MAX, STATE_CLOSED, STATE_HALF_OPEN, STATE_OPEN, TIMEOUT_FACTOR, TIMEOUT_MIN_SAMPLES,
+    CircuitBreaker, CircuitOpenError, ProviderError, ProviderHealth, backoff_delay, is_retryable, parse_retry_after,
+)
+
+
+API = {'provider': 'volcengine', 'model': 'test-model', 'timeout': 30}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def open_breaker(breaker):
+    for i in range(FAILURE_THRESHOLD):
+        breaker.check()
+        opened = breaker.record_failure(API)
+        assert opened == (i == FAILURE_THRESHOLD - 1)
+    assert breaker.state == STATE_OPEN
+
+
+def test_breaker_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker('volcengine/test-model', clock)
+    for _ in range(FAILURE_THRESHOLD - 1):
+        breaker.record_failure(API)
+    # 一次成功清零连续失败计数
+    breaker.record_success()
+    assert (breaker.state, breaker.failures) == (STATE_CLOSED, 0)
+
+    open_breaker(breaker)
+    assert breaker.api_config is API
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+    # 熔断期间的失败不会重新计时
+    clock.advance(OPEN_COOLDOWN - 1)
+    assert breaker.record_failure(API) is False
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+
+def test_half_open_probe_success_closes(clock):
+    breaker = CircuitBreaker('volcengine/test-model', clock)
+    open_breaker(breaker)
+    clock.advance(OPEN_COOLDOWN)
+
+    breaker.check()  # 冷却结束，放行一个试探请求
+    assert breaker.state == STATE_HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.check()  # 试探请求未结束时其余请求快速失败
+
+    breaker.record_success()
+    assert (breaker.state, breaker.failures, breaker.cooldown) == (STATE_CLOSED, 0, OPEN_COOLDOWN)
+    breaker.check()
+    breaker.check()
+
+
+def test_half_open_probe_failure_reopens_with_doubled_cooldown(clock):
+    breaker = CircuitBreaker('volcengine/test-model', clock)
+    open_breaker(breaker)
+
+    cooldown = OPEN_COOLDOWN
+    while cooldown < OPEN_COOLDOWN_MAX:
+        clock.advance(cooldown)
+        breaker.check()
+        assert breaker.record_failure(API) is True
+        cooldown = min(cooldown * 2, OPEN_COOLDOWN_MAX)
+        assert (breaker.state, breaker.cooldown) == (STATE_OPEN, cooldown)
+        clock.advance(cooldown - 0.1)
+        with pytest.raises(CircuitOpenError):
+            breaker.check()
+        clock.advance(0.1)
+    # 上限封顶
+    breaker.check()
+    breaker.record_failure(API)
+    assert breaker.cooldown == OPEN_COOLDOWN_MAX
+
+
+def test_released_trial_lets_next_request_probe(clock):
+    breaker = CircuitBreaker('volcengine/test-model', clock)
+    open_breaker(breaker)
+    clock.advance(OPEN_COOLDOWN)
+    breaker.check()
+    breaker.release_trial()  # 试探请求被取消
+    breaker.check()
+    assert breaker.state == STATE_HALF_OPEN
+
+
+def test_background_probe_moves_to_half_open_early(clock):
+    breaker = CircuitBreaker('volcengine/test-model', clock)
+    open_breaker(breaker)
+    breaker.reopen_ready()
+    breaker.check()
+    assert breaker.state == STATE_HALF_OPEN
+    # 只对熔断状态生效
+    breaker.record_success()
+    breaker.reopen_ready()
+    assert breaker.state == STATE_CLOSED
+
+
+def test_backoff_delay_bounds():
+    rng = random.Random(0)
+    for attempt in range(8):
+        cap = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt)
+        delays = [backoff_delay(attempt, rng=rng) for _ in range(200)]
+        assert all(0 <= delay <= cap for delay in delays)
+        # 全抖动：在整个区间内分布，而不是集中在上限附近
+        assert min(delays) < cap * 0.1 and max(delays) > cap * 0.9
+    assert backoff_delay(3, rng=random.Random(42)) == backoff_delay(3, rng=random.Random(42))
+
+
+def test_backoff_delay_honours_retry_after():
+    assert backoff_delay(0, retry_after=2.5) == 2.5
+    assert backoff_delay(0, retry_after=0.0) == 0.0
+    assert backoff_delay(0, retry_after=3600) == BACKOFF_MAX
+    assert parse_retry_after('7') == 7.0
+    assert parse_retry_after('-1') == 0.0
+    assert parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') is None
+    assert parse_retry_after(None) is None
+
+
+def test_retryable_errors():
+    assert is_retryable(ProviderError('busy', 503))
+    assert is_retryable(ProviderError('slow down', 429))
+    assert not is_retryable(ProviderError('bad key', 401))
+    assert is_retryable(requests.ConnectionError())
+    assert is_retryable(requests.Timeout())
+    assert not is_retryable(ValueError())
+    assert is_retryable(KeyError(), transient=(KeyError,))
+
+
+def test_read_timeout_uses_default_until_enough_samples():
+    health = ProviderHealth()
+    for _ in range(TIMEOUT_MIN_SAMPLES - 1):
+        health.record_latency(API, 1.0)
+    assert health.timeouts(API) == (DEFAULT_CONNECT_TIMEOUT, 30)
+    assert health.timeouts({'provider': 'volcengine', 'model': 'test-model'}) == \
+        (DEFAULT_CONNECT_TIMEOUT, resilience.DEFAULT_READ_TIMEOUT)
+
+
+@pytest.mark.parametrize('latencies, expected', [
+    # p99 × 3
+    ([2.0] * 9 + [3.0], 3.0 * TIMEOUT_FACTOR),
+    # 下限
+    ([0.2] * 20, MIN_READ_TIMEOUT),
+    # 上限为 api.timeout
+    ([20.0] * 20, 30),
+])
+def test_read_timeout_follows_p99(latencies, expected):
+    health = ProviderHealth()
+    for seconds in latencies:
+        health.record_latency(API, seconds)
+    assert health.timeouts(API) == (DEFAULT_CONNECT_TIMEOUT, expected)
+    # 其他模型不受影响
+    assert health.timeouts(dict(API, model='other'))[1] == 30
+
+
+def test_record_failure_classification(clock):
+    health = ProviderHealth(clock=clock)
+    assert health.record_failure(API, ProviderError('slow down', 429)) is True
+    assert health.record_failure(API, ProviderError('bad key', 401)) is False
+    # 限流和不可重试的错误都不计入熔断
+    assert health.breaker(API).failures == 0
+    assert health.record_failure(API, ProviderError('busy', 503)) is True
+    assert health.breaker(API).failures == 1
+
+    health.max_retries = 2
+    assert [health.should_retry(attempt) for attempt in range(3)] == [True, True, False]
+    assert health.stats['retries'] == 2
@@ -0,0 +1,184 @@
+"""
+本地 HTTP 服务的测试：用原始套接字发送请求，翻译交给使用模拟服务的 TranslatorManager
+"""
+
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from src.server import TranslationServer
+from tests.helpers import wait_until
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def send(port, method, path, body=None, headers=None, host=True):
+    """
+    发送一个 HTTP/1.1 请求（Connection: close）
+
+    Returns:
+        tuple: (状态码, 响应头, 响应 JSON)
+    """
+    raw_body = json.dumps(body).encode('utf-8') if isinstance(body, dict) else (body or b'')
+    lines = [f"{method} {path} HTTP/1.1"]
+    if host is True:
+        lines.append(f"Host: 127.0.0.1:{port}")
+    elif host:
+        lines.append(f"Host: {host}")
+    lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+    lines += [f"Content-Length: {len(raw_body)}", "Connection: close"]
+    request = ('\r\n'.join(lines) + '\r\n\r\n').encode('utf-8') + raw_body
+
+    with socket.create_connection(('127.0.0.1', port), timeout=10) as sock:
+        sock.sendall(request)
+        response = b''
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            response += chunk
+    head, _, payload = response.partition(b'\r\n\r\n')
+    status_line, *header_lines = head.decode('latin-1').split('\r\n')
+    response_headers = dict(line.split(': ', 1) for line in header_lines)
+    return int(status_line.split(' ')[1]), response_headers, json.loads(payload)
+
+
+def send_async(*args, **kwargs):
+    """在后台线程中发送请求（界面线程需要继续处理事件），返回结果列表"""
+    result = []
+    threading.Thread(target=lambda: result.append(send(*args, **kwargs)), daemon=True).start()
+    return result
+
+
+def call(*args, **kwargs):
+    """发送请求并在等待期间处理 Qt 事件"""
+    result = send_async(*args, **kwargs)
+    assert wait_until(lambda: result)
+    return result[0]
+
+
+JSON = {'Content-Type': 'application/json'}
+
+
+@pytest.fixture
+def make_server(make_manager):
+    servers = []
+
+    def make(queue_size=8, token=''):
+        server = TranslationServer(make_manager({'target_lang': 'zh-CN'}), free_port(), queue_size, token)
+        assert server.start()
+        servers.append(server)
+        return server
+
+    yield make
+    for server in servers:
+        server.stop()
+
+
+def test_translate_and_health(make_server):
+    server = make_server()
+    status, _, payload = call(server.port, 'POST', '/translate', {'text': 'Hello'}, JSON)
+    assert (status, payload) == (200, {'result': '[译] Hello'})
+    status, _, payload = call(server.port, 'POST', '/batch', {'segments': ['one', 'two']}, JSON)
+    assert (status, payload['results']) == (200, ['[译] one', '[译] two'])
+    status, _, payload = send(server.port, 'GET', '/health')
+    assert (status, payload) == (200, {'status': 'ok'})
+
+
+@pytest.mark.parametrize('host', ['evil.example:7878', 'localhost', '127.0.0.1:1', None])
+def test_rejects_foreign_host(make_server, host):
+    """DNS 重绑定的网页发出的请求 Host 为其自己的域名"""
+    server = make_server()
+    status, _, _ = send(server.port, 'GET', '/health', host=host)
+    assert status == 403
+
+
+def test_localhost_host_is_accepted(make_server):
+    server = make_server()
+    assert send(server.port, 'GET', '/health', host=f'localhost:{server.port}')[0] == 200
+
+
+def test_post_requires_json_content_type(make_server):
+    server = make_server()
+    for content_type in ('text/plain', 'application/x-www-form-urlencoded', None):
+        headers = {'Content-Type': content_type} if content_type else {}
+        status, _, _ = send(server.port, 'POST', '/translate', {'text': 'Hello'}, headers)
+        assert status == 415
+    status, _, _ = call(server.port, 'POST', '/translate', {'text': 'Hello'},
+                        {'Content-Type': 'application/json; charset=utf-8'})
+    assert status == 200
+
+
+def test_token(make_server):
+    server = make_server(token='s3cret')
+    for authorization in (None, 'Bearer wrong', 'Basic s3cret', 'Bearer 令牌', 'Bearer s3creté'):
+        headers = dict(JSON, Authorization=authorization) if authorization else JSON
+        status, response_headers, _ = send(server.port, 'POST', '/translate', {'text': 'Hello'}, headers)
+        assert status == 401, authorization
+        assert response_headers['WWW-Authenticate'] == 'Bearer'
+    assert send(server.port, 'GET', '/stats')[0] == 401
+    # /health 不需要令牌
+    assert send(server.port, 'GET', '/health')[0] == 200
+
+    headers = dict(JSON, Authorization='Bearer s3cret')
+    assert call(server.port, 'POST', '/translate', {'text': 'Hello'}, headers)[0] == 200
+    assert call(server.port, 'GET', '/stats', headers={'Authorization': 'Bearer s3cret'})[0] == 200
+
+
+def test_queue_full_returns_429(make_server, stub):
+    stub.config.latency = 0.5
+    server = make_server(queue_size=1)
+    first = send_async(server.port, 'POST', '/translate', {'text': 'Slow one'}, JSON)
+    assert wait_until(lambda: server._outstanding == 1)
+    status, headers, _ = send(server.port, 'POST', '/translate', {'text': 'Slow two'},
+                              dict(JSON, **{'X-Client-Id': 'test'}))
+    assert status == 429
+    assert headers['Retry-After'] == '1'
+    assert wait_until(lambda: first)
+    assert first[0][0] == 200
+
+    status, _, stats = call(server.port, 'GET', '/stats')
+    assert stats['server']['rejected'] == 1
+    assert stats['clients']['test']['rejected'] == 1
+
+
+def test_standalone_server_shuts_down_cleanly_on_sigint(home, stub, tmp_path):
+    """Ctrl+C 退出事件循环后仍会停止服务、关闭翻译管理器"""
+    port = free_port()
+    config = {'api': {'provider': 'volcengine', 'api_key': 'test-key', 'base_url': stub.base_url,
+                      'model': 'stub-model', 'max_retries': 0, 'hedge_enabled': False},
+              'general': {'disk_cache_enabled': True}}
+    (tmp_path / 'config.json').write_text(json.dumps(config), encoding='utf-8')
+    root = Path(__file__).resolve().parent.parent
+    env = dict(os.environ, HOME=str(home), PYTHONPATH=str(root))
+    process = subprocess.Popen([sys.executable, '-m', 'src.server', '--port', str(port)], cwd=tmp_path, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    try:
+        deadline = time.monotonic() + 15
+        while True:
+            try:
+                status, _, _ = send(port, 'POST', '/translate', {'text': 'Hello'}, JSON)
+                break
+            except OSError:
+                assert time.monotonic() < deadline and process.poll() is None
+                time.sleep(0.1)
+        assert status == 200
+        process.send_signal(signal.SIGINT)
+        _, stderr = process.communicate(timeout=15)
+    finally:
+        process.kill()
+    assert process.returncode == 0
+    assert '本地翻译服务已停止' in stderr
+    assert (home / '.zdtrans' / 'cache.db').exists()
@@ -0,0 +1,101 @@
+"""
+剪贴板预取的测试：命中（已完成或处理中）、被取代和未使用的浪费统计、命中时提升到交互式优先级
+"""
+
+from src import translator
+from tests.helpers import collect, wait_until
+
+
+def test_completed_prefetch_is_a_hit(make_manager, stub):
+    manager = make_manager()
+    ready = collect(manager.request_ready)
+
+    manager.prefetch('Copied paragraph to translate')
+    assert wait_until(lambda: not manager._inflight)
+    request_id = manager.translate('Copied paragraph to translate')
+    assert ready[-1] == (request_id, '[译] Copied paragraph to translate', 'translate')
+
+    stats = manager.speculative_stats_summary()
+    assert (stats['started'], stats['hits'], stats['hit_rate'], stats['pending']) == (1, 1, 1.0, 0)
+    assert stats['used_tokens'] > 0 and stats['wasted_tokens'] == 0
+    assert stub.config.snapshot()['requests'] == 1
+    # 预取不计入请求数
+    assert manager.stats['requests'] == 1
+
+
+def test_inflight_prefetch_is_claimed(make_manager, stub):
+    stub.config.latency = 0.2
+    manager = make_manager()
+    ready = collect(manager.request_ready)
+
+    prefetch_id = manager.prefetch('Copied while the hotkey is pressed')
+    request_id = manager.translate('Copied while the hotkey is pressed')
+    assert wait_until(lambda: len(ready) == 2)
+    assert sorted(ready) == [(prefetch_id, '[译] Copied while the hotkey is pressed', 'translate'),
+                             (request_id, '[译] Copied while the hotkey is pressed', 'translate')]
+    stats = manager.speculative_stats_summary()
+    assert (stats['hits'], stats['pending'], stats['wasted']) == (1, 0, 0)
+    assert stub.config.snapshot()['requests'] == 1
+
+
+def test_hit_promotes_queued_prefetch_to_interactive(make_manager, stub):
+    stub.config.latency = 0.2
+    manager = make_manager({'max_workers': 1})
+    ready = collect(manager.request_ready)
+
+    manager.translate('Occupies the only worker', interactive=False)
+    assert wait_until(lambda: stub.config.snapshot()['requests'] == 1)
+    background = manager.translate('Queued background paragraph', interactive=False)
+    manager.prefetch('Queued prefetch')
+    hotkey = manager.translate('Queued prefetch')
+
+    assert wait_until(lambda: len(ready) == 4)
+    order = [request_id for request_id, _, _ in ready]
+    # 没有提升时预取的优先级低于后台请求，会最后执行
+    assert order.index(hotkey) < order.index(background)
+    assert manager.speculative_stats['hits'] == 1
+
+
+def test_superseded_prefetch_is_wasted(make_manager, stub):
+    stub.config.latency = 0.2
+    manager = make_manager()
+
+    manager.prefetch('First copied text')
+    assert wait_until(lambda: stub.config.snapshot()['requests'] == 1)
+    manager.prefetch('Second copied text')
+    assert wait_until(lambda: not manager._inflight)
+
+    stats = manager.speculative_stats_summary()
+    assert (stats['started'], stats['cancelled'], stats['pending']) == (2, 1, 1)
+    assert stats['wasted_tokens'] > 0
+    assert manager.stats['aborted'] == 1
+
+
+def test_unused_results_beyond_window_are_wasted(make_manager, stub, monkeypatch):
+    monkeypatch.setattr(translator, 'SPECULATIVE_WINDOW', 2)
+    manager = make_manager()
+    for i in range(4):
+        manager.prefetch(f'Copied text number {i}')
+        assert wait_until(lambda: not manager._inflight)
+
+    stats = manager.speculative_stats_summary()
+    assert (stats['started'], stats['wasted'], stats['pending'], stats['hits']) == (4, 2, 2, 0)
+    # 窗口内的结果仍然算命中
+    manager.translate('Copied text number 3')
+    assert manager.speculative_stats['hits'] == 1
+
+
+def test_skipped_and_failed_prefetches(make_manager, stub):
+    manager = make_manager()
+    manager.prefetch('12345 + 678')
+    manager.translate('Already translated text')
+    assert wait_until(lambda: not manager._inflight)
+    manager.prefetch('Already translated text')
+    assert manager.speculative_stats['skipped'] == 2
+
+    stub.config.failure_rate = 1.0
+    manager.prefetch('Prefetch that fails')
+    assert wait_until(lambda: not manager._inflight)
+    stats = manager.speculative_stats_summary()
+    assert (stats['started'], stats['failed']) == (1, 1)
+    assert stats['wasted_tokens'] > 0
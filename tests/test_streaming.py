@@ -0,0 +1,137 @@
+"""
+流式响应解析的测试：按任意字节边界拆分的 SSE 数据、[DONE]、错误事件和增量合并的时间间隔
+"""
+
+import json
+import time
+
+import pytest
+import requests
+
+from src.providers import (PARTIAL_EMIT_INTERVAL, STREAM_DONE, StreamAccumulator, StreamError, iter_stream_deltas,
+                           parse_sse_line)
+from src.translator import TranslatorWorker
+
+
+class FragmentedRaw:
+    """按给定的字节片段返回数据的原始响应流"""
+
+    def __init__(self, fragments):
+        self.fragments = list(fragments)
+
+    def read(self, amount=None, **kwargs):
+        return self.fragments.pop(0) if self.fragments else b''
+
+    def close(self):
+        pass
+
+
+def make_response(fragments):
+    response = requests.Response()
+    response.status_code = 200
+    response.headers['Content-Type'] = 'text/event-stream'
+    response.raw = FragmentedRaw(fragments)
+    return response
+
+
+def sse(*events):
+    """把事件编码为 SSE 数据（字典按 OpenAI 流式格式包装）"""
+    lines = []
+    for event in events:
+        if isinstance(event, str) and not event.startswith('{'):
+            lines.append(f"data: {event}\n\n" if event == '[DONE]' else event)
+        else:
+            lines.append(f"data: {json.dumps(event, ensure_ascii=False)}\n\n")
+    return ''.join(lines).encode('utf-8')
+
+
+def delta(text):
+    return {'choices': [{'index': 0, 'delta': {'content': text}}]}
+
+
+def split_every(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+BODY = sse(delta('你好'), delta('，世界'), {'choices': [], 'usage': {'prompt_tokens': 9, 'completion_tokens': 4}},
+           '[DONE]', delta('ignored after done'))
+
+
+@pytest.mark.parametrize('size', [1, 2, 3, 7, 64, len(BODY)])
+def test_fragmented_stream(size):
+    """片段边界落在 "data:" 前缀、JSON 和多字节字符中间时结果不变"""
+    usage = {}
+    deltas = list(iter_stream_deltas(make_response(split_every(BODY, size)), usage))
+    assert ''.join(deltas) == '你好，世界'
+    assert usage == {'prompt_tokens': 9, 'completion_tokens': 4}
+
+
+def test_crlf_comments_and_empty_deltas():
+    body = (b': keep-alive\r\n\r\nevent: message\r\n' + sse({'choices': [{'delta': {'role': 'assistant'}}]})
+            + sse(delta('')).replace(b'\n', b'\r\n') + sse(delta('A'), delta('B'), '[DONE]'))
+    assert list(iter_stream_deltas(make_response(split_every(body, 5)))) == ['A', 'B']
+
+
+def test_done_marker():
+    assert parse_sse_line('data: [DONE]') is STREAM_DONE
+    assert parse_sse_line('data:[DONE]') is STREAM_DONE
+    assert parse_sse_line('') is None
+    assert parse_sse_line('id: 1') is None
+
+
+def test_stream_without_done_ends_at_eof():
+    body = sse(delta('partial'))
+    assert list(iter_stream_deltas(make_response([body]))) == ['partial']
+
+
+@pytest.mark.parametrize('event', [
+    {'error': {'message': 'Overloaded', 'type': 'server_error'}},
+    {'type': 'error', 'error': {'type': 'overloaded_error', 'message': 'Overloaded'}},
+    {'error': 'Overloaded'},
+])
+def test_error_event_raises(event):
+    body = sse(delta('half of the '), event, delta('never'), '[DONE]')
+    deltas = iter_stream_deltas(make_response(split_every(body, 10)))
+    assert next(deltas) == 'half of the '
+    with pytest.raises(StreamError, match='Overloaded'):
+        next(deltas)
+
+
+def test_accumulator_throttles_partials():
+    interval = PARTIAL_EMIT_INTERVAL
+    accumulator = StreamAccumulator(start=0.0)
+    assert accumulator.add('a', now=1.0) == 'a'
+    assert accumulator.first_token == 1.0
+    # 间隔内的增量合并到下一次发出
+    assert accumulator.add('b', now=1.0 + interval / 4) is None
+    assert accumulator.add('c', now=1.0 + interval / 2) is None
+    assert accumulator.add('d', now=1.0 + interval * 2) == 'bcd'
+    assert accumulator.add('e', now=1.0 + interval * 2.5) is None
+    assert accumulator.flush() == 'e'
+    assert accumulator.flush() is None
+    assert accumulator.first_token == 1.0
+    assert accumulator.text() == 'abcde'
+
+
+def worker(partials):
+    api_config = {'provider': 'volcengine', 'api_key': 'test-key', 'model': 'stub-model'}
+    return TranslatorWorker('text', 'translate', api_config, request_id=7,
+                            on_partial=lambda request_id, text, action: partials.append(text))
+
+
+def test_read_stream_emits_all_text():
+    partials = []
+    body = sse(*[delta(f'{i} ') for i in range(50)], '[DONE]')
+    result = worker(partials)._read_stream(make_response(split_every(body, 13)), time.monotonic())
+    assert result == ' '.join(str(i) for i in range(50))
+    # 合并发出，内容完整
+    assert ''.join(partials).strip() == result
+    assert 1 <= len(partials) < 50
+
+
+def test_read_stream_propagates_error_event():
+    partials = []
+    body = sse(delta('before error'), {'error': {'message': 'context length exceeded'}})
+    with pytest.raises(StreamError, match='context length exceeded'):
+        worker(partials)._read_stream(make_response([body]), time.monotonic())
+    assert partials == ['before error']
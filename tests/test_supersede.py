@@ -0,0 +1,102 @@
+"""
+交互式请求取代策略的测试：latest_wins 取消排队中的任务、中断执行中的任务，queue_all 全部完成；
+以及主窗口在新请求开始时丢弃上一个请求未完成的流式内容
+"""
+
+from src.translator import SUPERSEDE_QUEUE_ALL
+from tests.helpers import collect, wait_until
+
+
+def test_latest_wins_cancels_queued_and_aborts_running(make_manager, stub):
+    stub.config.latency = 0.4
+    manager = make_manager({'max_workers': 1})
+    ready = collect(manager.request_ready)
+    cancelled = collect(manager.request_cancelled)
+
+    first = manager.translate('First selected text')
+    assert wait_until(lambda: stub.config.snapshot()['requests'] == 1)
+    second = manager.translate('Second selected text')  # 排队中（唯一的线程被第一个请求占用）
+    third = manager.translate('Third selected text')
+
+    assert wait_until(lambda: ready)
+    assert ready == [(third, '[译] Third selected text', 'translate')]
+    assert [request_id for request_id, in cancelled] == [first, second]
+    assert (manager.stats['cancelled'], manager.stats['aborted']) == (2, 2)
+    # 第一个请求已经发出，第二个请求在线程池中被跳过，没有调用API
+    assert wait_until(lambda: manager.pool_stats()['skipped'] == 1)
+    assert stub.config.snapshot()['requests'] == 2
+    key = manager._cache_key('First selected text', 'translate', manager._target_lang('First selected text', 'translate'))
+    assert manager.cache.get(key) is None
+    assert not manager._inflight
+
+
+def test_superseded_request_stops_streaming(make_manager, stub):
+    stub.config.token_rate = 40
+    manager = make_manager({'stream': True})
+    partials = collect(manager.translation_partial)
+    ready = collect(manager.request_ready)
+
+    manager.translate('An older selection that streams slowly')
+    assert wait_until(lambda: partials)
+    newer = manager.translate('Newer selection')
+    assert wait_until(lambda: ready)
+    assert ready == [(newer, '[译] Newer selection', 'translate')]
+
+    count = len(partials)
+    wait_until(lambda: False, timeout=0.3)
+    assert len(partials) == count
+    streamed = ''.join(delta for delta, _ in partials)
+    assert streamed.endswith('[译] Newer selection')
+    assert manager.stats['aborted'] == 1
+
+
+def test_same_text_and_background_requests_are_not_superseded(make_manager, stub):
+    stub.config.latency = 0.2
+    manager = make_manager()
+    ready = collect(manager.request_ready)
+
+    background = manager.translate('Background paragraph', interactive=False)
+    first = manager.translate('Same selection')
+    again = manager.translate('Same selection')  # 相同请求合并，不取代
+    assert wait_until(lambda: len(ready) == 3)
+    assert {request_id for request_id, _, _ in ready} == {background, first, again}
+    assert (manager.stats['cancelled'], manager.stats['aborted']) == (0, 0)
+
+
+def test_queue_all_completes_every_request(make_manager, stub):
+    stub.config.latency = 0.1
+    manager = make_manager({'max_workers': 1}, {'supersede_policy': SUPERSEDE_QUEUE_ALL})
+    ready = collect(manager.request_ready)
+    cancelled = collect(manager.request_cancelled)
+
+    ids = [manager.translate(f'Selection number {i}') for i in range(3)]
+    assert wait_until(lambda: len(ready) == 3)
+    assert [request_id for request_id, _, _ in ready] == ids
+    assert not cancelled
+    assert (manager.stats['cancelled'], manager.stats['aborted']) == (0, 0)
+    assert stub.config.snapshot()['requests'] == 3
+
+
+def test_main_window_discards_stream_of_previous_request(qapp):
+    from src.main_window import MainWindow
+
+    window = MainWindow()
+    try:
+        window.show_translation_result('Earlier result', 'translate')
+        history = window.result_text.toPlainText()
+
+        window.show_partial_translation('partial from a superseded request', 'translate')
+        window._flush_stream()
+        window.reset_stream()  # 新的快捷键请求开始
+        assert window.result_text.toPlainText() == history
+
+        window.show_partial_translation('new ', 'translate')
+        window.show_partial_translation('stream', 'translate')
+        window._flush_stream()
+        assert window.result_text.toPlainText() == f'[翻译]\nnew stream\n\n{history}'
+
+        window.show_translation_result('new stream', 'translate')
+        assert 'superseded' not in window.result_text.toPlainText()
+        assert window.result_text.toPlainText().startswith('[翻译]\nnew stream\n\n[翻译]\nEarlier result')
+    finally:
+        window.deleteLater()
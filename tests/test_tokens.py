@@ -0,0 +1,70 @@
+"""
+本地 token 估算和提示词预算的测试
+"""
+
+from src.tokens import (MESSAGE_OVERHEAD_TOKENS, MIN_OUTPUT_TOKENS, REQUEST_OVERHEAD_TOKENS, estimate_messages_tokens,
+                        estimate_tokens, fit_terms, keyword_budget, output_budget)
+from src.chunking import MAX_OUTPUT_TOKENS
+
+
+def test_cjk_counts_one_token_per_character():
+    assert estimate_tokens('今天天气很好') == 6
+    assert estimate_tokens('こんにちは') == 5
+    assert estimate_tokens('안녕하세요') == 5
+    # 全角标点也逐个计数
+    assert estimate_tokens('你好，世界！') == 6
+
+
+def test_latin_counts_words_not_characters():
+    assert estimate_tokens('hello world') == 2
+    assert estimate_tokens('  hello   world  ') == 2
+    assert estimate_tokens('internationalization') == 1 + 20 // 8
+    assert estimate_tokens('Hello, world!') == 4
+    assert estimate_tokens('café déjà vu') == 3
+
+
+def test_digits_count_per_three():
+    assert estimate_tokens('7') == 1
+    assert estimate_tokens('2024') == 2
+    assert estimate_tokens('123456789') == 3
+
+
+def test_cjk_is_denser_than_latin():
+    """同样的字符数，中文的 token 数远多于英文"""
+    chinese = '机器学习模型需要大量的训练数据' * 10
+    english = ('Machine learning models need lots of training data ' * 10)[:len(chinese)]
+    assert len(chinese) == len(english)
+    assert estimate_tokens(chinese) == len(chinese)
+    assert estimate_tokens(english) < len(english) / 3
+    mixed = '使用 Transformer 模型'
+    assert estimate_tokens(mixed) == 2 + 2 + 2
+
+
+def test_message_overhead():
+    messages = [{'role': 'system', 'content': '你好'}, {'role': 'user', 'content': 'hello'}]
+    assert estimate_messages_tokens(messages) == REQUEST_OVERHEAD_TOKENS + 2 * MESSAGE_OVERHEAD_TOKENS + 3
+    assert estimate_messages_tokens([]) == REQUEST_OVERHEAD_TOKENS
+
+
+def test_fit_terms_prefers_terms_with_translations():
+    terms = ['alpha', 'beta → 贝塔', 'gamma', 'delta → 德尔塔']
+    assert fit_terms(terms, 100) == (terms, 0)
+    kept, dropped = fit_terms(terms, 11)
+    assert kept == ['beta → 贝塔', 'delta → 德尔塔']
+    assert dropped == 2
+    # 带译法的术语放不下时，剩余预算仍按原顺序留给其他术语
+    assert fit_terms(terms, 8) == (['alpha', 'beta → 贝塔'], 2)
+
+
+def test_output_budget_bounds():
+    assert output_budget(10, 'translate', 100000) == MIN_OUTPUT_TOKENS
+    assert output_budget(1000, 'translate', 100000) == 2064
+    assert output_budget(1000, 'polish', 100000) == 1564
+    assert output_budget(100000, 'translate', 100000) == MAX_OUTPUT_TOKENS
+    assert output_budget(1000, 'translate', 500) == 500
+
+
+def test_keyword_budget_shrinks_for_long_text():
+    assert keyword_budget('gpt-4', 100) == 300
+    assert keyword_budget('gpt-4', 3900) == 8192 - 7800 - MIN_OUTPUT_TOKENS
+    assert keyword_budget('gpt-4', 5000) == 0
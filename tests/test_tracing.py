@@ -0,0 +1,138 @@
+"""
+链路追踪的测试：写出的文件能用 json.load 读回，事件的 ph/ts 字段合法，异步阶段的开始/结束成对出现
+"""
+
+import json
+import threading
+from collections import defaultdict
+
+import pytest
+
+from src.tracing import Tracer, tracer
+from tests.helpers import collect, wait_until
+
+
+PHASES = {'X', 'b', 'e', 'i', 'M'}
+
+
+def load_events(path):
+    """用 json.load 读回 trace 文件"""
+    with open(path, encoding='utf-8') as f:
+        trace = json.load(f)
+    assert trace['displayTimeUnit'] == 'ms'
+    return trace['traceEvents']
+
+
+def check_events(events):
+    """
+    检查字段和开始/结束配对
+
+    Returns:
+        dict: (cat, name, id) -> 已配对的次数
+    """
+    open_spans = defaultdict(list)
+    pairs = defaultdict(int)
+    for event in events:
+        assert event['ph'] in PHASES, event
+        assert isinstance(event['pid'], int) and isinstance(event['tid'], int)
+        if event['ph'] == 'M':
+            assert event['name'] == 'thread_name'
+            continue
+        assert isinstance(event['ts'], (int, float)) and event['ts'] >= 0, event
+        if event['ph'] == 'X':
+            assert event['dur'] >= 0
+        elif event['ph'] == 'b':
+            open_spans[(event['cat'], event['name'], event['id'])].append(event['ts'])
+        elif event['ph'] == 'e':
+            key = (event['cat'], event['name'], event['id'])
+            assert open_spans[key], f"没有对应开始事件的结束事件: {key}"
+            assert event['ts'] >= open_spans[key].pop()
+            pairs[key] += 1
+    assert not any(open_spans.values()), f"未结束的阶段: {dict(open_spans)}"
+    return pairs
+
+
+def test_round_trip(tmp_path):
+    trace = Tracer()
+    trace.configure(True, tmp_path)
+    trace.instant('hotkey.pressed', action='translate')
+    with trace.span('cache.lookup', hit=False) as span:
+        span.set(size=3)
+    with pytest.raises(ValueError):
+        with trace.span('parse'):
+            raise ValueError
+
+    # 两个请求的异步阶段交错，其中一个在另一个线程中结束
+    trace.begin('request', 1)
+    trace.begin('request', 2)
+    with trace.async_span('http.request', 1, path='/chat/completions'):
+        pass
+    worker = threading.Thread(target=lambda: trace.end('request', 1, outcome='ok'), name='zdtrans-test')
+    worker.start()
+    worker.join()
+    trace.end('request', 2, outcome='cancelled')
+
+    events = load_events(trace.flush('test'))
+    pairs = check_events(events)
+    assert pairs == {('request', 'request', 1): 1, ('request', 'request', 2): 1,
+                     ('request', 'http.request', 1): 1}
+
+    by_name = {event['name']: event for event in events if event['ph'] == 'X'}
+    assert by_name['cache.lookup']['args'] == {'hit': False, 'size': 3}
+    assert by_name['parse']['args'] == {'error': 'ValueError'}
+    threads = {event['args']['name'] for event in events if event['ph'] == 'M'}
+    assert 'zdtrans-test' in threads
+    ends = [event for event in events if event['ph'] == 'e' and event['name'] == 'http.request']
+    assert ends[0]['args'] == {'path': '/chat/completions'}
+
+
+def test_disabled_and_empty_flush_write_nothing(tmp_path):
+    trace = Tracer()
+    trace.configure(False, tmp_path)
+    with trace.span('cache.lookup'):
+        trace.begin('request', 1)
+    assert trace.flush() is None
+    trace.configure(True, tmp_path)
+    assert trace.flush() is None
+    assert not list(tmp_path.iterdir())
+
+
+def test_keeps_latest_files(tmp_path):
+    trace = Tracer()
+    trace.configure(True, tmp_path, max_files=2)
+    paths = []
+    for i in range(3):
+        trace.instant('tick', index=i)
+        paths.append(trace.flush(f'trace{i}'))
+    assert sorted(tmp_path.iterdir()) == sorted(paths[1:])
+
+
+@pytest.fixture
+def global_trace(tmp_path):
+    """开启全局追踪器，结束后关闭并丢弃剩余事件"""
+    tracer.configure(True, tmp_path / 'traces')
+    yield tracer
+    tracer.enabled = False
+    tracer.flush()
+
+
+@pytest.mark.parametrize('engine', ['thread', 'asyncio'])
+def test_manager_requests_are_paired(make_manager, global_trace, engine):
+    if engine == 'asyncio':
+        pytest.importorskip('aiohttp')
+    manager = make_manager({'engine': engine})
+    ready = collect(manager.request_ready)
+    ids = [manager.translate(f'Traced request {i}', interactive=False) for i in range(3)]
+    assert wait_until(lambda: len(ready) == 3)
+    # 缓存命中的请求只记录缓存查询，不开始异步阶段
+    manager.translate('Traced request 0', interactive=False)
+    assert len(ready) == 4
+
+    events = load_events(global_trace.flush())
+    pairs = check_events(events)
+    assert {key[2] for key in pairs if key[:2] == ('request', 'request')} == set(ids)
+    lookups = [event for event in events if event['name'] == 'cache.lookup']
+    assert [event['args']['hit'] for event in lookups] == [False, False, False, True]
+    if engine == 'asyncio':
+        # 协程中交错的网络阶段按请求 ID 配对
+        assert {key[2] for key in pairs if key[:2] == ('async', 'http.request')} == set(ids)
@@ -0,0 +1,116 @@
+"""
+翻译记忆的测试：MinHash/LSH 近似匹配、阈值、作用域隔离、条目上限和持久化
+"""
+
+import time
+
+from benchmarks.memory import run_benchmark, within_budget
+from src.translation_memory import MIN_CHARS, TranslationMemory, estimate_similarity, jaccard, shingles, signature
+
+
+SCOPE = 'translate:zh-CN:stub/stub-model:'
+SOURCE = 'Please restart the application server 12 before running the database migration script again.'
+NEAR = 'Please restart the application server 47 before running the database migration script again.'
+FAR = 'Please restart the application server before running the nightly cleanup job again.'
+
+
+def wait_for_entries(memory, count, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while memory.stats()['entries'] < count:
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_signature_estimates_jaccard():
+    a, b = shingles(SOURCE), shingles(NEAR)
+    assert estimate_similarity(signature(a), signature(a)) == 1.0
+    assert abs(estimate_similarity(signature(a), signature(b)) - jaccard(a, b)) < 0.2
+    # 全半角、大小写和空白不影响匹配
+    assert shingles('Ｈｅｌｌｏ   WORLD') == shingles('hello world')
+
+
+def test_near_duplicate_is_found():
+    memory = TranslationMemory()
+    memory.add(SOURCE, '译文', SCOPE)
+    similarity, source, translation = memory.lookup(NEAR, SCOPE)
+    assert similarity >= memory.threshold
+    assert (source, translation) == (SOURCE, '译文')
+    assert memory.lookup(SOURCE, SCOPE)[0] == 1.0
+    assert memory.stats()['hits'] == 2
+
+
+def test_threshold():
+    memory = TranslationMemory()
+    memory.add(SOURCE, '译文', SCOPE)
+    similarity = jaccard(shingles(SOURCE), shingles(FAR))
+    assert similarity < memory.threshold
+    assert memory.lookup(FAR, SCOPE) is None
+
+    memory.configure(threshold=similarity - 0.05)
+    assert memory.lookup(FAR, SCOPE)[1] == SOURCE
+    assert memory.stats()['misses'] == 1
+
+
+def test_scopes_do_not_match_each_other():
+    memory = TranslationMemory()
+    memory.add(SOURCE, '译文', SCOPE)
+    assert memory.lookup(SOURCE, 'translate:ja:stub/stub-model:') is None
+    assert memory.lookup(SOURCE, 'polish:zh-CN:stub/stub-model:') is None
+
+
+def test_short_text_is_ignored():
+    memory = TranslationMemory()
+    short = SOURCE[:MIN_CHARS - 1]
+    memory.add(short, '译文', SCOPE)
+    assert memory.stats()['entries'] == 0
+    memory.add(SOURCE, '译文', SCOPE)
+    assert memory.lookup(short, SCOPE) is None
+
+
+def test_trim_evicts_oldest_and_cleans_buckets():
+    memory = TranslationMemory(max_entries=2)
+    texts = [f'Unrelated sentence number {i} about topic {chr(65 + i) * 6}' for i in range(3)]
+    for text in texts:
+        memory.add(text, f'译文 {text}', SCOPE)
+    assert memory.stats()['entries'] == 2
+    assert memory.lookup(texts[0], SCOPE) is None
+    assert memory.lookup(texts[2], SCOPE)[1] == texts[2]
+
+    memory.configure(max_entries=0)
+    assert memory.stats()['entries'] == 0
+    assert not memory._buckets
+
+
+def test_persistence_round_trip(tmp_path):
+    path = tmp_path / 'memory.db'
+    memory = TranslationMemory(path)
+    texts = [f'Persisted sentence number {i} with some padding text' for i in range(5)]
+    for text in texts:
+        memory.add(text, f'译文 {text}', SCOPE)
+    memory.close()
+
+    reloaded = TranslationMemory(path)
+    assert wait_for_entries(reloaded, 5)
+    assert reloaded.lookup(texts[3], SCOPE) == (1.0, texts[3], f'译文 {texts[3]}')
+    reloaded.close()
+
+    # 上限变小时只加载最近的条目，并删除磁盘上的旧记录
+    smaller = TranslationMemory(path, max_entries=2)
+    assert wait_for_entries(smaller, 2)
+    assert smaller.lookup(texts[0], SCOPE) is None
+    assert smaller.lookup(texts[4], SCOPE) is not None
+    smaller.close()
+    reopened = TranslationMemory(path)
+    assert wait_for_entries(reopened, 2)
+    time.sleep(0.05)
+    assert reopened.stats()['entries'] == 2
+    reopened.close()
+
+
+def test_lookup_stays_within_budget():
+    """完整的 10 万条基准见 python -m benchmarks.memory，这里用 2 万条检查查询延迟不随条目数恶化"""
+    result = run_benchmark(entries=20000, queries=300)
+    assert within_budget(result), result
+    assert result['near_hit_rate'] > 0.5
@@ -0,0 +1,49 @@
+"""
+线程池优先级调整的测试
+"""
+
+import threading
+import time
+
+from src.worker_pool import WorkerPool, PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, PRIORITY_SPECULATIVE
+
+
+class RecordingTask:
+    def __init__(self, name, order, gate=None):
+        self.name = name
+        self.order = order
+        self.gate = gate
+        self.done = threading.Event()
+
+    def run(self):
+        if self.gate is not None:
+            self.gate.wait(5)
+        self.order.append(self.name)
+        self.done.set()
+
+
+def test_reprioritize_moves_queued_task_without_resubmitting():
+    pool = WorkerPool(1)
+    order = []
+    gate = threading.Event()
+    blocker = RecordingTask('blocker', order, gate)
+    pool.submit(blocker)
+    # 等唯一的线程开始执行 blocker，之后提交的任务都在排队
+    while pool.stats()['active'] == 0:
+        time.sleep(0.005)
+
+    background = RecordingTask('background', order)
+    speculative = RecordingTask('speculative', order)
+    pool.submit(background, PRIORITY_BACKGROUND)
+    pool.submit(speculative, PRIORITY_SPECULATIVE)
+    assert pool.reprioritize(speculative, PRIORITY_INTERACTIVE)
+    assert pool.stats()['queue_depth'] == 2
+
+    gate.set()
+    assert speculative.done.wait(5) and background.done.wait(5)
+    assert order == ['blocker', 'speculative', 'background']
+    pool.shutdown()
+    for thread in list(pool._threads):
+        thread.join(5)
+    assert pool.stats()['completed'] == 3
+    assert not pool.reprioritize(speculative, PRIORITY_INTERACTIVE)